@@ -12,7 +12,9 @@ jwt = JWTManager()
 cache = Cache()
 from app.models import (
     User, Product, Cart, CartItem, 
-    Address, PaymentMethod, Order, OrderItem, Invoice
+    Address, PaymentMethod, Order, OrderItem, Invoice,
+    IdempotencyKey, InvoiceSequence, OutboxEvent,
+    SalesDaily, ProductSalesDaily, ProductSalesMonthly, StockMovement, RevokedToken
 )
 
 def create_app(config_name='development'):
@@ -26,6 +28,16 @@ def create_app(config_name='development'):
     from app.config import config
     app.config.from_object(config[config_name])
     
+    # IP real del cliente detrás de un balanceador o CDN (límites de login por IP)
+    if app.config.get('TRUSTED_PROXY_COUNT'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    
+    # Serializador de respuestas JSON (orjson si está instalado, ver JSON_BACKEND)
+    from app.utils import FastJSONProvider
+    app.json = FastJSONProvider(app)
+    
     # Inicializar extensiones con la app
     db.init_app(app)
     migrate.init_app(app, db)
@@ -37,9 +49,36 @@ def create_app(config_name='development'):
     from app.controllers import register_blueprints
     register_blueprints(app)
     
+    # Comandos de mantenimiento (flask <grupo> <comando>)
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Métricas por ruta y log de consultas lentas (opt-in)
+    if app.config.get('METRICS_ENABLED'):
+        from app.middlewares import init_instrumentation
+        init_instrumentation(app)
+    
     # Ruta de prueba
     @app.route('/health')
     def health_check():
         return {'status': 'ok', 'message': 'Petshop API is running'}, 200
     
+    # Contadores de cache por vista (hit, miss, stale, coalesced, early_refresh)
+    @app.route('/health/cache')
+    def cache_stats():
+        from app.utils import CacheStats
+        return {'cache': CacheStats.snapshot()}, 200
+    
+    # Conexiones en uso, overflow y tiempo de espera del pool de la base de datos
+    @app.route('/health/db-pool')
+    def db_pool_status():
+        from app.utils import pool_status
+        return {'pool': pool_status(db.engine)}, 200
+    
+    # Profundidad y lag de la cola de tareas post-checkout
+    @app.route('/health/outbox')
+    def outbox_status():
+        from app.services import OutboxService
+        return {'outbox': OutboxService.stats()}, 200
+    
     return app
\ No newline at end of file
@@ -0,0 +1,192 @@
+import click
+from flask.cli import AppGroup
+
+idempotency_cli = AppGroup('idempotency', help='Mantenimiento de Idempotency-Key')
+
+@idempotency_cli.command('purge')
+def purge_idempotency_keys():
+    """
+    Borra las respuestas guardadas fuera de IDEMPOTENCY_TTL_HOURS
+    Uso: flask idempotency purge
+    """
+    from app.services import IdempotencyService
+    deleted = IdempotencyService.purge_expired()
+    click.echo(f'Keys vencidas borradas: {deleted}')
+
+invoices_cli = AppGroup('invoices', help='Numeración de facturas')
+
+@invoices_cli.command('gaps')
+@click.option('--year', type=int, default=None, help='Año a revisar (por defecto el actual)')
+def invoice_number_gaps(year):
+    """
+    Lista los huecos en la numeración de facturas de un año
+    Uso: flask invoices gaps --year 2026
+    """
+    from datetime import datetime
+    from app.services import InvoiceNumberService
+    report = InvoiceNumberService.gap_report(year or datetime.utcnow().year)
+    click.echo(
+        f"{report['prefix']}: {report['issued']} emitidas, último {report['last_issued'] or '-'}, "
+        f"{report['allocated']} reservadas"
+    )
+    for gap in report['gaps']:
+        if gap['from'] == gap['to']:
+            click.echo(f"  falta {gap['from']}")
+        else:
+            click.echo(f"  faltan {gap['from']}-{gap['to']}")
+    if report['gaps_truncated']:
+        click.echo('  ... (más huecos sin listar)')
+    click.echo(f"Números faltantes: {report['missing']}; reservados sin usar al final: {report['unused_tail']}")
+
+outbox_cli = AppGroup('outbox', help='Worker de tareas post-checkout')
+
+@outbox_cli.command('worker')
+@click.option('--once', is_flag=True, help='Vacía la cola y termina')
+@click.option('--batch-size', type=int, default=None, help='Eventos por lote (OUTBOX_BATCH_SIZE)')
+def run_outbox_worker(once, batch_size):
+    """
+    Procesa los eventos del outbox (cache de facturas, notificaciones)
+    Uso: flask outbox worker   (se pueden correr varios en paralelo)
+    """
+    import time
+    from flask import current_app
+    from app import db
+    from app.services import OutboxService
+    
+    if once:
+        click.echo(f'Eventos procesados: {OutboxService.drain(batch_size)}')
+        return
+    
+    poll_interval = current_app.config['OUTBOX_POLL_INTERVAL']
+    click.echo('Worker del outbox iniciado (Ctrl+C para detener)')
+    try:
+        while True:
+            if not OutboxService.process_batch(batch_size):
+                db.session.remove()
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        click.echo('Worker del outbox detenido')
+
+@outbox_cli.command('stats')
+def outbox_stats():
+    """
+    Profundidad de la cola y lag del evento pendiente más antiguo
+    Uso: flask outbox stats
+    """
+    from app.services import OutboxService
+    stats = OutboxService.stats()
+    by_status = ', '.join(f'{status}={count}' for status, count in stats['by_status'].items())
+    click.echo(f"Profundidad: {stats['depth']} ({by_status}), lag: {stats['lag_seconds']:.1f}s")
+
+@outbox_cli.command('purge')
+def purge_outbox_events():
+    """
+    Borra los eventos procesados fuera de OUTBOX_RETENTION_HOURS
+    Uso: flask outbox purge
+    """
+    from app.services import OutboxService
+    click.echo(f'Eventos borrados: {OutboxService.purge_processed()}')
+
+carts_cli = AppGroup('carts', help='Mantenimiento de carritos')
+
+@carts_cli.command('check-totals')
+@click.option('--fix', is_flag=True, help='Recalcula los totales de los carritos con diferencias')
+@click.option('--all', 'all_statuses', is_flag=True, help='Revisa también carritos completados y abandonados')
+@click.option('--limit', type=int, default=1000, help='Máximo de carritos a reportar')
+def check_cart_totals(fix, all_statuses, limit):
+    """
+    Compara item_count y subtotal de cada carrito con la suma de sus items
+    Uso: flask carts check-totals [--fix]
+    """
+    from app.services import CartService
+    mismatches = CartService.check_totals(status=None if all_statuses else 'active', fix=fix, limit=limit)
+    for mismatch in mismatches:
+        stored, actual = mismatch['stored'], mismatch['actual']
+        click.echo(
+            f"  carrito {mismatch['cart_id']}: guardado {stored['item_count']} u. / {stored['subtotal']:.2f}, "
+            f"items {actual['item_count']} u. / {actual['subtotal']:.2f}"
+        )
+    action = 'corregidos' if fix else 'con diferencias'
+    click.echo(f'Carritos {action}: {len(mismatches)}')
+
+@carts_cli.command('sweep')
+@click.option('--idle-hours', type=int, default=None, help='Abandona carritos sin cambios (CART_ABANDON_AFTER_HOURS)')
+@click.option('--purge-days', type=int, default=None, help='Borra items de abandonados (CART_PURGE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Filas por transacción (CART_SWEEP_BATCH_SIZE)')
+@click.option('--pause-ms', type=float, default=0, help='Pausa entre lotes para no competir con el tráfico')
+def sweep_carts(idle_hours, purge_days, batch_size, pause_ms):
+    """
+    Marca como abandonados los carritos inactivos y purga los items viejos
+    Uso: flask carts sweep   (programarlo con cron, p. ej. cada hora)
+    """
+    from app.services import CartService
+    pause_seconds = pause_ms / 1000
+    
+    def report(label, stats):
+        click.echo(
+            f"{label}: {stats['rows']} filas en {stats['batches']} lotes, "
+            f"{stats['seconds']:.2f}s ({stats['rows_per_second']:.0f} filas/s)"
+        )
+    
+    report('Carritos abandonados', CartService.abandon_idle_carts(idle_hours, batch_size, pause_seconds))
+    report('Items purgados', CartService.purge_abandoned_items(purge_days, batch_size, pause_seconds))
+
+reports_cli = AppGroup('reports', help='Rollups de ventas')
+
+@reports_cli.command('rebuild')
+@click.option('--date-from', default=None, help='Primer día a recalcular (YYYY-MM-DD, por defecto la primera orden)')
+@click.option('--date-to', default=None, help='Último día a recalcular, inclusive (por defecto la última orden)')
+def rebuild_sales_rollups(date_from, date_to):
+    """
+    Recalcula los rollups de ventas desde orders/order_items (un mes por transacción)
+    Uso: flask reports rebuild --date-from 2026-01-01 --date-to 2026-01-31
+    """
+    from datetime import date, timedelta
+    from app.services import SalesReportService
+    try:
+        start_day = date.fromisoformat(date_from) if date_from else None
+        end_day = date.fromisoformat(date_to) + timedelta(days=1) if date_to else None
+    except ValueError:
+        raise click.BadParameter('Las fechas deben tener formato YYYY-MM-DD')
+    result = SalesReportService.rebuild(start_day, end_day)
+    click.echo(f"Días recalculados: {result['days']}, filas por producto: {result['product_rows']}")
+
+stock_cli = AppGroup('stock', help='Libro de movimientos de stock')
+
+@stock_cli.command('compact')
+@click.option('--batch-size', type=int, default=None, help='Productos por transacción (STOCK_COMPACT_BATCH_SIZE)')
+def compact_stock(batch_size):
+    """
+    Suma los movimientos pendientes (cancelaciones, devoluciones, reposiciones) al stock de cada producto
+    Uso: flask stock compact   (programarlo con cron, p. ej. cada 5 minutos)
+    """
+    from app.services import StockLedgerService
+    stats = StockLedgerService.compact(batch_size)
+    click.echo(
+        f"Movimientos compactados: {stats['movements']} en {stats['products']} productos "
+        f"({stats['batches']} lotes)"
+    )
+
+tokens_cli = AppGroup('tokens', help='Lista de revocación de tokens')
+
+@tokens_cli.command('purge')
+def purge_revoked_tokens():
+    """
+    Borra los tokens revocados con logout que ya expiraron
+    Uso: flask tokens purge   (programarlo con cron, p. ej. cada hora)
+    """
+    from app.utils import purge_revoked_tokens as purge
+    deleted = purge()
+    click.echo(f'Tokens revocados vencidos borrados: {deleted}')
+
+def register_commands(app):
+    """
+    Registra los comandos de mantenimiento en el CLI de Flask
+    """
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(invoices_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(carts_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(stock_cli)
+    app.cli.add_command(tokens_cli)
@@ -6,6 +6,7 @@ from app.controllers.order_controller import order_bp
 from app.controllers.invoice_controller import invoice_bp
 from app.controllers.address_controller import address_bp
 from app.controllers.payment_method_controller import payment_method_bp
+from app.controllers.report_controller import report_bp
 
 def register_blueprints(app):
     """
@@ -19,6 +20,7 @@ def register_blueprints(app):
     app.register_blueprint(invoice_bp)
     app.register_blueprint(address_bp)
     app.register_blueprint(payment_method_bp)
+    app.register_blueprint(report_bp)
 
 __all__ = [
     'auth_bp',
@@ -29,5 +31,6 @@ __all__ = [
     'invoice_bp',
     'address_bp',
     'payment_method_bp',
+    'report_bp',
     'register_blueprints'
 ]
\ No newline at end of file
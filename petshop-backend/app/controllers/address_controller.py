@@ -1,19 +1,19 @@
 from flask import Blueprint, request, jsonify
 from app.services import AddressService
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.middlewares import auth_required, current_identity, can_access, forbidden
 from werkzeug.exceptions import NotFound, BadRequest
 
 address_bp = Blueprint('addresses', __name__, url_prefix='/api/addresses')
 
 @address_bp.route('/', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_addresses():
     """
     Obtiene todas las direcciones del usuario actual
     GET /api/addresses/
     """
     try:
-        user_id = get_jwt_identity()
+        user_id = current_identity().user_id
         addresses = AddressService.get_addresses_by_user(user_id)
         
         return jsonify({
@@ -24,21 +24,18 @@ def get_addresses():
         return jsonify({'error': 'Error al obtener direcciones'}), 500
 
 @address_bp.route('/<int:address_id>', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_address(address_id):
     """
     Obtiene una dirección específica
     GET /api/addresses/<address_id>
     """
     try:
-        user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
         address = AddressService.get_address_by_id(address_id)
         
         # Verificar que es admin o el dueño de la dirección
-        if claims.get('role') != 'admin' and address.user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
+        if not can_access(address.user_id):
+            return forbidden()
         
         return jsonify(address.to_dict()), 200
         
@@ -48,7 +45,7 @@ def get_address(address_id):
         return jsonify({'error': 'Error al obtener dirección'}), 500
 
 @address_bp.route('/', methods=['POST'])
-@jwt_required()
+@auth_required()
 def create_address():
     """
     Crea una nueva dirección
@@ -66,7 +63,7 @@ def create_address():
     }
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         data = request.get_json()
         
         # Validar campos requeridos
@@ -97,21 +94,18 @@ def create_address():
         return jsonify({'error': 'Error al crear dirección'}), 500
 
 @address_bp.route('/<int:address_id>', methods=['PUT'])
-@jwt_required()
+@auth_required()
 def update_address(address_id):
     """
     Actualiza una dirección
     PUT /api/addresses/<address_id>
     """
     try:
-        user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
         address = AddressService.get_address_by_id(address_id)
         
         # Verificar que es admin o el dueño de la dirección
-        if claims.get('role') != 'admin' and address.user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
+        if not can_access(address.user_id):
+            return forbidden()
         
         data = request.get_json()
         address = AddressService.update_address(address_id, **data)
@@ -127,21 +121,18 @@ def update_address(address_id):
         return jsonify({'error': 'Error al actualizar dirección'}), 500
 
 @address_bp.route('/<int:address_id>', methods=['DELETE'])
-@jwt_required()
+@auth_required()
 def delete_address(address_id):
     """
     Elimina una dirección
     DELETE /api/addresses/<address_id>
     """
     try:
-        user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
         address = AddressService.get_address_by_id(address_id)
         
         # Verificar que es admin o el dueño de la dirección
-        if claims.get('role') != 'admin' and address.user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
+        if not can_access(address.user_id):
+            return forbidden()
         
         AddressService.delete_address(address_id)
         
@@ -153,14 +144,14 @@ def delete_address(address_id):
         return jsonify({'error': 'Error al eliminar dirección'}), 500
 
 @address_bp.route('/<int:address_id>/set-default', methods=['POST'])
-@jwt_required()
+@auth_required()
 def set_default(address_id):
     """
     Establece una dirección como predeterminada
     POST /api/addresses/<address_id>/set-default
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         address = AddressService.set_default_address(address_id, user_id)
         
         return jsonify({
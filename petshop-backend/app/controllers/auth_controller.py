@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from app.services import UserService, CartService
-from flask_jwt_extended import create_access_token
-from werkzeug.exceptions import BadRequest, Conflict
+from app.utils import revoke_token
+from app.middlewares import auth_required
+from flask_jwt_extended import create_access_token, get_jwt
+from werkzeug.exceptions import BadRequest, Conflict, TooManyRequests
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -56,6 +58,7 @@ def login():
     """
     Inicio de sesión
     POST /api/auth/login
+    429 + Retry-After al superar LOGIN_IP_BURST/LOGIN_ACCOUNT_BURST
     Body: {
         "email": "user@example.com",
         "password": "password123"
@@ -68,10 +71,10 @@ def login():
         if 'email' not in data or 'password' not in data:
             return jsonify({'error': 'Email y password son requeridos'}), 400
         
-        # Autenticar usuario
-        user = UserService.authenticate(data['email'], data['password'])
+        # Autenticar usuario (con límite de intentos por IP y por cuenta)
+        user = UserService.authenticate(data['email'], data['password'], remote_addr=request.remote_addr)
         
-        # Crear token JWT
+        # Crear token JWT (id, email y rol viajan en el token: la autorización no consulta users)
         access_token = create_access_token(
             identity=str(user.id),  # <- Convertir a string
             additional_claims={
@@ -86,7 +89,24 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except TooManyRequests as e:
+        headers = {'Retry-After': str(e.retry_after)} if e.retry_after is not None else {}
+        return jsonify({'error': str(e)}), 429, headers
     except BadRequest as e:
         return jsonify({'error': str(e)}), 401
     except Exception as e:
-        return jsonify({'error': 'Error al iniciar sesión'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error al iniciar sesión'}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@auth_required()
+def logout():
+    """
+    Cierra la sesión revocando el token actual (hasta que expire)
+    POST /api/auth/logout
+    """
+    try:
+        revoke_token(get_jwt())
+        return jsonify({'message': 'Sesión cerrada exitosamente'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Error al cerrar sesión'}), 500
\ No newline at end of file
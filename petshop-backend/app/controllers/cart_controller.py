@@ -1,20 +1,20 @@
 from flask import Blueprint, request, jsonify
 from app.services import CartService
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.middlewares import auth_required, current_identity
 from werkzeug.exceptions import NotFound, BadRequest
 
 cart_bp = Blueprint('cart', __name__, url_prefix='/api/cart')
 
 @cart_bp.route('/', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_cart():
     """
     Obtiene el carrito activo del usuario actual
     GET /api/cart/
     """
     try:
-        user_id = int(get_jwt_identity())
-        cart = CartService.get_or_create_active_cart(user_id)
+        user_id = current_identity().user_id
+        cart = CartService.get_or_create_active_cart(user_id, profile='items')
         
         # Incluir items del carrito
         cart_data = cart.to_dict()
@@ -26,8 +26,23 @@ def get_cart():
     except Exception as e:
         return jsonify({'error': 'Error al obtener carrito'}), 500
 
+@cart_bp.route('/summary', methods=['GET'])
+@auth_required()
+def get_cart_summary():
+    """
+    Unidades y subtotal del carrito activo (ícono del carrito, encabezados)
+    GET /api/cart/summary
+    Una sola consulta: lee los totales guardados en el carrito, sin cargar los items
+    """
+    try:
+        user_id = current_identity().user_id
+        return jsonify(CartService.get_cart_summary(user_id)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener carrito'}), 500
+
 @cart_bp.route('/items', methods=['POST'])
-@jwt_required()
+@auth_required()
 def add_item():
     """
     Agrega un producto al carrito
@@ -38,7 +53,7 @@ def add_item():
     }
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         data = request.get_json()
         
         # Validar campos requeridos
@@ -68,8 +83,50 @@ def add_item():
     except Exception as e:
         return jsonify({'error': 'Error al agregar producto al carrito'}), 500
 
+@cart_bp.route('/items', methods=['PUT'])
+@auth_required()
+def replace_items():
+    """
+    Reemplaza todos los items del carrito (p. ej. restaurar un carrito guardado)
+    PUT /api/cart/items
+    Body: {
+        "items": [
+            {"product_id": 1, "quantity": 2},
+            {"product_id": 3, "quantity": 1}
+        ]
+    }
+    También acepta la lista directamente como body. Los productos que no
+    están en la lista se quitan; la operación es todo o nada.
+    """
+    try:
+        user_id = current_identity().user_id
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else data
+        
+        if items is None:
+            return jsonify({'error': 'Campo items es requerido'}), 400
+        
+        cart = CartService.replace_cart_items(user_id, items)
+        
+        # Incluir items del carrito
+        cart_data = cart.to_dict()
+        cart_data['items'] = [item.to_dict() for item in cart.cart_items]
+        cart_data['total'] = float(cart.calculate_total())
+        
+        return jsonify({
+            'message': 'Carrito actualizado',
+            'cart': cart_data
+        }), 200
+        
+    except NotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al actualizar el carrito'}), 500
+
 @cart_bp.route('/items/<int:product_id>', methods=['PUT'])
-@jwt_required()
+@auth_required()
 def update_item(product_id):
     """
     Actualiza la cantidad de un producto en el carrito
@@ -79,7 +136,7 @@ def update_item(product_id):
     }
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         data = request.get_json()
         
         if 'quantity' not in data:
@@ -109,14 +166,14 @@ def update_item(product_id):
         return jsonify({'error': 'Error al actualizar item'}), 500
 
 @cart_bp.route('/items/<int:product_id>', methods=['DELETE'])
-@jwt_required()
+@auth_required()
 def remove_item(product_id):
     """
     Elimina un producto del carrito
     DELETE /api/cart/items/<product_id>
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         
         # Obtener carrito activo
         cart = CartService.get_or_create_active_cart(user_id)
@@ -140,14 +197,14 @@ def remove_item(product_id):
         return jsonify({'error': 'Error al eliminar producto'}), 500
 
 @cart_bp.route('/clear', methods=['DELETE'])
-@jwt_required()
+@auth_required()
 def clear_cart():
     """
     Vacía el carrito del usuario
     DELETE /api/cart/clear
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         
         # Obtener carrito activo
         cart = CartService.get_or_create_active_cart(user_id)
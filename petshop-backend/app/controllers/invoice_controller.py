@@ -1,60 +1,81 @@
-from flask import Blueprint, jsonify
-from app.services import InvoiceService
-from app import cache
-from app.utils import CacheKeys, CacheInvalidator
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from werkzeug.exceptions import NotFound
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.services import InvoiceService, InvoiceNumberService
+from app.utils import CacheTags, cached_view, parse_limit, parse_date_range, ndjson_lines
+from app.middlewares import auth_required, admin_required, can_access
+from datetime import datetime
+from werkzeug.exceptions import NotFound, BadRequest
 
 invoice_bp = Blueprint('invoices', __name__, url_prefix='/api/invoices')
 
+def _is_stream_request():
+    """
+    El modo NDJSON se transmite fila por fila y no pasa por el cache
+    """
+    return request.args.get('format') == 'ndjson'
+
+def _can_view_invoice(payload):
+    """
+    Admin ve todas las facturas; un cliente solo las de sus órdenes
+    """
+    return can_access(payload['owner_id'])
+
 @invoice_bp.route('/', methods=['GET'])
-@jwt_required()
-@cache.cached(timeout=600)  # Cache 10 minutos
+@admin_required()  # Antes del cache: solo admins llegan a la entrada compartida
+@cached_view(timeout=600, tags=[CacheTags.INVOICES], unless=_is_stream_request)  # Cache 10 minutos por página
 def get_all_invoices():
     """
-    Obtiene todas las facturas (solo admin)
-    GET /api/invoices/
-    Cache: 10 minutos (TTL=600s)
+    Obtiene las facturas paginadas (solo admin)
+    GET /api/invoices/?limit=50&cursor=<next_cursor>&status=paid&date_from=2024-01-01&date_to=2024-01-31
+    GET /api/invoices/?format=ndjson&status=paid  (todas las filas en streaming, sin cache)
+    Orden: más recientes primero (issued_at)
+    Cache: 10 minutos (TTL=600s) con stale-while-revalidate, una entrada por página
     Invalida: Al crear una nueva factura
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
-        invoices = InvoiceService.get_all_invoices()
+        start, end = parse_date_range(request.args.get('date_from'), request.args.get('date_to'))
+        status = request.args.get('status')
+        
+        if _is_stream_request():
+            rows = (
+                invoice.to_dict()
+                for invoice in InvoiceService.iter_invoices(status, start, end)
+            )
+            return Response(stream_with_context(ndjson_lines(rows)), mimetype='application/x-ndjson')
+        
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+        invoices, next_cursor = InvoiceService.get_invoices_page(
+            status, start, end,
+            limit=limit, cursor=request.args.get('cursor')
+        )
         
         return jsonify({
-            'invoices': [invoice.to_dict() for invoice in invoices]
+            'invoices': [invoice.to_dict() for invoice in invoices],
+            'next_cursor': next_cursor,
+            'limit': limit
         }), 200
         
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Error al obtener facturas'}), 500
 
 @invoice_bp.route('/<int:invoice_id>', methods=['GET'])
-@jwt_required()
-@cache.cached(timeout=1800)  # Cache 30 minutos
+@auth_required()
 def get_invoice(invoice_id):
     """
     Obtiene una factura por ID
     GET /api/invoices/<invoice_id>
-    Cache: 30 minutos (TTL=1800s) - las facturas no cambian
+    Cache: 30 minutos (TTL=1800s), una entrada compartida por factura;
+    los permisos se verifican en cada request
     """
     try:
-        claims = get_jwt()
-        user_id = int(get_jwt_identity())
-        
-        invoice = InvoiceService.get_invoice_by_id(invoice_id)
+        payload = InvoiceService.get_cached_payload('id', invoice_id, name=request.endpoint)
         
         # Verificar que es admin o el dueño de la orden
-        if claims.get('role') != 'admin' and invoice.order.user_id != user_id:
+        if not _can_view_invoice(payload):
             return jsonify({'error': 'Acceso denegado'}), 403
         
-        # Preparar respuesta completa
-        invoice_data = invoice.to_dict()
-        invoice_data['order'] = invoice.order.to_dict() if invoice.order else None
-        
-        return jsonify(invoice_data), 200
+        return jsonify(payload['invoice']), 200
         
     except NotFound as e:
         return jsonify({'error': str(e)}), 404
@@ -62,30 +83,21 @@ def get_invoice(invoice_id):
         return jsonify({'error': 'Error al obtener factura'}), 500
 
 @invoice_bp.route('/number/<string:invoice_number>', methods=['GET'])
-@jwt_required()
-@cache.cached(timeout=1800)  # Cache 30 minutos
+@auth_required()
 def get_invoice_by_number(invoice_number):
     """
     Obtiene una factura por número de factura
     GET /api/invoices/number/<invoice_number>
-    Cache: 30 minutos (TTL=1800s)
+    Cache: 30 minutos (TTL=1800s), una entrada compartida por factura
     """
     try:
-        claims = get_jwt()
-        user_id = int(get_jwt_identity())
-        
-        invoice = InvoiceService.get_invoice_by_number(invoice_number)
+        payload = InvoiceService.get_cached_payload('number', invoice_number, name=request.endpoint)
         
         # Verificar que es admin o el dueño de la orden
-        if claims.get('role') != 'admin' and invoice.order.user_id != user_id:
+        if not _can_view_invoice(payload):
             return jsonify({'error': 'Acceso denegado'}), 403
         
-        # Preparar respuesta completa
-        invoice_data = invoice.to_dict()
-        invoice_data['order'] = invoice.order.to_dict() if invoice.order else None
-        invoice_data['order_items'] = [item.to_dict() for item in invoice.order.order_items]
-        
-        return jsonify(invoice_data), 200
+        return jsonify(payload['invoice']), 200
         
     except NotFound as e:
         return jsonify({'error': str(e)}), 404
@@ -93,31 +105,45 @@ def get_invoice_by_number(invoice_number):
         return jsonify({'error': 'Error al obtener factura'}), 500
 
 @invoice_bp.route('/order/<int:order_id>', methods=['GET'])
-@jwt_required()
-@cache.cached(timeout=1800)  # Cache 30 minutos
+@auth_required()
 def get_invoice_by_order(order_id):
     """
     Obtiene una factura por ID de orden
     GET /api/invoices/order/<order_id>
-    Cache: 30 minutos (TTL=1800s)
+    Cache: 30 minutos (TTL=1800s), una entrada compartida por factura
     """
     try:
-        claims = get_jwt()
-        user_id = int(get_jwt_identity())
-        
-        invoice = InvoiceService.get_invoice_by_order_id(order_id)
+        payload = InvoiceService.get_cached_payload('order', order_id, name=request.endpoint)
         
         # Verificar que es admin o el dueño de la orden
-        if claims.get('role') != 'admin' and invoice.order.user_id != user_id:
+        if not _can_view_invoice(payload):
             return jsonify({'error': 'Acceso denegado'}), 403
         
-        # Preparar respuesta completa
-        invoice_data = invoice.to_dict()
-        invoice_data['order'] = invoice.order.to_dict() if invoice.order else None
-        
-        return jsonify(invoice_data), 200
+        return jsonify(payload['invoice']), 200
         
     except NotFound as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
-        return jsonify({'error': 'Error al obtener factura'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error al obtener factura'}), 500
+
+@invoice_bp.route('/number-gaps', methods=['GET'])
+@admin_required()
+def get_invoice_number_gaps():
+    """
+    Reporte de huecos en la numeración de facturas de un año (solo admin)
+    GET /api/invoices/number-gaps?year=2026  (por defecto el año actual)
+    Sin cache: se usa para auditar la numeración
+    """
+    try:
+        year = request.args.get('year', datetime.utcnow().year)
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            raise BadRequest("El año debe ser un número entero")
+        
+        return jsonify(InvoiceNumberService.gap_report(year)), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al generar el reporte de numeración'}), 500
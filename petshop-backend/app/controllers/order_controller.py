@@ -1,23 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services import OrderService, CartService
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.utils import parse_limit, parse_date_range, ndjson_lines
+from app.middlewares import (
+    auth_required, admin_required, idempotent, current_identity, is_admin, can_access, forbidden
+)
 from werkzeug.exceptions import NotFound, BadRequest
 
 order_bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
 @order_bp.route('/', methods=['POST'])
-@jwt_required()
+@auth_required()
+@idempotent()
 def create_order():
     """
     Crea una orden desde el carrito activo
     POST /api/orders/
+    Headers (opcional): Idempotency-Key: <uuid generado por el cliente>
     Body: {
         "address_id": 1,
         "payment_method_id": 1
     }
+    Con Idempotency-Key, los reintentos reciben la respuesta del primer request
+    (header Idempotent-Replayed: true) en lugar de crear otra orden.
     """
     try:
-        user_id = int(get_jwt_identity())
+        user_id = current_identity().user_id
         data = request.get_json()
         
         # Validar campos requeridos
@@ -53,46 +60,57 @@ def create_order():
         return jsonify({'error': f'Error al crear orden: {str(e)}'}), 500
 
 @order_bp.route('/', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_orders():
     """
-    Obtiene las órdenes del usuario actual o todas (si es admin)
-    GET /api/orders/
+    Obtiene las órdenes del usuario actual o todas (si es admin), paginadas
+    GET /api/orders/?limit=50&cursor=<next_cursor>&status=completed&date_from=2024-01-01&date_to=2024-01-31
+    GET /api/orders/?format=ndjson&date_from=2024-01-01  (todas las filas en streaming, sin paginar)
+    Orden: más recientes primero
     """
     try:
-        user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
-        if claims.get('role') == 'admin':
-            # Admin ve todas las órdenes
-            orders = OrderService.get_all_orders()
-        else:
-            # Usuario ve solo sus órdenes
-            orders = OrderService.get_orders_by_user(user_id)
+        # Admin ve todas las órdenes; un usuario solo las suyas
+        owner_id = None if is_admin() else current_identity().user_id
+        start, end = parse_date_range(request.args.get('date_from'), request.args.get('date_to'))
+        status = request.args.get('status')
+        
+        if request.args.get('format') == 'ndjson':
+            rows = (
+                order.to_dict()
+                for order in OrderService.iter_orders(owner_id, status, start, end)
+            )
+            return Response(stream_with_context(ndjson_lines(rows)), mimetype='application/x-ndjson')
+        
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+        orders, next_cursor = OrderService.get_orders_page(
+            owner_id, status, start, end,
+            limit=limit, cursor=request.args.get('cursor')
+        )
         
         return jsonify({
-            'orders': [order.to_dict() for order in orders]
+            'orders': [order.to_dict() for order in orders],
+            'next_cursor': next_cursor,
+            'limit': limit
         }), 200
         
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Error al obtener órdenes'}), 500
 
 @order_bp.route('/<int:order_id>', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_order(order_id):
     """
     Obtiene una orden específica
     GET /api/orders/<order_id>
     """
     try:
-        user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
-        order = OrderService.get_order_by_id(order_id)
+        order = OrderService.get_order_by_id(order_id, profile='detail')
         
         # Verificar que es admin o el dueño de la orden
-        if claims.get('role') != 'admin' and order.user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
+        if not can_access(order.user_id):
+            return forbidden()
         
         # Preparar respuesta completa
         order_data = order.to_dict()
@@ -108,18 +126,41 @@ def get_order(order_id):
     except Exception as e:
         return jsonify({'error': 'Error al obtener orden'}), 500
 
+@order_bp.route('/bulk-cancel', methods=['POST'])
+@admin_required()
+def bulk_cancel_orders():
+    """
+    Cancela varias órdenes en una transacción (solo admin)
+    POST /api/orders/bulk-cancel
+    Body: {"order_ids": [10, 11, 12]}  (máximo 500)
+    Respuesta: resultado por orden; las que fallan no impiden cancelar las demás
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        results = OrderService.cancel_orders(data.get('order_ids'))
+        cancelled = sum(1 for result in results if result['status'] == 'cancelled')
+        
+        return jsonify({
+            'results': results,
+            'cancelled': cancelled,
+            'failed': len(results) - cancelled
+        }), 200
+        
+    except NotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al cancelar órdenes'}), 500
+
 @order_bp.route('/<int:order_id>/cancel', methods=['POST'])
-@jwt_required()
+@admin_required()
 def cancel_order(order_id):
     """
     Cancela una orden (solo admin)
     POST /api/orders/<order_id>/cancel
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         order = OrderService.cancel_order(order_id)
         
         return jsonify({
@@ -135,17 +176,13 @@ def cancel_order(order_id):
         return jsonify({'error': 'Error al cancelar orden'}), 500
 
 @order_bp.route('/<int:order_id>/return', methods=['POST'])
-@jwt_required()
+@admin_required()
 def return_order(order_id):
     """
     Procesa una devolución (solo admin)
     POST /api/orders/<order_id>/return
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         order = OrderService.return_order(order_id)
         
         return jsonify({
@@ -1,19 +1,19 @@
 from flask import Blueprint, request, jsonify
 from app.services import PaymentMethodService
-from app import cache
-from app.utils import CacheKeys, CacheInvalidator
-from flask_jwt_extended import jwt_required, get_jwt
+from app.utils import CacheTags, CacheInvalidator, cached_view
+from app.middlewares import admin_required
 from werkzeug.exceptions import NotFound, BadRequest, Conflict
 
 payment_method_bp = Blueprint('payment_methods', __name__, url_prefix='/api/payment-methods')
 
 @payment_method_bp.route('/', methods=['GET'])
-@cache.cached(timeout=3600)  # Cache 1 hora
+@cached_view(timeout=3600, tags=[CacheTags.PAYMENT_METHODS], http_cache=True)  # Cache 1 hora
 def get_all_payment_methods():
     """
     Obtiene todos los métodos de pago activos (público)
     GET /api/payment-methods/
     Cache: 1 hora (TTL=3600s) - cambian muy raramente
+    HTTP: ETag + Cache-Control max-age=3600; If-None-Match -> 304
     Invalida: Al crear, actualizar, activar o desactivar métodos de pago
     """
     try:
@@ -27,17 +27,13 @@ def get_all_payment_methods():
         return jsonify({'error': 'Error al obtener métodos de pago'}), 500
 
 @payment_method_bp.route('/all', methods=['GET'])
-@jwt_required()
+@admin_required()
 def get_all_payment_methods_admin():
     """
     Obtiene todos los métodos de pago incluyendo inactivos (solo admin)
     GET /api/payment-methods/all
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         payment_methods = PaymentMethodService.get_all_payment_methods(only_active=False)
         
         return jsonify({
@@ -48,12 +44,13 @@ def get_all_payment_methods_admin():
         return jsonify({'error': 'Error al obtener métodos de pago'}), 500
 
 @payment_method_bp.route('/<int:payment_method_id>', methods=['GET'])
-@cache.cached(timeout=3600)  # Cache 1 hora
+@cached_view(timeout=3600, tags=lambda payment_method_id: [CacheTags.PAYMENT_METHOD.format(payment_method_id)], http_cache=True)  # Cache 1 hora
 def get_payment_method(payment_method_id):
     """
     Obtiene un método de pago específico (público)
     GET /api/payment-methods/<payment_method_id>
     Cache: 1 hora (TTL=3600s)
+    HTTP: ETag + Cache-Control max-age=3600; If-None-Match -> 304
     Invalida: Al actualizar el método de pago
     """
     try:
@@ -66,7 +63,7 @@ def get_payment_method(payment_method_id):
         return jsonify({'error': 'Error al obtener método de pago'}), 500
 
 @payment_method_bp.route('/', methods=['POST'])
-@jwt_required()
+@admin_required()
 def create_payment_method():
     """
     Crea un nuevo método de pago (solo admin)
@@ -78,10 +75,6 @@ def create_payment_method():
     }
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
         
         if 'name' not in data:
@@ -107,17 +100,13 @@ def create_payment_method():
         return jsonify({'error': 'Error al crear método de pago'}), 500
 
 @payment_method_bp.route('/<int:payment_method_id>', methods=['PUT'])
-@jwt_required()
+@admin_required()
 def update_payment_method(payment_method_id):
     """
     Actualiza un método de pago (solo admin)
     PUT /api/payment-methods/<payment_method_id>
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
         payment_method = PaymentMethodService.update_payment_method(payment_method_id, **data)
         
@@ -137,17 +126,13 @@ def update_payment_method(payment_method_id):
         return jsonify({'error': 'Error al actualizar método de pago'}), 500
 
 @payment_method_bp.route('/<int:payment_method_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required()
 def delete_payment_method(payment_method_id):
     """
     Elimina un método de pago (solo admin)
     DELETE /api/payment-methods/<payment_method_id>
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         PaymentMethodService.delete_payment_method(payment_method_id)
         
         # Invalidar cache del método de pago
@@ -163,17 +148,13 @@ def delete_payment_method(payment_method_id):
         return jsonify({'error': 'Error al eliminar método de pago'}), 500
 
 @payment_method_bp.route('/<int:payment_method_id>/activate', methods=['POST'])
-@jwt_required()
+@admin_required()
 def activate_payment_method(payment_method_id):
     """
     Activa un método de pago (solo admin)
     POST /api/payment-methods/<payment_method_id>/activate
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         payment_method = PaymentMethodService.activate_payment_method(payment_method_id)
         
         # Invalidar cache
@@ -190,17 +171,13 @@ def activate_payment_method(payment_method_id):
         return jsonify({'error': 'Error al activar método de pago'}), 500
 
 @payment_method_bp.route('/<int:payment_method_id>/deactivate', methods=['POST'])
-@jwt_required()
+@admin_required()
 def deactivate_payment_method(payment_method_id):
     """
     Desactiva un método de pago (solo admin)
     POST /api/payment-methods/<payment_method_id>/deactivate
     """
     try:
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         payment_method = PaymentMethodService.deactivate_payment_method(payment_method_id)
         
         # Invalidar cache
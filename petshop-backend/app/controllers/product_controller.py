@@ -1,39 +1,130 @@
-from flask import Blueprint, request, jsonify
-from app.services import ProductService
-from app import cache
-from app.utils import CacheKeys, CacheInvalidator
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from datetime import datetime
+from app.services import ProductService, SearchService, StockLedgerService
+from app.utils import (
+    CacheKeys, CacheTags, CacheInvalidator, cached_view, parse_limit, parse_date_range,
+    iter_csv_rows, iter_ndjson_rows, csv_lines, ndjson_lines
+)
+from app.middlewares import admin_required
 from werkzeug.exceptions import NotFound, BadRequest
 
 product_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
+# Formatos de importación/exportación masiva
+BULK_READERS = {'csv': iter_csv_rows, 'ndjson': iter_ndjson_rows}
+BULK_MIMETYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson'
+}
+
+def _products_page_cache_key():
+    """
+    Key de cache por página: categoría, orden, límite, cursor y campos
+    """
+    return CacheKeys.PRODUCTS_PAGE.format(
+        category=request.args.get('category', ''),
+        sort=request.args.get('sort', 'id'),
+        limit=request.args.get('limit', ''),
+        cursor=request.args.get('cursor', ''),
+        fields=request.args.get('fields', '')
+    )
+
+def _products_page_cache_tags():
+    """
+    Los listados filtrados dependen solo de su categoría
+    """
+    category = request.args.get('category')
+    if category:
+        return [CacheTags.CATEGORY.format(category)]
+    return [CacheTags.PRODUCTS]
+
 @product_bp.route('/', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)  # Cache 5 minutos, considera query params
+@cached_view(timeout=300, tags=_products_page_cache_tags, key_prefix=_products_page_cache_key, http_cache=True)  # Cache 5 minutos por página
 def get_all_products():
     """
-    Obtiene todos los productos (público)
-    GET /api/products/?category=alimento
-    Cache: 5 minutos (TTL=300s)
+    Obtiene los productos paginados (público)
+    GET /api/products/?category=alimento&limit=50&cursor=<next_cursor>&sort=-price&fields=id,name,price
+    Cache: 5 minutos (TTL=300s), una entrada por página
+    HTTP: ETag + Cache-Control max-age=300; If-None-Match -> 304
     Invalida: Al crear, actualizar o eliminar productos
     """
     try:
-        category = request.args.get('category')
-        products = ProductService.get_all_products(category=category)
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+        fields = request.args.get('fields')
+        fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+        
+        products, next_cursor = ProductService.get_products_page(
+            category=request.args.get('category'),
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'id'),
+            fields=fields
+        )
         
         return jsonify({
-            'products': [product.to_dict() for product in products]
+            'products': products,
+            'next_cursor': next_cursor,
+            'limit': limit
         }), 200
         
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Error al obtener productos'}), 500
 
+def _parse_price(name):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise BadRequest(f"{name} debe ser numérico")
+
+@product_bp.route('/search', methods=['GET'])
+@cached_view(timeout=300, tags=[CacheTags.PRODUCTS])  # Cache 5 minutos por consulta
+def search_products():
+    """
+    Búsqueda de texto completo con filtros y facetas (público)
+    GET /api/products/search?q=alimento perro&category=alimento&min_price=1000&max_price=50000&in_stock=true&page=1&limit=20
+    Los resultados se ordenan por relevancia cuando hay texto (score).
+    facets.category y facets.price muestran los conteos para cada opción de filtro.
+    Cache: 5 minutos (TTL=300s), una entrada por combinación de parámetros
+    Invalida: Al crear, actualizar o eliminar productos
+    """
+    try:
+        try:
+            page = int(request.args.get('page', 1))
+        except ValueError:
+            raise BadRequest("page debe ser un entero")
+        if page < 1:
+            raise BadRequest("page debe ser mayor o igual a 1")
+        
+        result = SearchService.search_products(
+            q=(request.args.get('q') or '').strip() or None,
+            category=request.args.get('category'),
+            min_price=_parse_price('min_price'),
+            max_price=_parse_price('max_price'),
+            in_stock=request.args.get('in_stock', '').lower() in ('1', 'true', 'yes'),
+            page=page,
+            limit=parse_limit(request.args.get('limit'), default=20, maximum=100)
+        )
+        return jsonify(result), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al buscar productos'}), 500
+
 @product_bp.route('/<int:product_id>', methods=['GET'])
-@cache.cached(timeout=600)  # Cache 10 minutos
+@cached_view(timeout=600, tags=lambda product_id: [CacheTags.PRODUCT.format(product_id)], http_cache=True)  # Cache 10 minutos
 def get_product(product_id):
     """
     Obtiene un producto por ID (público)
     GET /api/products/<product_id>
     Cache: 10 minutos (TTL=600s)
+    HTTP: ETag + Cache-Control max-age=600; If-None-Match -> 304
     Invalida: Al actualizar o eliminar el producto
     """
     try:
@@ -46,7 +137,7 @@ def get_product(product_id):
         return jsonify({'error': 'Error al obtener producto'}), 500
 
 @product_bp.route('/', methods=['POST'])
-@jwt_required()
+@admin_required()
 def create_product():
     """
     Crea un nuevo producto (solo admin)
@@ -61,11 +152,6 @@ def create_product():
     }
     """
     try:
-        # Verificar que es admin
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
         
         # Validar campos requeridos
@@ -84,7 +170,7 @@ def create_product():
         )
         
         # Invalidar cache de productos
-        CacheInvalidator.invalidate_products()  # <- AGREGAR ESTA LÍNEA
+        CacheInvalidator.invalidate_products(product.category)
         
         return jsonify({
             'message': 'Producto creado exitosamente',
@@ -97,7 +183,7 @@ def create_product():
         return jsonify({'error': 'Error al crear producto'}), 500
 
 @product_bp.route('/<int:product_id>', methods=['PUT'])
-@jwt_required()
+@admin_required()
 def update_product(product_id):
     """
     Actualiza un producto (solo admin)
@@ -109,16 +195,12 @@ def update_product(product_id):
     }
     """
     try:
-        # Verificar que es admin
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
+        old_category = ProductService.get_product_by_id(product_id).category
         product = ProductService.update_product(product_id, **data)
         
-        # Invalidar cache del producto
-        CacheInvalidator.invalidate_product(product_id)  # <- AGREGAR ESTA LÍNEA
+        # Invalidar cache del producto (categoría anterior y nueva)
+        CacheInvalidator.invalidate_product(product_id, old_category, product.category)
         
         return jsonify({
             'message': 'Producto actualizado exitosamente',
@@ -133,22 +215,18 @@ def update_product(product_id):
         return jsonify({'error': 'Error al actualizar producto'}), 500
 
 @product_bp.route('/<int:product_id>', methods=['DELETE'])
-@jwt_required()
+@admin_required()
 def delete_product(product_id):
     """
     Elimina un producto (solo admin)
     DELETE /api/products/<product_id>
     """
     try:
-        # Verificar que es admin
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
+        category = ProductService.get_product_by_id(product_id).category
         ProductService.delete_product(product_id)
         
         # Invalidar cache del producto
-        CacheInvalidator.invalidate_product(product_id)  # <- AGREGAR ESTA LÍNEA
+        CacheInvalidator.invalidate_product(product_id, category)
         
         return jsonify({'message': 'Producto eliminado exitosamente'}), 200
         
@@ -160,21 +238,17 @@ def delete_product(product_id):
         return jsonify({'error': 'Error al eliminar producto'}), 500
 
 @product_bp.route('/<int:product_id>/stock', methods=['PATCH'])
-@jwt_required()
+@admin_required()
 def update_stock(product_id):
     """
     Actualiza el stock de un producto (solo admin)
+    Se registra como movimiento 'adjustment' en el libro de stock
     PATCH /api/products/<product_id>/stock
     Body: {
         "quantity": 50  (positivo para agregar, negativo para reducir)
     }
     """
     try:
-        # Verificar que es admin
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
         
         if 'quantity' not in data:
@@ -183,7 +257,7 @@ def update_stock(product_id):
         product = ProductService.update_stock(product_id, data['quantity'])
         
         # Invalidar cache del producto
-        CacheInvalidator.invalidate_product(product_id)  # <- AGREGAR ESTA LÍNEA
+        CacheInvalidator.invalidate_product(product_id, product.category)
         
         return jsonify({
             'message': 'Stock actualizado exitosamente',
@@ -195,4 +269,114 @@ def update_stock(product_id):
     except BadRequest as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': 'Error al actualizar stock'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error al actualizar stock'}), 500
+
+@product_bp.route('/<int:product_id>/stock', methods=['GET'])
+@admin_required()
+def get_stock_at(product_id):
+    """
+    Stock disponible de un producto, actual o reconstruido a una fecha (solo admin)
+    GET /api/products/<product_id>/stock?at=2026-01-31T18:00:00
+    """
+    try:
+        at = request.args.get('at')
+        try:
+            at = datetime.fromisoformat(at) if at else datetime.utcnow()
+        except ValueError:
+            raise BadRequest("at debe ser una fecha ISO 8601 (YYYY-MM-DD)")
+        
+        return jsonify({
+            'product_id': product_id,
+            'at': at.isoformat(),
+            'stock': StockLedgerService.stock_at(product_id, at)
+        }), 200
+        
+    except NotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener el stock'}), 500
+
+@product_bp.route('/<int:product_id>/stock/movements', methods=['GET'])
+@admin_required()
+def get_stock_movements(product_id):
+    """
+    Movimientos de stock de un producto, más recientes primero (solo admin)
+    GET /api/products/<product_id>/stock/movements?limit=50&cursor=<next_cursor>&date_from=2026-01-01
+    """
+    try:
+        start, end = parse_date_range(request.args.get('date_from'), request.args.get('date_to'))
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+        movements, next_cursor = StockLedgerService.get_movements_page(
+            product_id, limit=limit, cursor=request.args.get('cursor'), start=start, end=end
+        )
+        
+        return jsonify({
+            'movements': [movement.to_dict() for movement in movements],
+            'next_cursor': next_cursor,
+            'limit': limit
+        }), 200
+        
+    except NotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener los movimientos de stock'}), 500
+
+@product_bp.route('/bulk', methods=['POST'])
+@admin_required()
+def bulk_import_products():
+    """
+    Importa o actualiza productos en lote (solo admin)
+    POST /api/products/bulk?format=csv|ndjson
+    Content-Type: text/csv o application/x-ndjson (alternativa a ?format=)
+    Body CSV:    name,price,stock,category,description,image_url[,id]
+    Body NDJSON: {"name": "...", "price": 1000, "stock": 5, ...} por línea
+    Filas con id actualizan el producto; sin id se insertan.
+    El body se lee como stream y se procesa en lotes con commit por lote.
+    """
+    try:
+        data_format = request.args.get('format') or BULK_MIMETYPES.get(request.mimetype)
+        if data_format not in BULK_READERS:
+            return jsonify({'error': 'Formato inválido. Use csv o ndjson'}), 400
+        
+        rows = BULK_READERS[data_format](request.stream)
+        summary = ProductService.bulk_upsert(rows)
+        
+        return jsonify({
+            'message': 'Importación finalizada',
+            'summary': summary
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Error al importar productos'}), 500
+
+@product_bp.route('/export', methods=['GET'])
+@admin_required()
+def export_products():
+    """
+    Exporta el catálogo completo como stream (solo admin)
+    GET /api/products/export?format=csv|ndjson&category=alimento
+    Las filas se leen en bloques y se escriben a medida que se generan.
+    """
+    data_format = request.args.get('format', 'csv')
+    if data_format not in BULK_READERS:
+        return jsonify({'error': 'Formato inválido. Use csv o ndjson'}), 400
+    
+    rows = (
+        product.to_dict()
+        for product in ProductService.iter_products(category=request.args.get('category'))
+    )
+    
+    if data_format == 'csv':
+        body, mimetype = csv_lines(rows, ProductService.PROJECTABLE_FIELDS), 'text/csv'
+    else:
+        body, mimetype = ndjson_lines(rows), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=products.{data_format}'}
+    )
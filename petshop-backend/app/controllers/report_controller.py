@@ -0,0 +1,67 @@
+from flask import Blueprint, jsonify, request
+from app.services import SalesReportService
+from app.utils import parse_limit, parse_date_range
+from app.middlewares import admin_required
+from werkzeug.exceptions import BadRequest
+
+report_bp = Blueprint('reports', __name__, url_prefix='/api/reports')
+
+def _date_range():
+    return parse_date_range(request.args.get('date_from'), request.args.get('date_to'))
+
+@report_bp.route('/sales', methods=['GET'])
+@admin_required()
+def get_sales_report():
+    """
+    Ventas por período desde el rollup diario (solo admin)
+    GET /api/reports/sales?granularity=day|week|month&date_from=2026-01-01&date_to=2026-03-31
+    """
+    try:
+        start, end = _date_range()
+        report = SalesReportService.sales_report(
+            granularity=request.args.get('granularity', 'day'),
+            start=start, end=end
+        )
+        return jsonify(report), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener el reporte de ventas'}), 500
+
+@report_bp.route('/top-products', methods=['GET'])
+@admin_required()
+def get_top_products():
+    """
+    Productos más vendidos del rango (solo admin)
+    GET /api/reports/top-products?date_from=2026-01-01&date_to=2026-01-31&limit=10&by=revenue|units
+    """
+    try:
+        start, end = _date_range()
+        limit = parse_limit(request.args.get('limit'), default=10, maximum=100)
+        products = SalesReportService.top_products(
+            start=start, end=end, limit=limit,
+            by=request.args.get('by', 'revenue')
+        )
+        return jsonify({'products': products, 'limit': limit}), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener el top de productos'}), 500
+
+@report_bp.route('/category-revenue', methods=['GET'])
+@admin_required()
+def get_category_revenue():
+    """
+    Revenue y unidades por categoría del rango (solo admin)
+    GET /api/reports/category-revenue?date_from=2026-01-01&date_to=2026-01-31
+    """
+    try:
+        start, end = _date_range()
+        return jsonify({'categories': SalesReportService.category_revenue(start=start, end=end)}), 200
+        
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Error al obtener el revenue por categoría'}), 500
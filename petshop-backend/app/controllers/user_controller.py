@@ -1,43 +1,52 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services import UserService
-from app.middlewares import admin_required
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.utils import parse_limit, parse_date_range, ndjson_lines
+from app.middlewares import auth_required, admin_required, self_or_admin_required, current_identity
 from werkzeug.exceptions import NotFound, BadRequest, Conflict
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
 @user_bp.route('/', methods=['GET'])
-@jwt_required()
 @admin_required()
 def get_all_users():
     """
-    Obtiene todos los usuarios (solo admin)
-    GET /api/users/
+    Obtiene los usuarios paginados (solo admin)
+    GET /api/users/?limit=50&cursor=<next_cursor>&role=client&date_from=2024-01-01&date_to=2024-01-31
+    GET /api/users/?format=ndjson  (todas las filas en streaming, sin paginar)
+    Orden: registrados más recientemente primero
     """
     try:
-        users = UserService.get_all_users()
+        start, end = parse_date_range(request.args.get('date_from'), request.args.get('date_to'))
+        role = request.args.get('role')
+        
+        if request.args.get('format') == 'ndjson':
+            rows = (user.to_dict() for user in UserService.iter_users(role, start, end))
+            return Response(stream_with_context(ndjson_lines(rows)), mimetype='application/x-ndjson')
+        
+        limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+        users, next_cursor = UserService.get_users_page(
+            role, start, end,
+            limit=limit, cursor=request.args.get('cursor')
+        )
         return jsonify({
-            'users': [user.to_dict() for user in users]
+            'users': [user.to_dict() for user in users],
+            'next_cursor': next_cursor,
+            'limit': limit
         }), 200
         
+    except BadRequest as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Error al obtener usuarios'}), 500
 
 @user_bp.route('/<int:user_id>', methods=['GET'])
-@jwt_required()
+@self_or_admin_required()
 def get_user(user_id):
     """
-    Obtiene un usuario por ID
+    Obtiene un usuario por ID (el propio usuario o admin)
     GET /api/users/<user_id>
     """
     try:
-        # Verificar que es admin o el mismo usuario
-        current_user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
-        if claims.get('role') != 'admin' and current_user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         user = UserService.get_user_by_id(user_id)
         return jsonify(user.to_dict()), 200
         
@@ -47,10 +56,10 @@ def get_user(user_id):
         return jsonify({'error': 'Error al obtener usuario'}), 500
 
 @user_bp.route('/<int:user_id>', methods=['PUT'])
-@jwt_required()
+@self_or_admin_required()
 def update_user(user_id):
     """
-    Actualiza un usuario
+    Actualiza un usuario (el propio usuario o admin)
     PUT /api/users/<user_id>
     Body: {
         "first_name": "Juan",
@@ -59,13 +68,6 @@ def update_user(user_id):
     }
     """
     try:
-        # Verificar que es admin o el mismo usuario
-        current_user_id = int(get_jwt_identity())
-        claims = get_jwt()
-        
-        if claims.get('role') != 'admin' and current_user_id != user_id:
-            return jsonify({'error': 'Acceso denegado'}), 403
-        
         data = request.get_json()
         user = UserService.update_user(user_id, **data)
         
@@ -82,7 +84,6 @@ def update_user(user_id):
         return jsonify({'error': 'Error al actualizar usuario'}), 500
 
 @user_bp.route('/<int:user_id>', methods=['DELETE'])
-@jwt_required()
 @admin_required()
 def delete_user(user_id):
     """
@@ -102,14 +103,14 @@ def delete_user(user_id):
         return jsonify({'error': 'Error al eliminar usuario'}), 500
 
 @user_bp.route('/me', methods=['GET'])
-@jwt_required()
+@auth_required()
 def get_current_user():
     """
     Obtiene el usuario actual (basado en el token)
     GET /api/users/me
     """
     try:
-        current_user_id = int(get_jwt_identity())
+        current_user_id = current_identity().user_id
         user = UserService.get_user_by_id(current_user_id)
         return jsonify(user.to_dict()), 200
         
@@ -119,7 +120,7 @@ def get_current_user():
         return jsonify({'error': 'Error al obtener usuario actual'}), 500
 
 @user_bp.route('/change-password', methods=['POST'])
-@jwt_required()
+@auth_required()
 def change_password():
     """
     Cambia la contraseña del usuario actual
@@ -130,7 +131,7 @@ def change_password():
     }
     """
     try:
-        current_user_id = int(get_jwt_identity())
+        current_user_id = current_identity().user_id
         data = request.get_json()
         
         if 'old_password' not in data or 'new_password' not in data:
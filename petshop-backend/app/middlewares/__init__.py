@@ -1,7 +1,22 @@
-from app.middlewares.auth_middleware import admin_required, client_required, role_required
+from app.middlewares.auth_middleware import (
+    Identity, current_identity, is_admin, can_access, forbidden,
+    auth_required, admin_required, client_required, role_required, self_or_admin_required
+)
+from app.middlewares.idempotency import idempotent
+from app.middlewares.instrumentation import init_instrumentation, MetricsRegistry
 
 __all__ = [
+    'Identity',
+    'current_identity',
+    'is_admin',
+    'can_access',
+    'forbidden',
+    'auth_required',
     'admin_required',
     'client_required',
-    'role_required'
+    'role_required',
+    'self_or_admin_required',
+    'idempotent',
+    'init_instrumentation',
+    'MetricsRegistry'
 ]
\ No newline at end of file
@@ -1,58 +1,111 @@
+from collections import namedtuple
 from functools import wraps
-from flask import jsonify
+from flask import g, jsonify, request
 from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from app import jwt
+from app.utils import is_token_revoked, issued_at_ms
 
-def admin_required():
+# Lo que las rutas necesitan del usuario viaja en el token (ver auth_controller.login):
+# la autorización no carga el usuario; el estado de revocación se lee del cache (ver token_revocation)
+Identity = namedtuple('Identity', ['user_id', 'role', 'email'])
+
+@jwt.additional_claims_loader
+def _issued_at_claims(identity):
+    # Para comparar con el corte de revocación con resolución de milisegundos
+    return {'iat_ms': issued_at_ms()}
+
+@jwt.token_in_blocklist_loader
+def _check_revoked(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload)
+
+@jwt.revoked_token_loader
+def _revoked_response(jwt_header, jwt_payload):
+    return jsonify({'error': 'Token revocado. Inicie sesión nuevamente'}), 401
+
+def current_identity():
     """
-    Decorador para proteger rutas que solo pueden acceder administradores
-    Uso: @admin_required()
+    Identidad del token de la petición: se decodifica y se valida contra la
+    lista de revocación una sola vez por request, aunque se consulte varias veces
+    Se guarda en g junto al request (en tests el contexto de app se comparte entre requests)
+    """
+    cached = g.get('auth_identity')
+    if cached is not None and cached[0] is request._get_current_object():
+        return cached[1]
+    
+    verify_jwt_in_request()
+    claims = get_jwt()
+    identity = Identity(int(claims['sub']), claims.get('role'), claims.get('email'))
+    g.auth_identity = (request._get_current_object(), identity)
+    return identity
+
+def is_admin():
+    return current_identity().role == 'admin'
+
+def can_access(owner_id):
+    """
+    True si el usuario del token es admin o el dueño del recurso
+    """
+    identity = current_identity()
+    return identity.role == 'admin' or identity.user_id == owner_id
+
+def forbidden(message='Acceso denegado'):
+    return jsonify({'error': message}), 403
+
+def auth_required():
+    """
+    Decorador para rutas que requieren un usuario autenticado (reemplaza a @jwt_required())
+    Uso: @auth_required()
     """
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
-            
-            if claims.get('role') != 'admin':
-                return jsonify({'error': 'Acceso denegado. Se requiere rol de administrador'}), 403
-            
+            current_identity()
             return fn(*args, **kwargs)
         return decorator
     return wrapper
 
-def client_required():
+def role_required(roles, message=None):
     """
-    Decorador para proteger rutas que solo pueden acceder clientes
-    Uso: @client_required()
+    Decorador para proteger rutas que requieren roles específicos
+    Verifica el token por sí mismo: no hace falta apilar @auth_required()
+    Uso: @role_required(['admin', 'client'])
     """
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
-            
-            if claims.get('role') != 'client':
-                return jsonify({'error': 'Acceso denegado. Se requiere rol de cliente'}), 403
+            if current_identity().role not in roles:
+                return forbidden(message or f'Acceso denegado. Se requiere uno de estos roles: {", ".join(roles)}')
             
             return fn(*args, **kwargs)
         return decorator
     return wrapper
 
-def role_required(roles):
+def admin_required():
     """
-    Decorador para proteger rutas que requieren roles específicos
-    Uso: @role_required(['admin', 'client'])
+    Decorador para proteger rutas que solo pueden acceder administradores
+    Uso: @admin_required()
+    """
+    return role_required(['admin'], 'Acceso denegado. Se requiere rol de administrador')
+
+def client_required():
+    """
+    Decorador para proteger rutas que solo pueden acceder clientes
+    Uso: @client_required()
+    """
+    return role_required(['client'], 'Acceso denegado. Se requiere rol de cliente')
+
+def self_or_admin_required(arg='user_id'):
+    """
+    Decorador para rutas de un usuario (/<int:user_id>): el propio usuario o un admin
+    Se decide con el token, sin cargar el usuario
+    Uso: @self_or_admin_required()
     """
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            verify_jwt_in_request()
-            claims = get_jwt()
-            user_role = claims.get('role')
-            
-            if user_role not in roles:
-                return jsonify({'error': f'Acceso denegado. Se requiere uno de estos roles: {", ".join(roles)}'}), 403
+            if not can_access(kwargs[arg]):
+                return forbidden()
             
             return fn(*args, **kwargs)
         return decorator
-    return wrapper
\ No newline at end of file
+    return wrapper
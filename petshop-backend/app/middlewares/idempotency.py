@@ -0,0 +1,72 @@
+import hashlib
+from functools import wraps
+from flask import current_app, jsonify, make_response, request
+from app.middlewares.auth_middleware import current_identity
+from werkzeug.exceptions import Conflict, UnprocessableEntity
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+def _request_hash():
+    """
+    Huella del request: una key solo puede reutilizarse con el mismo método, ruta y body
+    """
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def idempotent():
+    """
+    Decorador para rutas POST que aceptan el header Idempotency-Key
+    El primer request se ejecuta y su respuesta (2xx o 4xx) se guarda; los
+    reintentos con la misma key reciben esa respuesta con 'Idempotent-Replayed: true'.
+    Un duplicado que llega mientras el original se procesa espera su resultado.
+    Los errores 5xx liberan la key para que el reintento vuelva a ejecutarse.
+    Debe ir después de @auth_required() (las keys son por usuario).
+    Uso: @idempotent()
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            from app.services import IdempotencyService
+            
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return fn(*args, **kwargs)
+            if len(key) > 255:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} no puede superar 255 caracteres'}), 400
+            
+            try:
+                record, is_new = IdempotencyService.begin(current_identity().user_id, key, _request_hash())
+            except UnprocessableEntity as e:
+                return jsonify({'error': str(e)}), 422
+            except Conflict as e:
+                return jsonify({'error': str(e)}), 409
+            
+            if not is_new:
+                response = current_app.response_class(
+                    record.response_body,
+                    status=record.response_code,
+                    content_type=record.response_content_type
+                )
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            
+            record_id = record.id
+            try:
+                response = make_response(fn(*args, **kwargs))
+            except Exception:
+                IdempotencyService.release(record_id)
+                raise
+            
+            if response.status_code >= 500:
+                IdempotencyService.release(record_id)
+            else:
+                IdempotencyService.complete(
+                    record_id, response.status_code,
+                    response.get_data(as_text=True), response.content_type
+                )
+            return response
+        return decorator
+    return wrapper
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from app import db
+
+slow_query_logger = logging.getLogger('petshop.slow_query')
+
+class _Summary:
+    """
+    Suma, conteo y una ventana de las últimas observaciones para calcular percentiles
+    """
+    
+    def __init__(self, window):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=window)
+    
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+    
+    def quantiles(self, qs):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in qs}
+
+class MetricsRegistry:
+    """
+    Métricas por ruta (endpoint + método) en memoria del proceso
+    Cada worker de gunicorn tiene las suyas; Prometheus las agrega por instancia.
+    """
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self.duration = defaultdict(lambda: _Summary(self.window))
+        self.db_time = defaultdict(lambda: _Summary(self.window))
+        self.queries = defaultdict(lambda: _Summary(self.window))
+        self.responses = defaultdict(int)
+        self.slow_queries = defaultdict(int)
+    
+    def observe_request(self, route, status, duration, db_time, query_count):
+        with self._lock:
+            self.duration[route].observe(duration)
+            self.db_time[route].observe(db_time)
+            self.queries[route].observe(query_count)
+            self.responses[route + (str(status),)] += 1
+    
+    def observe_slow_query(self, route):
+        with self._lock:
+            self.slow_queries[route] += 1
+    
+    def render(self, cache_stats=None, outbox_stats=None, login_stats=None):
+        """
+        Formato de texto de Prometheus (exposition format 0.0.4)
+        """
+        lines = []
+        
+        def labels(route, **extra):
+            endpoint, method = route
+            pairs = [('endpoint', endpoint), ('method', method)] + list(extra.items())
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+        
+        def summary(name, help_text, series):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} summary')
+            for route, data in sorted(series.items()):
+                for q, value in data.quantiles(self.QUANTILES).items():
+                    lines.append(f'{name}{labels(route, quantile=q)} {value:.6f}')
+                lines.append(f'{name}_sum{labels(route)} {data.sum:.6f}')
+                lines.append(f'{name}_count{labels(route)} {data.count}')
+        
+        with self._lock:
+            summary('petshop_request_duration_seconds', 'Latencia de los requests por ruta', self.duration)
+            summary('petshop_request_db_seconds', 'Tiempo en la base de datos por request', self.db_time)
+            summary('petshop_request_queries', 'Consultas SQL por request', self.queries)
+            
+            lines.append('# HELP petshop_requests_total Requests atendidos por ruta y status')
+            lines.append('# TYPE petshop_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                lines.append(f'petshop_requests_total{labels((endpoint, method), status=status)} {count}')
+            
+            lines.append('# HELP petshop_slow_queries_total Consultas sobre SLOW_QUERY_MS por ruta')
+            lines.append('# TYPE petshop_slow_queries_total counter')
+            for route, count in sorted(self.slow_queries.items()):
+                lines.append(f'petshop_slow_queries_total{labels(route)} {count}')
+        
+        if cache_stats is not None:
+            lines.append('# HELP petshop_cache_events_total Eventos de cache por vista (ver CacheStats)')
+            lines.append('# TYPE petshop_cache_events_total counter')
+            for name, counters in sorted(cache_stats.items()):
+                for cache_event, count in counters.items():
+                    lines.append(
+                        f'petshop_cache_events_total{{endpoint="{name}",event="{cache_event}"}} {count}'
+                    )
+        
+        if outbox_stats is not None:
+            lines.append('# HELP petshop_outbox_events Eventos del outbox por estado (ver OutboxService)')
+            lines.append('# TYPE petshop_outbox_events gauge')
+            for status, count in outbox_stats['by_status'].items():
+                lines.append(f'petshop_outbox_events{{status="{status}"}} {count}')
+            lines.append('# HELP petshop_outbox_lag_seconds Antigüedad del evento pendiente más viejo')
+            lines.append('# TYPE petshop_outbox_lag_seconds gauge')
+            lines.append(f"petshop_outbox_lag_seconds {outbox_stats['lag_seconds']:.3f}")
+        
+        if login_stats is not None:
+            lines.append('# HELP petshop_login_events_total Intentos de login por resultado (ver LoginStats)')
+            lines.append('# TYPE petshop_login_events_total counter')
+            for login_event, count in login_stats['events'].items():
+                lines.append(f'petshop_login_events_total{{event="{login_event}"}} {count}')
+            lines.append('# HELP petshop_password_hash_seconds Tiempo en hashes de contraseña')
+            lines.append('# TYPE petshop_password_hash_seconds summary')
+            for operation, timing in sorted(login_stats['hash'].items()):
+                lines.append(f'petshop_password_hash_seconds_sum{{operation="{operation}"}} {timing["sum"]:.6f}')
+                lines.append(f'petshop_password_hash_seconds_count{{operation="{operation}"}} {timing["count"]}')
+            lines.append('# HELP petshop_password_hash_max_seconds Hash de contraseña más lento')
+            lines.append('# TYPE petshop_password_hash_max_seconds gauge')
+            for operation, timing in sorted(login_stats['hash'].items()):
+                lines.append(f'petshop_password_hash_max_seconds{{operation="{operation}"}} {timing["max"]:.6f}')
+        
+        return '\n'.join(lines) + '\n'
+
+def _current_route():
+    return (request.endpoint or 'unmatched', request.method)
+
+def init_instrumentation(app):
+    """
+    Registra la instrumentación de requests y SQL en la app (opt-in con METRICS_ENABLED)
+    - before_request/after_request: latencia por ruta
+    - before/after_cursor_execute: tiempo en DB y número de consultas del request
+    - GET /metrics: métricas en formato de texto de Prometheus
+    - Log 'petshop.slow_query': consultas sobre SLOW_QUERY_MS y requests sobre SLOW_REQUEST_MS
+    """
+    registry = MetricsRegistry(window=app.config.get('METRICS_WINDOW', 1024))
+    app.extensions['metrics'] = registry
+    slow_query_seconds = app.config.get('SLOW_QUERY_MS', 200) / 1000
+    slow_request_seconds = app.config.get('SLOW_REQUEST_MS', 1000) / 1000
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics = {'start': time.perf_counter(), 'db_time': 0.0, 'queries': 0}
+    
+    @app.after_request
+    def record_request_metrics(response):
+        metrics = g.pop('metrics', None)
+        if metrics is None or request.endpoint == 'metrics':
+            return response
+        
+        duration = time.perf_counter() - metrics['start']
+        route = _current_route()
+        registry.observe_request(route, response.status_code, duration, metrics['db_time'], metrics['queries'])
+        
+        if duration >= slow_request_seconds:
+            slow_query_logger.warning(
+                'Request lento %s %s: %.1fms, %d consultas, %.1fms en DB',
+                route[1], request.path, duration * 1000, metrics['queries'], metrics['db_time'] * 1000
+            )
+        return response
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+    
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if not has_request_context() or request.endpoint == 'metrics':
+            return
+        
+        metrics = g.get('metrics')
+        if metrics is not None:
+            metrics['db_time'] += elapsed
+            metrics['queries'] += 1
+        
+        if elapsed >= slow_query_seconds:
+            route = _current_route()
+            registry.observe_slow_query(route)
+            slow_query_logger.warning(
+                'Consulta lenta (%.1fms) en %s: %s',
+                elapsed * 1000, route[0], ' '.join(statement.split())[:1000]
+            )
+    
+    def handle_error(exception_context):
+        # La consulta falló: after_cursor_execute no se ejecuta
+        if exception_context.connection is not None:
+            starts = exception_context.connection.info.get('query_start')
+            if starts:
+                starts.pop()
+    
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(db.engine, 'handle_error', handle_error)
+    
+    @app.route('/metrics')
+    def metrics():
+        from app.utils import CacheStats, LoginStats
+        from app.services import OutboxService
+        body = registry.render(
+            cache_stats=CacheStats.snapshot(),
+            outbox_stats=OutboxService.stats(),
+            login_stats=LoginStats.snapshot()
+        )
+        return body, 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    
+    return registry
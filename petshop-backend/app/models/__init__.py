@@ -1,4 +1,5 @@
 from app.models.user import User
+from app.models.stock_movement import StockMovement
 from app.models.product import Product
 from app.models.cart import Cart
 from app.models.cart_item import CartItem
@@ -7,6 +8,13 @@ from app.models.payment_method import PaymentMethod
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.invoice import Invoice
+from app.models.idempotency_key import IdempotencyKey
+from app.models.invoice_sequence import InvoiceSequence
+from app.models.outbox_event import OutboxEvent
+from app.models.sales_daily import SalesDaily
+from app.models.product_sales_daily import ProductSalesDaily
+from app.models.product_sales_monthly import ProductSalesMonthly
+from app.models.revoked_token import RevokedToken
 
 __all__ = [
     'User',
@@ -17,5 +25,13 @@ __all__ = [
     'PaymentMethod',
     'Order',
     'OrderItem',
-    'Invoice'
+    'Invoice',
+    'IdempotencyKey',
+    'InvoiceSequence',
+    'OutboxEvent',
+    'SalesDaily',
+    'ProductSalesDaily',
+    'ProductSalesMonthly',
+    'StockMovement',
+    'RevokedToken'
 ]
\ No newline at end of file
@@ -4,6 +4,11 @@ from datetime import datetime
 class Address(db.Model):
     __tablename__ = 'addresses'
     
+    # Índices: direcciones de un usuario
+    __table_args__ = (
+        db.Index('ix_addresses_user_id', 'user_id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -4,20 +4,35 @@ from datetime import datetime
 class Cart(db.Model):
     __tablename__ = 'carts'
     
+    # Índices: búsqueda del carrito por usuario/estado, un solo carrito activo por
+    # usuario y carritos inactivos por estado (flask carts sweep)
+    __table_args__ = (
+        db.Index('ix_carts_user_id_status', 'user_id', 'status'),
+        db.Index('ix_carts_status_updated_at', 'status', 'updated_at', 'id'),
+        db.Index(
+            'uq_carts_user_active', 'user_id', unique=True,
+            postgresql_where=db.text("status = 'active'"),
+            sqlite_where=db.text("status = 'active'")
+        ),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     status = db.Column(db.Enum('active', 'completed', 'abandoned', name='cart_status'), 
                        nullable=False, default='active')
+    # Totales desnormalizados: CartService los actualiza en cada cambio de items
+    # (ver CartService.check_totals para detectar y corregir diferencias)
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Unidades
+    subtotal = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     cart_items = db.relationship('CartItem', backref='cart', lazy=True, cascade='all, delete-orphan')
     
     def calculate_total(self):
-        """Calcula el total del carrito"""
-        total = sum(item.quantity * item.unit_price for item in self.cart_items)
-        return total
+        """Total del carrito (columna subtotal, sin recorrer los items)"""
+        return self.subtotal
     
     def to_dict(self):
         """Convierte el objeto a diccionario"""
@@ -25,6 +40,8 @@ class Cart(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'status': self.status,
+            'item_count': self.item_count,
+            'subtotal': float(self.subtotal) if self.subtotal is not None else 0.0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -3,6 +3,12 @@ from app import db
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
     
+    # Índices: items de un carrito y búsqueda de un producto dentro del carrito
+    __table_args__ = (
+        db.Index('ix_cart_items_cart_id_product_id', 'cart_id', 'product_id'),
+        db.Index('ix_cart_items_product_id', 'product_id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     cart_id = db.Column(db.Integer, db.ForeignKey('carts.id'), nullable=False)
@@ -0,0 +1,27 @@
+from app import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    # Una key por usuario; la restricción única es el lock entre requests duplicados
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    # Columnas
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 de método, ruta y body
+    status = db.Column(db.Enum('processing', 'completed', name='idempotency_status'),
+                       nullable=False, default='processing')
+    response_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    response_content_type = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} - User {self.user_id} ({self.status})>'
@@ -4,6 +4,12 @@ from datetime import datetime
 class Invoice(db.Model):
     __tablename__ = 'invoices'
     
+    # Índices alineados con los listados (por estado y fecha de emisión)
+    __table_args__ = (
+        db.Index('ix_invoices_status_issued_at', 'status', 'issued_at', 'id'),
+        db.Index('ix_invoices_issued_at', 'issued_at', 'id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, unique=True)
@@ -16,11 +22,7 @@ class Invoice(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     
     # Relaciones ya definidas a través de backref en Order
-    
-    def generate_invoice_number(self):
-        """Genera un número de factura único"""
-        timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        return f'INV-{timestamp}-{self.order_id}'
+    # invoice_number lo asigna InvoiceNumberService (correlativo por año)
     
     def to_dict(self):
         """Convierte el objeto a diccionario"""
@@ -0,0 +1,21 @@
+from app import db
+from datetime import datetime
+
+class InvoiceSequence(db.Model):
+    __tablename__ = 'invoice_sequences'
+    
+    # Una fila por prefijo (p. ej. 'INV-2026'): la numeración reinicia cada año
+    prefix = db.Column(db.String(20), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)  # Primer número aún no reservado
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'prefix': self.prefix,
+            'next_value': self.next_value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<InvoiceSequence {self.prefix} next={self.next_value}>'
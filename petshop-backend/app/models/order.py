@@ -4,6 +4,14 @@ from datetime import datetime
 class Order(db.Model):
     __tablename__ = 'orders'
     
+    # Índices alineados con los listados (más recientes primero, paginación por keyset)
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_created_at', 'created_at', 'id'),
+        db.Index('ix_orders_cart_id', 'cart_id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
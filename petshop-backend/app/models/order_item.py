@@ -3,6 +3,12 @@ from app import db
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
+    # Índices: items de una orden y ventas por producto
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_id', 'product_id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
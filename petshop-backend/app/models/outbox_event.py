@@ -0,0 +1,39 @@
+from app import db
+from datetime import datetime
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    
+    # El worker busca los pendientes disponibles en orden de llegada
+    __table_args__ = (
+        db.Index('ix_outbox_events_status_available_at', 'status', 'available_at', 'id'),
+    )
+    
+    # Columnas
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)  # Ver OUTBOX_HANDLERS
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.Enum('pending', 'processing', 'done', 'failed', name='outbox_status'),
+                       nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # Backoff entre reintentos
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    processed_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'event_type': self.event_type,
+            'payload': self.payload,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type} ({self.status})>'
@@ -1,9 +1,17 @@
 from app import db
+from app.models.stock_movement import StockMovement
 from datetime import datetime
+from sqlalchemy import DDL, event, func, select
+from sqlalchemy.orm import column_property
 
 class Product(db.Model):
     __tablename__ = 'products'
     
+    # Índices: listados filtrados por categoría (paginación por id)
+    __table_args__ = (
+        db.Index('ix_products_category_id', 'category', 'id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -15,18 +23,22 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # stock es el snapshot compactado; el disponible suma los movimientos pendientes
+    # (los que todavía no pasaron por StockLedgerService.compact, con el índice parcial
+    # ix_stock_movements_pending: el costo depende de cada cuánto se compacta)
+    available_stock = column_property(
+        stock + select(func.coalesce(func.sum(StockMovement.delta), 0))
+        .where(StockMovement.product_id == id, ~StockMovement.compacted)
+        .correlate_except(StockMovement)
+        .scalar_subquery()
+    )
+    
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     
-    def update_stock(self, quantity):
-        """Actualiza el stock del producto"""
-        self.stock += quantity
-        if self.stock < 0:
-            raise ValueError("Stock no puede ser negativo")
-    
     def has_stock(self, quantity):
         """Verifica si hay suficiente stock"""
-        return self.stock >= quantity
+        return self.available_stock >= quantity
     
     def to_dict(self):
         """Convierte el objeto a diccionario"""
@@ -35,7 +47,7 @@ class Product(db.Model):
             'name': self.name,
             'description': self.description,
             'price': float(self.price),
-            'stock': self.stock,
+            'stock': self.available_stock,
             'category': self.category,
             'image_url': self.image_url,
             'created_at': self.created_at.isoformat() if self.created_at else None,
@@ -43,4 +55,68 @@ class Product(db.Model):
         }
     
     def __repr__(self):
-        return f'<Product {self.name}>'
\ No newline at end of file
+        return f'<Product {self.name}>'
+
+# Índice de búsqueda de texto completo (ver SearchService)
+# Postgres: columna tsvector generada + índice GIN.
+# SQLite (tests/desarrollo): tabla virtual FTS5 sincronizada con triggers.
+# La migración a1f3c9d2e7b4 crea lo mismo en bases de datos existentes.
+PRODUCT_SEARCH_DDL = {
+    'postgresql': [
+        """
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('spanish', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(category, '')), 'B') ||
+            setweight(to_tsvector('spanish', coalesce(description, '')), 'C')
+        ) STORED
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)"
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, category, description,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.id, new.name, new.category, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.id, old.name, old.category, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, category, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.id, old.name, old.category, old.description);
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.id, new.name, new.category, new.description);
+        END
+        """
+    ]
+}
+
+PRODUCT_SEARCH_DROP_DDL = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS products_fts_au",
+        "DROP TRIGGER IF EXISTS products_fts_ad",
+        "DROP TRIGGER IF EXISTS products_fts_ai",
+        "DROP TABLE IF EXISTS products_fts"
+    ]
+}
+
+for _dialect, _statements in PRODUCT_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Product.__table__, 'after_create', DDL(_statement).execute_if(dialect=_dialect))
+
+for _dialect, _statements in PRODUCT_SEARCH_DROP_DDL.items():
+    for _statement in _statements:
+        event.listen(Product.__table__, 'before_drop', DDL(_statement).execute_if(dialect=_dialect))
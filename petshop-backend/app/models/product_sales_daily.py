@@ -0,0 +1,23 @@
+from app import db
+
+class ProductSalesDaily(db.Model):
+    __tablename__ = 'product_sales_daily'
+    
+    # Ventas completadas por (día, producto); top de productos y revenue por categoría
+    # suman estas filas en lugar de recorrer order_items
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units_sold = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'day': self.day.isoformat(),
+            'product_id': self.product_id,
+            'units_sold': self.units_sold,
+            'revenue': float(self.revenue)
+        }
+    
+    def __repr__(self):
+        return f'<ProductSalesDaily {self.day} - Product {self.product_id}>'
@@ -0,0 +1,24 @@
+from app import db
+
+class ProductSalesMonthly(db.Model):
+    __tablename__ = 'product_sales_monthly'
+    
+    # Igual que product_sales_daily pero por mes (month = primer día del mes)
+    # Los reportes leen los meses completos de aquí y solo los días de los bordes del rango
+    # de product_sales_daily, así un año son ~12 filas por producto
+    month = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), primary_key=True)
+    units_sold = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'month': self.month.isoformat(),
+            'product_id': self.product_id,
+            'units_sold': self.units_sold,
+            'revenue': float(self.revenue)
+        }
+    
+    def __repr__(self):
+        return f'<ProductSalesMonthly {self.month} - Product {self.product_id}>'
@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    
+    # Tokens cerrados con logout; se borran al expirar (flask tokens purge)
+    __table_args__ = (
+        db.Index('ix_revoked_tokens_user_id_expires_at', 'user_id', 'expires_at'),
+        db.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+    
+    # Columnas
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} - User {self.user_id}>'
@@ -0,0 +1,27 @@
+from app import db
+
+class SalesDaily(db.Model):
+    __tablename__ = 'sales_daily'
+    
+    # Una fila por día (fecha UTC de creación de la orden), mantenida por SalesReportService
+    # Solo las órdenes 'completed' suman ventas; canceladas y devueltas se cuentan aparte
+    day = db.Column(db.Date, primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    units_sold = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0, server_default='0')
+    cancelled_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    returned_orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'day': self.day.isoformat(),
+            'orders_count': self.orders_count,
+            'units_sold': self.units_sold,
+            'revenue': float(self.revenue),
+            'cancelled_orders': self.cancelled_orders,
+            'returned_orders': self.returned_orders
+        }
+    
+    def __repr__(self):
+        return f'<SalesDaily {self.day}>'
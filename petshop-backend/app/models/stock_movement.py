@@ -0,0 +1,46 @@
+from app import db
+from datetime import datetime
+
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movements'
+    
+    # Libro de movimientos de stock: solo se insertan filas (ver StockLedgerService)
+    # products.stock es el snapshot compactado; los movimientos con compacted=False
+    # todavía no están sumados en él (stock disponible = snapshot + pendientes).
+    __table_args__ = (
+        # Historial por producto y reconstrucción del stock a una fecha
+        db.Index('ix_stock_movements_product_created_at', 'product_id', 'created_at'),
+        # Solo los pendientes: lo que leen Product.available_stock y la compactación
+        # (incluye delta: la suma se resuelve con un index-only scan)
+        db.Index(
+            'ix_stock_movements_pending', 'product_id', 'delta',
+            postgresql_where=db.text('NOT compacted'),
+            sqlite_where=db.text('compacted = 0')
+        ),
+    )
+    
+    REASONS = ('initial', 'sale', 'cancel', 'return', 'adjustment')
+    
+    # Columnas
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)  # Positivo entra, negativo sale
+    reason = db.Column(db.Enum(*REASONS, name='stock_movement_reason'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)  # Venta, cancelación o devolución
+    compacted = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        """Convierte el objeto a diccionario"""
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'delta': self.delta,
+            'reason': self.reason,
+            'order_id': self.order_id,
+            'compacted': self.compacted,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<StockMovement {self.product_id} {self.delta:+d} ({self.reason})>'
@@ -1,10 +1,15 @@
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.passwords import hash_password, verify_password
 
 class User(db.Model):
     __tablename__ = 'users'
     
+    # Índices: listado de usuarios por fecha de registro
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at', 'id'),
+    )
+    
     # Columnas
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
@@ -14,18 +19,20 @@ class User(db.Model):
     role = db.Column(db.Enum('admin', 'client', name='user_roles'), nullable=False, default='client')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Los tokens emitidos antes de este instante están revocados (cambio de contraseña o email)
+    tokens_valid_after = db.Column(db.DateTime, nullable=True)
     
     cart = db.relationship('Cart', backref='user', lazy=True, uselist=False)
     orders = db.relationship('Order', backref='user', lazy=True)
     addresses = db.relationship('Address', backref='user', lazy=True)
     
     def set_password(self, password):
-        """Hashea y guarda la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        """Hashea y guarda la contraseña (PASSWORD_HASH_METHOD)"""
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Verifica si la contraseña es correcta"""
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def to_dict(self):
         """Convierte el objeto a diccionario (sin password)"""
@@ -1,10 +1,16 @@
 from app.services.user_service import UserService
+from app.services.stock_ledger_service import StockLedgerService
 from app.services.product_service import ProductService
 from app.services.cart_service import CartService
 from app.services.order_service import OrderService
 from app.services.invoice_service import InvoiceService
 from app.services.address_service import AddressService
 from app.services.payment_method_service import PaymentMethodService
+from app.services.search_service import SearchService
+from app.services.idempotency_service import IdempotencyService
+from app.services.invoice_number_service import InvoiceNumberService
+from app.services.outbox_service import OutboxService
+from app.services.sales_report_service import SalesReportService
 
 __all__ = [
     'UserService',
@@ -13,5 +19,11 @@ __all__ = [
     'OrderService',
     'InvoiceService',
     'AddressService',
-    'PaymentMethodService'
+    'PaymentMethodService',
+    'SearchService',
+    'IdempotencyService',
+    'InvoiceNumberService',
+    'OutboxService',
+    'SalesReportService',
+    'StockLedgerService'
 ]
\ No newline at end of file
@@ -1,31 +1,58 @@
+import time
+from datetime import datetime, timedelta
+from flask import current_app
 from app import db
 from app.models import Cart, CartItem, Product
 from app.services.product_service import ProductService
+from app.utils import apply_load_profile
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.exceptions import BadRequest, NotFound
 
 class CartService:
     """Servicio para gestionar carritos de compra"""
     
+    # Perfiles de carga: 'items' para mostrar el carrito, 'checkout' incluye productos
+    LOAD_PROFILES = {
+        'basic': lambda: [],
+        'items': lambda: [selectinload(Cart.cart_items)],
+        'checkout': lambda: [joinedload(Cart.cart_items).joinedload(CartItem.product)]
+    }
+    
+    # Productos distintos aceptados por PUT /api/cart/items
+    MAX_BATCH_ITEMS = 100
+    
     @staticmethod
-    def get_or_create_active_cart(user_id):
+    def get_or_create_active_cart(user_id, profile='basic'):
         """
         Obtiene el carrito activo del usuario o crea uno nuevo
+        El índice único parcial uq_carts_user_active garantiza un solo carrito
+        activo: si otro request lo crea al mismo tiempo, se usa ese.
         """
-        cart = Cart.query.filter_by(user_id=user_id, status='active').first()
+        query = apply_load_profile(Cart.query, CartService.LOAD_PROFILES, profile)
+        cart = query.filter_by(user_id=user_id, status='active').first()
         
         if not cart:
             cart = Cart(user_id=user_id, status='active')
             db.session.add(cart)
-            db.session.commit()
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                query = apply_load_profile(Cart.query, CartService.LOAD_PROFILES, profile)
+                cart = query.filter_by(user_id=user_id, status='active').one()
         
         return cart
     
     @staticmethod
-    def get_cart_by_id(cart_id):
+    def get_cart_by_id(cart_id, profile='basic'):
         """
         Obtiene un carrito por ID
+        profile: 'basic', 'items' o 'checkout'
         """
-        cart = Cart.query.get(cart_id)
+        query = apply_load_profile(Cart.query, CartService.LOAD_PROFILES, profile)
+        cart = query.filter(Cart.id == cart_id).first()
         if not cart:
             raise NotFound(f"Carrito {cart_id} no encontrado")
         return cart
@@ -42,7 +69,7 @@ class CartService:
         product = ProductService.get_product_by_id(product_id)
         
         if not product.has_stock(quantity):
-            raise BadRequest(f"Stock insuficiente. Disponible: {product.stock}")
+            raise BadRequest(f"Stock insuficiente. Disponible: {product.available_stock}")
         
         # Obtener o crear carrito activo
         cart = CartService.get_or_create_active_cart(user_id)
@@ -57,7 +84,7 @@ class CartService:
             # Actualizar cantidad
             new_quantity = cart_item.quantity + quantity
             if not product.has_stock(new_quantity):
-                raise BadRequest(f"Stock insuficiente. Disponible: {product.stock}")
+                raise BadRequest(f"Stock insuficiente. Disponible: {product.available_stock}")
             cart_item.quantity = new_quantity
         else:
             # Crear nuevo item
@@ -69,6 +96,7 @@ class CartService:
             )
             db.session.add(cart_item)
         
+        CartService._adjust_totals(cart.id, quantity, quantity * cart_item.unit_price)
         db.session.commit()
         return cart
     
@@ -91,12 +119,14 @@ class CartService:
         # Verificar stock
         product = ProductService.get_product_by_id(product_id)
         if not product.has_stock(quantity):
-            raise BadRequest(f"Stock insuficiente. Disponible: {product.stock}")
+            raise BadRequest(f"Stock insuficiente. Disponible: {product.available_stock}")
         
+        delta = quantity - cart_item.quantity
         cart_item.quantity = quantity
+        CartService._adjust_totals(cart_id, delta, delta * cart_item.unit_price)
         db.session.commit()
         
-        return CartService.get_cart_by_id(cart_id)
+        return CartService.get_cart_by_id(cart_id, profile='items')
     
     @staticmethod
     def remove_item_from_cart(cart_id, product_id):
@@ -111,10 +141,109 @@ class CartService:
         if not cart_item:
             raise NotFound("Producto no encontrado en el carrito")
         
+        CartService._adjust_totals(cart_id, -cart_item.quantity, -cart_item.quantity * cart_item.unit_price)
         db.session.delete(cart_item)
         db.session.commit()
         
-        return CartService.get_cart_by_id(cart_id)
+        return CartService.get_cart_by_id(cart_id, profile='items')
+    
+    @staticmethod
+    def _parse_batch_items(items):
+        """
+        Valida la lista [{product_id, quantity}] y la convierte en {product_id: quantity}
+        """
+        if not isinstance(items, list):
+            raise BadRequest("Se espera una lista de items")
+        if len(items) > CartService.MAX_BATCH_ITEMS:
+            raise BadRequest(f"Máximo {CartService.MAX_BATCH_ITEMS} productos por carrito")
+        
+        quantities = {}
+        for item in items:
+            if not isinstance(item, dict) or 'product_id' not in item or 'quantity' not in item:
+                raise BadRequest("Cada item requiere product_id y quantity")
+            product_id, quantity = item['product_id'], item['quantity']
+            if not isinstance(product_id, int) or not isinstance(quantity, int) \
+                    or isinstance(product_id, bool) or isinstance(quantity, bool):
+                raise BadRequest("product_id y quantity deben ser enteros")
+            if quantity <= 0:
+                raise BadRequest("La cantidad debe ser mayor a 0")
+            if product_id in quantities:
+                raise BadRequest(f"Producto {product_id} repetido")
+            quantities[product_id] = quantity
+        return quantities
+    
+    @staticmethod
+    def replace_cart_items(user_id, items):
+        """
+        Reemplaza el contenido del carrito activo por la lista de items
+        items: [{"product_id": 1, "quantity": 2}, ...] (lista vacía = vaciar)
+        El stock de todos los productos se valida en una consulta y la
+        diferencia con el carrito actual se aplica con un INSERT, un UPDATE y
+        un DELETE en bloque, en una sola transacción: el costo no depende del
+        número de items. Los items que ya estaban conservan su precio.
+        """
+        quantities = CartService._parse_batch_items(items)
+        cart = CartService.get_or_create_active_cart(user_id)
+        
+        # Productos y stock de todos los items en una consulta
+        products = {
+            row.id: row
+            for row in db.session.execute(
+                select(Product.id, Product.name, Product.price, Product.available_stock)
+                .where(Product.id.in_(list(quantities)))
+            )
+        } if quantities else {}
+        
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            raise NotFound(f"Productos no encontrados: {', '.join(map(str, missing))}")
+        
+        insufficient = [
+            f"{products[product_id].name} (disponible: {products[product_id].available_stock}, solicitado: {quantity})"
+            for product_id, quantity in quantities.items()
+            if products[product_id].available_stock < quantity
+        ]
+        if insufficient:
+            raise BadRequest(f"Stock insuficiente: {'; '.join(insufficient)}")
+        
+        # Diferencia con los items actuales
+        current = {
+            row.product_id: row
+            for row in db.session.execute(
+                select(CartItem.id, CartItem.product_id, CartItem.quantity)
+                .where(CartItem.cart_id == cart.id)
+            )
+        }
+        to_insert = [
+            {
+                'cart_id': cart.id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': products[product_id].price
+            }
+            for product_id, quantity in quantities.items()
+            if product_id not in current
+        ]
+        to_update = [
+            {'id': current[product_id].id, 'quantity': quantity}
+            for product_id, quantity in quantities.items()
+            if product_id in current and current[product_id].quantity != quantity
+        ]
+        to_delete = [row.id for product_id, row in current.items() if product_id not in quantities]
+        
+        if to_insert:
+            db.session.execute(insert(CartItem), to_insert)
+        if to_update:
+            db.session.execute(update(CartItem), to_update)
+        if to_delete:
+            db.session.execute(delete(CartItem).where(CartItem.id.in_(to_delete)))
+        
+        # Totales recalculados en SQL sobre los items ya modificados
+        cart_id = cart.id
+        db.session.execute(CartService._recalculate_totals([cart_id]))
+        db.session.commit()
+        
+        return CartService.get_cart_by_id(cart_id, profile='items')
     
     @staticmethod
     def clear_cart(cart_id):
@@ -124,6 +253,8 @@ class CartService:
         cart = CartService.get_cart_by_id(cart_id)
         
         CartItem.query.filter_by(cart_id=cart_id).delete()
+        cart.item_count = 0
+        cart.subtotal = 0
         db.session.commit()
         
         return cart
@@ -131,10 +262,101 @@ class CartService:
     @staticmethod
     def get_cart_total(cart_id):
         """
-        Calcula el total del carrito
+        Total del carrito (lectura de una fila, sin cargar los items)
         """
-        cart = CartService.get_cart_by_id(cart_id)
-        return cart.calculate_total()
+        total = db.session.execute(select(Cart.subtotal).where(Cart.id == cart_id)).scalar_one_or_none()
+        if total is None:
+            raise NotFound(f"Carrito {cart_id} no encontrado")
+        return total
+    
+    @staticmethod
+    def get_cart_summary(user_id):
+        """
+        Unidades y subtotal del carrito activo en una consulta (sin crear el carrito)
+        """
+        row = db.session.execute(
+            select(Cart.id, Cart.item_count, Cart.subtotal)
+            .where(Cart.user_id == user_id, Cart.status == 'active')
+        ).first()
+        if row is None:
+            return {'cart_id': None, 'item_count': 0, 'subtotal': 0.0}
+        return {'cart_id': row.id, 'item_count': row.item_count, 'subtotal': float(row.subtotal)}
+    
+    @staticmethod
+    def _adjust_totals(cart_id, units, amount):
+        """
+        Suma la diferencia a los totales del carrito con un UPDATE relativo
+        (dos requests concurrentes sobre el mismo carrito no pisan sus cambios)
+        """
+        db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(item_count=Cart.item_count + units, subtotal=Cart.subtotal + amount)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def _item_totals():
+        """
+        Subconsultas correlacionadas con las unidades y el subtotal de los items de cada carrito
+        """
+        units = (
+            select(func.coalesce(func.sum(CartItem.quantity), 0))
+            .where(CartItem.cart_id == Cart.id)
+            .scalar_subquery()
+        )
+        amount = (
+            select(func.coalesce(func.sum(CartItem.quantity * CartItem.unit_price), 0))
+            .where(CartItem.cart_id == Cart.id)
+            .scalar_subquery()
+        )
+        return units, amount
+    
+    @staticmethod
+    def _recalculate_totals(cart_ids):
+        """
+        UPDATE que recalcula los totales desde los items (agregado en SQL)
+        """
+        units, amount = CartService._item_totals()
+        return (
+            update(Cart)
+            .where(Cart.id.in_(cart_ids))
+            .values(item_count=units, subtotal=amount)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def check_totals(status='active', fix=False, limit=1000):
+        """
+        Busca carritos cuyos totales guardados no coinciden con sus items
+        (p. ej. items insertados sin pasar por CartService)
+        status: None revisa todos los carritos
+        fix: recalcula los totales de los carritos encontrados
+        Retorna la lista de diferencias (hasta limit)
+        """
+        units, amount = CartService._item_totals()
+        query = (
+            select(Cart.id, Cart.item_count, Cart.subtotal, units.label('units'), amount.label('amount'))
+            .where(or_(Cart.item_count != units, func.abs(Cart.subtotal - amount) >= 0.005))
+            .order_by(Cart.id)
+            .limit(limit)
+        )
+        if status:
+            query = query.where(Cart.status == status)
+        
+        mismatches = [
+            {
+                'cart_id': row.id,
+                'stored': {'item_count': row.item_count, 'subtotal': float(row.subtotal)},
+                'actual': {'item_count': int(row.units), 'subtotal': float(row.amount)}
+            }
+            for row in db.session.execute(query)
+        ]
+        
+        if fix and mismatches:
+            db.session.execute(CartService._recalculate_totals([m['cart_id'] for m in mismatches]))
+            db.session.commit()
+        return mismatches
     
     @staticmethod
     def change_cart_status(cart_id, status):
@@ -148,4 +370,111 @@ class CartService:
         cart.status = status
         db.session.commit()
         
-        return cart
\ No newline at end of file
+        return cart
+    
+    @staticmethod
+    def _run_in_batches(step, pause_seconds=0):
+        """
+        Ejecuta step() (una transacción corta que retorna (filas tocadas, lote
+        no vacío)) hasta que no quede nada por hacer
+        Retorna {'rows', 'batches', 'seconds', 'rows_per_second'}
+        """
+        start = time.perf_counter()
+        rows = batches = 0
+        while True:
+            touched, found = step()
+            if not found:
+                break
+            rows += touched
+            batches += 1
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        
+        seconds = time.perf_counter() - start
+        return {
+            'rows': rows,
+            'batches': batches,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if seconds else 0.0
+        }
+    
+    @staticmethod
+    def _locked_batch(query):
+        """
+        Ids del lote; en Postgres salta las filas que otro request tiene bloqueadas
+        (un checkout en curso) en lugar de esperarlas
+        """
+        if db.engine.dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+        return db.session.execute(query).scalars().all()
+    
+    @staticmethod
+    def abandon_idle_carts(idle_hours=None, batch_size=None, pause_seconds=0):
+        """
+        Marca como 'abandoned' los carritos activos sin cambios en idle_hours
+        (CART_ABANDON_AFTER_HOURS) en lotes de batch_size, un commit por lote
+        El UPDATE repite la condición: un carrito que el usuario modificó
+        mientras corría el lote sigue activo.
+        """
+        idle_hours = idle_hours or current_app.config['CART_ABANDON_AFTER_HOURS']
+        batch_size = batch_size or current_app.config['CART_SWEEP_BATCH_SIZE']
+        cutoff = datetime.utcnow() - timedelta(hours=idle_hours)
+        idle = (Cart.status == 'active', Cart.updated_at < cutoff)
+        
+        def step():
+            ids = CartService._locked_batch(
+                select(Cart.id).where(*idle).order_by(Cart.updated_at, Cart.id).limit(batch_size)
+            )
+            if not ids:
+                db.session.commit()
+                return 0, False
+            result = db.session.execute(
+                update(Cart)
+                .where(Cart.id.in_(ids), *idle)
+                .values(status='abandoned')
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return result.rowcount, True
+        
+        return CartService._run_in_batches(step, pause_seconds)
+    
+    @staticmethod
+    def purge_abandoned_items(older_than_days=None, batch_size=None, pause_seconds=0):
+        """
+        Borra los items de carritos abandonados hace más de older_than_days
+        (CART_PURGE_AFTER_DAYS) en lotes de batch_size y deja sus totales en cero
+        Los carritos completados conservan sus items (respaldan la orden).
+        """
+        older_than_days = older_than_days or current_app.config['CART_PURGE_AFTER_DAYS']
+        batch_size = batch_size or current_app.config['CART_SWEEP_BATCH_SIZE']
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        
+        def step():
+            ids = CartService._locked_batch(
+                select(CartItem.id)
+                .join(Cart, Cart.id == CartItem.cart_id)
+                .where(Cart.status == 'abandoned', Cart.updated_at < cutoff)
+                .order_by(CartItem.id)
+                .limit(batch_size)
+            )
+            if not ids:
+                db.session.commit()
+                return 0, False
+            cart_ids = db.session.execute(
+                select(CartItem.cart_id).where(CartItem.id.in_(ids)).distinct()
+            ).scalars().all()
+            result = db.session.execute(
+                delete(CartItem).where(CartItem.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            # Sin tocar updated_at: el carrito conserva la fecha en que quedó abandonado
+            db.session.execute(
+                update(Cart)
+                .where(Cart.id.in_(cart_ids))
+                .values(item_count=0, subtotal=0, updated_at=Cart.updated_at)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            return result.rowcount, True
+        
+        return CartService._run_in_batches(step, pause_seconds)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import IdempotencyKey
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import Conflict, UnprocessableEntity
+
+class IdempotencyService:
+    """
+    Servicio para deduplicar requests con el header Idempotency-Key
+    El primer request inserta la key en estado 'processing' (la restricción
+    única hace de lock); los duplicados esperan su resultado y lo reproducen.
+    """
+    
+    @staticmethod
+    def begin(user_id, key, request_hash):
+        """
+        Reserva la key para este request
+        Retorna (registro, True) si este request debe ejecutarse, o
+        (registro completado, False) si hay que reproducir la respuesta guardada.
+        Un duplicado en vuelo espera (polling con backoff) hasta IDEMPOTENCY_WAIT_SECONDS.
+        Lanza UnprocessableEntity si la key se usó con otro body y Conflict si el
+        request original sigue en proceso al terminar la espera.
+        """
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_SECONDS']
+        delay = 0.05
+        
+        while True:
+            record = IdempotencyService._try_insert(user_id, key, request_hash)
+            if record is not None:
+                return record, True
+            
+            record = IdempotencyService._load(user_id, key)
+            if record is None:
+                # El original falló con un error del servidor y liberó la key
+                delay = IdempotencyService._backoff(deadline, delay)
+                continue
+            if record.request_hash != request_hash:
+                raise UnprocessableEntity("La Idempotency-Key ya se usó con un request diferente")
+            
+            if record.status == 'completed':
+                if not IdempotencyService._is_expired(record):
+                    return record, False
+                # Vencida: se borra y se procesa como un request nuevo
+                db.session.delete(record)
+                db.session.commit()
+                continue
+            
+            # El request original quedó abandonado (worker caído): se toma el lock
+            if IdempotencyService._take_over(record):
+                return record, True
+            
+            delay = IdempotencyService._backoff(deadline, delay)
+    
+    @staticmethod
+    def _backoff(deadline, delay):
+        """
+        Espera antes del siguiente intento; Conflict si se acabó IDEMPOTENCY_WAIT_SECONDS
+        Retorna la espera del intento siguiente
+        """
+        if time.monotonic() >= deadline:
+            raise Conflict("Una solicitud con esta Idempotency-Key está en proceso")
+        time.sleep(delay)
+        return min(delay * 2, 0.5)
+    
+    @staticmethod
+    def _is_unique_violation(error):
+        """
+        True si el IntegrityError viene de una restricción única (la key ya existe)
+        y no de una FK, un NOT NULL u otra restricción
+        """
+        code = getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)
+        if code:
+            return code == '23505'  # PostgreSQL: unique_violation
+        return 'UNIQUE constraint failed' in str(error.orig)  # SQLite
+    
+    @staticmethod
+    def _try_insert(user_id, key, request_hash):
+        """
+        Inserta la key en estado 'processing'; None si ya existe
+        Cualquier otro error de integridad (p. ej. el usuario ya no existe) se propaga
+        """
+        record = IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash)
+        db.session.add(record)
+        try:
+            db.session.commit()
+            return record
+        except IntegrityError as e:
+            db.session.rollback()
+            if not IdempotencyService._is_unique_violation(e):
+                raise
+            return None
+    
+    @staticmethod
+    def _load(user_id, key):
+        # rollback: cada lectura ve lo último que confirmaron otros requests
+        db.session.rollback()
+        return db.session.execute(
+            select(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+    
+    @staticmethod
+    def _take_over(record):
+        """
+        Toma una key 'processing' cuyo lock venció (IDEMPOTENCY_LOCK_TIMEOUT)
+        Solo un request gana: el UPDATE condicional es atómico
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=current_app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+        result = db.session.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.id == record.id,
+                IdempotencyKey.status == 'processing',
+                IdempotencyKey.locked_at < cutoff
+            )
+            .values(locked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+    
+    @staticmethod
+    def _is_expired(record):
+        ttl = timedelta(hours=current_app.config['IDEMPOTENCY_TTL_HOURS'])
+        return record.completed_at is not None and record.completed_at < datetime.utcnow() - ttl
+    
+    @staticmethod
+    def complete(record_id, status_code, body, content_type):
+        """
+        Guarda la respuesta del request original para reproducirla
+        """
+        db.session.rollback()
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == record_id)
+            .values(
+                status='completed',
+                response_code=status_code,
+                response_body=body,
+                response_content_type=content_type,
+                completed_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    
+    @staticmethod
+    def release(record_id):
+        """
+        Libera la key (error del servidor): un reintento vuelve a ejecutar el request
+        """
+        db.session.rollback()
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id))
+        db.session.commit()
+    
+    @staticmethod
+    def purge_expired():
+        """
+        Borra las keys completadas hace más de IDEMPOTENCY_TTL_HOURS
+        Retorna el número de keys borradas
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config['IDEMPOTENCY_TTL_HOURS'])
+        result = db.session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.status == 'completed',
+                IdempotencyKey.completed_at < cutoff
+            )
+        )
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,160 @@
+import os
+import threading
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from app.models import Invoice, InvoiceSequence
+
+_blocks_lock = threading.Lock()
+
+class InvoiceNumberService:
+    """
+    Servicio que asigna números de factura correlativos por año (INV-2026-00000001)
+    El contador de cada prefijo vive en invoice_sequences y avanza con un único
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING: sin leer MAX() ni reintentar
+    por colisiones del índice único, aunque muchas órdenes lleguen a la vez.
+    - INVOICE_NUMBER_BLOCK_SIZE = 1: el número se toma en la transacción del
+      checkout; un rollback lo devuelve (sin huecos), pero las órdenes
+      concurrentes esperan el lock de la fila hasta el commit.
+    - INVOICE_NUMBER_BLOCK_SIZE > 1: cada proceso reserva un bloque en una
+      transacción propia y lo reparte en memoria. Los workers no se esperan,
+      a cambio de huecos (bloques sin terminar, checkouts fallidos) y de que
+      los números no sigan exactamente el orden de emisión entre workers.
+    En SQLite siempre se usa 1: hay un solo escritor y reservar con otra
+    conexión mientras el checkout tiene el lock de escritura se bloquearía.
+    """
+    NUMBER_DIGITS = 8
+    
+    @staticmethod
+    def prefix_for_year(year):
+        return current_app.config['INVOICE_NUMBER_PREFIX'].format(year=year)
+    
+    @staticmethod
+    def format_number(prefix, value):
+        return f'{prefix}-{value:0{InvoiceNumberService.NUMBER_DIGITS}d}'
+    
+    @staticmethod
+    def allocate(issued_at=None, block_size=None):
+        """
+        Retorna el siguiente número de factura del año de issued_at
+        block_size=None usa INVOICE_NUMBER_BLOCK_SIZE
+        """
+        prefix = InvoiceNumberService.prefix_for_year((issued_at or datetime.utcnow()).year)
+        if block_size is None:
+            block_size = InvoiceNumberService._block_size()
+        
+        if block_size <= 1:
+            value, _ = InvoiceNumberService._reserve(db.session, prefix, 1)
+        else:
+            value = InvoiceNumberService._take_from_block(prefix, block_size)
+        return InvoiceNumberService.format_number(prefix, value)
+    
+    @staticmethod
+    def _block_size():
+        if db.engine.dialect.name == 'sqlite':
+            return 1
+        return max(1, current_app.config['INVOICE_NUMBER_BLOCK_SIZE'])
+    
+    @staticmethod
+    def _reserve(connection, prefix, size):
+        """
+        Avanza el contador del prefijo en size y retorna el rango reservado [inicio, fin)
+        La primera factura del año crea la fila
+        """
+        table = InvoiceSequence.__table__
+        insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        now = datetime.utcnow()
+        
+        statement = (
+            insert(table)
+            .values(prefix=prefix, next_value=size + 1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[table.c.prefix],
+                set_={'next_value': table.c.next_value + size, 'updated_at': now}
+            )
+            .returning(table.c.next_value)
+        )
+        end = connection.execute(statement).scalar_one()
+        return end - size, end
+    
+    @staticmethod
+    def _blocks():
+        """
+        Bloques reservados por este proceso: {prefijo: [siguiente, fin)}
+        Tras un fork el hijo empieza sin bloques (no puede repartir los del padre)
+        """
+        with _blocks_lock:
+            state = current_app.extensions.get('invoice_number_blocks')
+            if state is None or state['pid'] != os.getpid():
+                state = {'pid': os.getpid(), 'lock': threading.Lock(), 'ranges': {}}
+                current_app.extensions['invoice_number_blocks'] = state
+            return state
+    
+    @staticmethod
+    def _take_from_block(prefix, block_size):
+        """
+        Toma el siguiente número del bloque del proceso; reserva otro al agotarlo
+        La reserva se confirma en su propia conexión: el lock de la fila dura
+        un solo UPDATE y no toda la transacción del checkout.
+        """
+        state = InvoiceNumberService._blocks()
+        with state['lock']:
+            current = state['ranges'].get(prefix)
+            if current is None or current[0] >= current[1]:
+                with db.engine.begin() as connection:
+                    current = list(InvoiceNumberService._reserve(connection, prefix, block_size))
+                state['ranges'][prefix] = current
+            
+            value = current[0]
+            current[0] += 1
+            return value
+    
+    @staticmethod
+    def gap_report(year, max_gaps=1000):
+        """
+        Huecos en la numeración de un año
+        - gaps: rangos {from, to} sin factura entre 1 y el último número emitido
+          (se listan hasta max_gaps; missing cuenta todos los números faltantes)
+        - unused_tail: reservados después del último emitido (bloques que algún
+          worker aún reparte o que se perdieron al reiniciarlo)
+        Recorre los números en streaming: la memoria depende de los huecos, no de las facturas
+        """
+        prefix = InvoiceNumberService.prefix_for_year(year)
+        query = (
+            select(Invoice.invoice_number)
+            .where(Invoice.invoice_number.like(f'{prefix}-%'))
+            .order_by(Invoice.invoice_number)
+            .execution_options(yield_per=5000)
+        )
+        
+        gaps = []
+        gap_count = missing = issued = last = 0
+        for invoice_number in db.session.execute(query).scalars():
+            suffix = invoice_number[len(prefix) + 1:]
+            if not suffix.isdigit():
+                continue
+            
+            value = int(suffix)
+            if value > last + 1:
+                gap_count += 1
+                missing += value - last - 1
+                if len(gaps) < max_gaps:
+                    gaps.append({'from': last + 1, 'to': value - 1})
+            last = value
+            issued += 1
+        
+        sequence = db.session.get(InvoiceSequence, prefix)
+        allocated = sequence.next_value - 1 if sequence else 0
+        return {
+            'year': year,
+            'prefix': prefix,
+            'issued': issued,
+            'last_issued': InvoiceNumberService.format_number(prefix, last) if last else None,
+            'allocated': allocated,
+            'missing': missing,
+            'gaps': gaps,
+            'gaps_truncated': gap_count > len(gaps),
+            'unused_tail': max(0, allocated - last)
+        }
@@ -1,53 +1,130 @@
 from app import db
-from app.models import Invoice
-from werkzeug.exceptions import NotFound
+from app.models import Invoice, Order
+from app.utils import (
+    CacheKeys, CacheTags, get_or_compute,
+    apply_load_profile, apply_date_range, keyset_paginate
+)
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from werkzeug.exceptions import BadRequest, NotFound
 
 class InvoiceService:
     """Servicio para gestionar facturas"""
     
+    # Perfiles de carga: 'order' trae la orden, 'detail' además sus items
+    LOAD_PROFILES = {
+        'basic': lambda: [],
+        'order': lambda: [joinedload(Invoice.order)],
+        'detail': lambda: [joinedload(Invoice.order).selectinload(Order.order_items)]
+    }
+    
+    # Estados válidos para filtrar
+    STATUSES = ['paid', 'pending', 'cancelled']
+    
+    # Las facturas casi no cambian: 30 minutos
+    DETAIL_CACHE_TIMEOUT = 1800
+    
+    # Detalles cacheados por forma de búsqueda: (key base, tag, perfil de carga, incluye items)
+    CACHED_DETAILS = {
+        'id': (CacheKeys.INVOICE_BY_ID, CacheTags.INVOICE, 'order', False),
+        'number': (CacheKeys.INVOICE_BY_NUMBER, CacheTags.INVOICE_NUMBER, 'detail', True),
+        'order': (CacheKeys.INVOICE_BY_ORDER, CacheTags.INVOICE_ORDER, 'order', False)
+    }
+    
     @staticmethod
-    def get_invoice_by_id(invoice_id):
+    def get_invoice_by_id(invoice_id, profile='basic'):
         """
         Obtiene una factura por ID
         """
-        invoice = Invoice.query.get(invoice_id)
+        query = apply_load_profile(Invoice.query, InvoiceService.LOAD_PROFILES, profile)
+        invoice = query.filter(Invoice.id == invoice_id).first()
         if not invoice:
             raise NotFound(f"Factura {invoice_id} no encontrada")
         return invoice
     
     @staticmethod
-    def get_invoice_by_number(invoice_number):
+    def get_invoice_by_number(invoice_number, profile='basic'):
         """
         Obtiene una factura por número de factura
         """
-        invoice = Invoice.query.filter_by(invoice_number=invoice_number).first()
+        query = apply_load_profile(Invoice.query, InvoiceService.LOAD_PROFILES, profile)
+        invoice = query.filter_by(invoice_number=invoice_number).first()
         if not invoice:
             raise NotFound(f"Factura {invoice_number} no encontrada")
         return invoice
     
     @staticmethod
-    def get_invoice_by_order_id(order_id):
+    def get_invoice_by_order_id(order_id, profile='basic'):
         """
         Obtiene una factura por ID de orden
         """
-        invoice = Invoice.query.filter_by(order_id=order_id).first()
+        query = apply_load_profile(Invoice.query, InvoiceService.LOAD_PROFILES, profile)
+        invoice = query.filter_by(order_id=order_id).first()
         if not invoice:
             raise NotFound(f"Factura para orden {order_id} no encontrada")
         return invoice
     
     @staticmethod
-    def get_all_invoices():
+    def get_cached_payload(lookup, value, name=None):
         """
-        Obtiene todas las facturas
+        Obtiene el detalle de una factura desde un cache compartido por todos los usuarios
+        lookup: 'id', 'number' u 'order' (ver CACHED_DETAILS)
+        El payload no depende de quién consulta: guarda el dueño de la orden
+        (owner_id) para verificar permisos en cada request, incluso en un hit.
+        Los 404 no se cachean (el loader lanza NotFound).
         """
-        return Invoice.query.order_by(Invoice.issued_at.desc()).all()
+        base_key, tag, profile, include_items = InvoiceService.CACHED_DETAILS[lookup]
+        loader = {
+            'id': InvoiceService.get_invoice_by_id,
+            'number': InvoiceService.get_invoice_by_number,
+            'order': InvoiceService.get_invoice_by_order_id
+        }[lookup]
+        
+        def build():
+            invoice = loader(value, profile=profile)
+            invoice_data = invoice.to_dict()
+            invoice_data['order'] = invoice.order.to_dict() if invoice.order else None
+            if include_items:
+                invoice_data['order_items'] = [item.to_dict() for item in invoice.order.order_items]
+            return {
+                'owner_id': invoice.order.user_id if invoice.order else None,
+                'invoice': invoice_data
+            }
+        
+        return get_or_compute(
+            CacheTags.make_key(base_key.format(value), [tag.format(value)]),
+            build,
+            InvoiceService.DETAIL_CACHE_TIMEOUT,
+            name=name
+        )
     
     @staticmethod
-    def get_invoices_by_status(status):
+    def _filter_invoices(query, status=None, start=None, end=None):
+        if status:
+            if status not in InvoiceService.STATUSES:
+                raise BadRequest("Estado inválido")
+            query = query.where(Invoice.status == status)
+        return apply_date_range(query, Invoice.issued_at, start, end)
+    
+    @staticmethod
+    def get_invoices_page(status=None, start=None, end=None, limit=50, cursor=None):
         """
-        Obtiene facturas filtradas por estado
+        Obtiene una página de facturas, de la más reciente a la más antigua
+        status: 'paid', 'pending' o 'cancelled' (None = todas)
+        start/end: rango de issued_at (ver parse_date_range)
+        Retorna (facturas, next_cursor)
         """
-        if status not in ['paid', 'pending', 'cancelled']:
-            raise ValueError("Estado inválido")
-        
-        return Invoice.query.filter_by(status=status).order_by(Invoice.issued_at.desc()).all()
\ No newline at end of file
+        query = InvoiceService._filter_invoices(Invoice.query, status, start, end)
+        return keyset_paginate(
+            query, Invoice.issued_at, Invoice.id,
+            cursor=cursor, limit=limit, descending=True
+        )
+    
+    @staticmethod
+    def iter_invoices(status=None, start=None, end=None, batch_size=1000):
+        """
+        Recorre todas las facturas filtradas en bloques (cursor del lado del servidor)
+        """
+        query = InvoiceService._filter_invoices(select(Invoice), status, start, end)
+        query = query.order_by(Invoice.issued_at.desc(), Invoice.id.desc())
+        return db.session.execute(query.execution_options(yield_per=batch_size)).scalars()
@@ -2,20 +2,52 @@ from app import db
 from app.models import Order, OrderItem, Invoice, Cart, Product
 from app.services.cart_service import CartService
 from app.services.product_service import ProductService
-from app.utils import CacheInvalidator
+from app.services.invoice_number_service import InvoiceNumberService
+from app.services.outbox_service import OutboxService
+from app.services.sales_report_service import SalesReportService
+from app.services.stock_ledger_service import StockLedgerService
+from app.utils import CacheInvalidator, apply_load_profile, apply_date_range, keyset_paginate
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.exceptions import BadRequest, NotFound
 from datetime import datetime
 
 class OrderService:
     """Servicio para gestionar órdenes/ventas"""
     
+    # Perfiles de carga: cada endpoint ejecuta un número fijo de consultas
+    LOAD_PROFILES = {
+        'basic': lambda: [],
+        'items': lambda: [selectinload(Order.order_items)],
+        'detail': lambda: [
+            selectinload(Order.order_items),
+            joinedload(Order.invoice),
+            joinedload(Order.address),
+            joinedload(Order.payment_method)
+        ],
+        # Cancelación/devolución: items para restaurar stock y factura para anularla
+        'restock': lambda: [
+            selectinload(Order.order_items),
+            joinedload(Order.invoice)
+        ]
+    }
+    
+    # Estados válidos para filtrar
+    STATUSES = ['pending', 'completed', 'cancelled', 'returned']
+    
+    # Máximo de órdenes por cancelación masiva
+    MAX_BULK_CANCEL = 500
+    
     @staticmethod
     def create_order_from_cart(user_id, cart_id, address_id, payment_method_id):
         """
         Convierte un carrito en una orden (venta)
+        El carrito, sus items y productos se cargan en una sola consulta,
+        el stock se reserva con un INSERT en el libro de movimientos (con las
+        filas de los productos bloqueadas) y los OrderItems se insertan en bloque.
         """
-        # Obtener el carrito
-        cart = CartService.get_cart_by_id(cart_id)
+        # Obtener el carrito con items y productos
+        cart = OrderService._load_cart_for_checkout(cart_id)
         
         # Validar que el carrito pertenece al usuario
         if cart.user_id != user_id:
@@ -29,158 +61,286 @@ class OrderService:
         if cart.status != 'active':
             raise BadRequest("El carrito no está activo")
         
-        # Verificar stock de todos los productos
-        for cart_item in cart.cart_items:
-            product = cart_item.product
-            if not product.has_stock(cart_item.quantity):
-                raise BadRequest(
-                    f"Stock insuficiente para {product.name}. "
-                    f"Disponible: {product.stock}, Solicitado: {cart_item.quantity}"
-                )
+        # Snapshot de los items antes de tocar la base de datos
+        lines = [
+            {
+                'product_id': cart_item.product_id,
+                'product_name': cart_item.product.name,
+                'quantity': cart_item.quantity,
+                'unit_price': cart_item.unit_price,
+                'subtotal': cart_item.calculate_subtotal()
+            }
+            for cart_item in cart.cart_items
+        ]
+        
+        quantities = {}
+        for line in lines:
+            quantities[line['product_id']] = quantities.get(line['product_id'], 0) + line['quantity']
         
         # Calcular total
-        total_amount = cart.calculate_total()
-        
-        # Crear la orden
-        order = Order(
-            user_id=user_id,
-            cart_id=cart_id,
-            address_id=address_id,
-            payment_method_id=payment_method_id,
-            total_amount=total_amount,
-            status='pending'
-        )
-        db.session.add(order)
-        db.session.flush()  # Para obtener el order.id
+        total_amount = sum(line['subtotal'] for line in lines)
         
-        # Crear OrderItems (snapshot) y reducir stock
-        for cart_item in cart.cart_items:
-            product = cart_item.product
+        # Un error (p. ej. stock insuficiente) revierte la transacción completa, orden incluida
+        try:
+            # Crear la orden
+            order = Order(
+                user_id=user_id,
+                cart_id=cart_id,
+                address_id=address_id,
+                payment_method_id=payment_method_id,
+                total_amount=total_amount,
+                status='pending'
+            )
+            db.session.add(order)
+            db.session.flush()  # Para obtener el order.id
+            
+            # Reservar stock de todos los productos (atómico)
+            ProductService.reserve_stock(quantities, order_id=order.id)
+            
+            # Crear OrderItems (snapshot) en un solo INSERT
+            for line in lines:
+                line['order_id'] = order.id
+            db.session.execute(insert(OrderItem), lines)
             
-            # Crear OrderItem con snapshot del producto
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                product_name=product.name,  # Snapshot
-                quantity=cart_item.quantity,
-                unit_price=cart_item.unit_price,  # Snapshot del precio
-                subtotal=cart_item.calculate_subtotal()
+            # Marcar carrito como completado
+            cart.status = 'completed'
+            
+            # Crear factura
+            invoice = OrderService._create_invoice(order)
+            
+            # Cambiar estado de orden a completado
+            order.status = 'completed'
+            
+            # Tareas post-checkout (precalentar la factura, notificación) en la misma
+            # transacción: el worker del outbox las ejecuta después del commit
+            OutboxService.enqueue('invoice.created', {'order_id': order.id})
+            OutboxService.enqueue('order.confirmation', {'order_id': order.id})
+            
+            # Rollups de ventas al final: la fila del día queda bloqueada lo mínimo
+            SalesReportService.record_status_change(
+                order, [(line['product_id'], line['quantity'], line['subtotal']) for line in lines]
             )
-            db.session.add(order_item)
             
-            # Reducir stock del producto
-            product.update_stock(-cart_item.quantity)
+            db.session.flush()
+            invoice_keys = (invoice.id, invoice.invoice_number, order.id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
-        # Marcar carrito como completado
-        cart.status = 'completed'
-        
-        # Crear factura
-        invoice = OrderService._create_invoice(order)
-        
-        # Cambiar estado de orden a completado
-        order.status = 'completed'
-
-        # Invalidar cache de facturas
-        CacheInvalidator.invalidate_invoices()
-        
-        db.session.commit()
+        # Los listados de facturas se invalidan acá y no en el outbox: no dependen
+        # de que el worker esté al día (el outbox solo precalienta el detalle)
+        CacheInvalidator.invalidate_invoice(*invoice_keys)
         
         return order
     
+    @staticmethod
+    def _load_cart_for_checkout(cart_id):
+        """
+        Carga el carrito junto con sus items y productos en una consulta
+        """
+        return CartService.get_cart_by_id(cart_id, profile='checkout')
+    
     @staticmethod
     def _create_invoice(order):
         """
         Crea una factura para una orden (método interno)
         """
+        issued_at = datetime.utcnow()
         invoice = Invoice(
             order_id=order.id,
+            invoice_number=InvoiceNumberService.allocate(issued_at),
             total_amount=order.total_amount,
             tax_amount=0,  # Por ahora sin impuestos
-            status='paid'
+            status='paid',
+            issued_at=issued_at
         )
-        invoice.invoice_number = invoice.generate_invoice_number()
         
         db.session.add(invoice)
         return invoice
     
     @staticmethod
-    def get_order_by_id(order_id):
+    def get_order_by_id(order_id, profile='basic'):
         """
         Obtiene una orden por ID
+        profile: 'basic', 'items' o 'detail' (items, factura, dirección y método de pago)
         """
-        order = Order.query.get(order_id)
+        query = apply_load_profile(Order.query, OrderService.LOAD_PROFILES, profile)
+        order = query.filter(Order.id == order_id).first()
         if not order:
             raise NotFound(f"Orden {order_id} no encontrada")
         return order
     
     @staticmethod
-    def get_orders_by_user(user_id):
+    def _filter_orders(query, user_id=None, status=None, start=None, end=None):
+        if user_id is not None:
+            query = query.where(Order.user_id == user_id)
+        if status:
+            if status not in OrderService.STATUSES:
+                raise BadRequest("Estado inválido")
+            query = query.where(Order.status == status)
+        return apply_date_range(query, Order.created_at, start, end)
+    
+    @staticmethod
+    def get_orders_page(user_id=None, status=None, start=None, end=None, limit=50, cursor=None):
         """
-        Obtiene todas las órdenes de un usuario
+        Obtiene una página de órdenes, de la más reciente a la más antigua
+        user_id: solo las órdenes de ese usuario (None = todas, para admin)
+        start/end: rango de created_at (ver parse_date_range)
+        Retorna (órdenes, next_cursor)
         """
-        return Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+        query = OrderService._filter_orders(Order.query, user_id, status, start, end)
+        return keyset_paginate(
+            query, Order.created_at, Order.id,
+            cursor=cursor, limit=limit, descending=True
+        )
     
     @staticmethod
-    def get_all_orders():
+    def iter_orders(user_id=None, status=None, start=None, end=None, batch_size=1000):
         """
-        Obtiene todas las órdenes (para admin)
+        Recorre todas las órdenes filtradas en bloques (cursor del lado del servidor)
+        Pensado para exportaciones: la memoria no crece con el número de filas.
+        La consulta se valida y ejecuta al llamar; las filas se leen al iterar.
         """
-        return Order.query.order_by(Order.created_at.desc()).all()
+        query = OrderService._filter_orders(select(Order), user_id, status, start, end)
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        return db.session.execute(query.execution_options(yield_per=batch_size)).scalars()
     
     @staticmethod
-    def cancel_order(order_id):
+    def _check_transition(order, status):
         """
-        Cancela una orden y restaura el stock
+        Valida que la orden pueda pasar a 'cancelled' o 'returned'
         """
-        order = OrderService.get_order_by_id(order_id)
-        
-        if order.status == 'cancelled':
-            raise BadRequest("La orden ya está cancelada")
-        
-        if order.status == 'returned':
-            raise BadRequest("La orden ya fue devuelta")
-        
-        # Restaurar stock de los productos
-        for order_item in order.order_items:
-            product = ProductService.get_product_by_id(order_item.product_id)
-            product.update_stock(order_item.quantity)
+        if status == 'cancelled':
+            if order.status == 'cancelled':
+                raise BadRequest("La orden ya está cancelada")
+            if order.status == 'returned':
+                raise BadRequest("La orden ya fue devuelta")
+        elif order.status != 'completed':
+            raise BadRequest("Solo se pueden devolver órdenes completadas")
+    
+    @staticmethod
+    def _restock_orders(orders, status):
+        """
+        Pasa las órdenes a status restaurando el stock de todos sus items y anula
+        sus facturas. La restauración se agrega al libro de movimientos con un
+        INSERT y no escribe las filas de productos (ver StockLedgerService).
+        Las órdenes deben venir con el perfil 'restock'; no hace commit.
+        """
+        reason = 'cancel' if status == 'cancelled' else 'return'
+        movements = []
+        changes = []
+        for order in orders:
+            for order_item in order.order_items:
+                movements.append({
+                    'product_id': order_item.product_id,
+                    'delta': order_item.quantity,
+                    'reason': reason,
+                    'order_id': order.id
+                })
+            changes.append((
+                order,
+                [(item.product_id, item.quantity, item.subtotal) for item in order.order_items],
+                order.status
+            ))
         
-        # Cambiar estado
-        order.status = 'cancelled'
+        StockLedgerService.apply_movements(movements)
         
-        # Actualizar factura
-        if order.invoice:
-            order.invoice.status = 'cancelled'
+        for order in orders:
+            order.status = status
+            if order.invoice:
+                order.invoice.status = 'cancelled'
+        SalesReportService.record_status_changes(changes)
+    
+    @staticmethod
+    def _load_for_restock(order_ids):
+        """
+        Carga las órdenes con items y factura, bloqueando sus filas hasta el commit
+        (dos cancelaciones concurrentes de la misma orden no restauran el stock dos veces)
+        """
+        query = apply_load_profile(Order.query, OrderService.LOAD_PROFILES, 'restock')
+        return query.filter(Order.id.in_(order_ids)).with_for_update(of=Order).all()
+    
+    @staticmethod
+    def _invoice_cache_keys(orders):
+        """
+        Datos para invalidar el cache de las facturas, tomados antes del commit
+        (después el acceso a order.invoice recargaría cada orden)
+        """
+        return [
+            (order.invoice.id, order.invoice.invoice_number, order.id)
+            for order in orders if order.invoice
+        ]
+    
+    @staticmethod
+    def _change_status(order_id, status):
+        orders = OrderService._load_for_restock([order_id])
+        if not orders:
+            raise NotFound(f"Orden {order_id} no encontrada")
         
+        OrderService._check_transition(orders[0], status)
+        OrderService._restock_orders(orders, status)
+        invoices = OrderService._invoice_cache_keys(orders)
         db.session.commit()
         
-        return order
+        for invoice in invoices:
+            CacheInvalidator.invalidate_invoice(*invoice)
+        return orders[0]
+    
+    @staticmethod
+    def cancel_order(order_id):
+        """
+        Cancela una orden y restaura el stock
+        """
+        return OrderService._change_status(order_id, 'cancelled')
     
     @staticmethod
     def return_order(order_id):
         """
         Procesa una devolución y restaura el stock
         """
-        order = OrderService.get_order_by_id(order_id)
-        
-        if order.status != 'completed':
-            raise BadRequest("Solo se pueden devolver órdenes completadas")
-        
-        if order.status == 'returned':
-            raise BadRequest("La orden ya fue devuelta")
-        
-        # Restaurar stock de los productos
-        for order_item in order.order_items:
-            product = ProductService.get_product_by_id(order_item.product_id)
-            product.update_stock(order_item.quantity)
-        
-        # Cambiar estado
-        order.status = 'returned'
+        return OrderService._change_status(order_id, 'returned')
+    
+    @staticmethod
+    def cancel_orders(order_ids):
+        """
+        Cancela varias órdenes en una transacción (p. ej. una tanda de compras fraudulentas)
+        El stock de todas se restaura con un solo INSERT en el libro; las órdenes que no existen
+        o no se pueden cancelar se reportan sin afectar a las demás.
+        Retorna [{'order_id', 'status': 'cancelled'|'error', 'error'?}] en el orden recibido
+        """
+        if not isinstance(order_ids, list) or not order_ids:
+            raise BadRequest("order_ids debe ser una lista no vacía")
+        try:
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+        except (TypeError, ValueError):
+            raise BadRequest("order_ids debe contener ids numéricos")
+        if len(order_ids) > OrderService.MAX_BULK_CANCEL:
+            raise BadRequest(f"Máximo {OrderService.MAX_BULK_CANCEL} órdenes por request")
         
-        # Actualizar factura
-        if order.invoice:
-            order.invoice.status = 'cancelled'
+        orders = {order.id: order for order in OrderService._load_for_restock(order_ids)}
+        results = {}
+        cancellable = []
+        for order_id in order_ids:
+            order = orders.get(order_id)
+            if order is None:
+                results[order_id] = {'order_id': order_id, 'status': 'error', 'error': f"Orden {order_id} no encontrada"}
+                continue
+            try:
+                OrderService._check_transition(order, 'cancelled')
+            except BadRequest as e:
+                results[order_id] = {'order_id': order_id, 'status': 'error', 'error': e.description}
+                continue
+            cancellable.append(order)
+            results[order_id] = {'order_id': order_id, 'status': 'cancelled'}
         
-        db.session.commit()
+        if cancellable:
+            OrderService._restock_orders(cancellable, 'cancelled')
+            invoices = OrderService._invoice_cache_keys(cancellable)
+            db.session.commit()
+            for invoice in invoices:
+                CacheInvalidator.invalidate_invoice(*invoice)
+        else:
+            db.session.rollback()
         
-        return order
\ No newline at end of file
+        return [results[order_id] for order_id in order_ids]
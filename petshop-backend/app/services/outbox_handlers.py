@@ -0,0 +1,36 @@
+import logging
+
+notification_logger = logging.getLogger('petshop.notifications')
+
+def render_invoice(payload):
+    """
+    'invoice.created': deja el detalle de la factura nueva en el cache (por ID,
+    número y orden), así la primera consulta del cliente ya es un hit
+    Los listados ya los invalidó el checkout (OrderService.create_order_from_cart)
+    """
+    from app.services.invoice_service import InvoiceService
+    
+    invoice = InvoiceService.get_invoice_by_order_id(payload['order_id'])
+    InvoiceService.get_cached_payload('id', invoice.id, name='outbox.render_invoice')
+    InvoiceService.get_cached_payload('number', invoice.invoice_number, name='outbox.render_invoice')
+    InvoiceService.get_cached_payload('order', invoice.order_id, name='outbox.render_invoice')
+
+def send_order_confirmation(payload):
+    """
+    'order.confirmation': avisa al cliente que su orden fue confirmada
+    Punto de integración con el proveedor de correo o webhooks; por ahora
+    queda registrado en el log 'petshop.notifications'
+    """
+    from app.services.order_service import OrderService
+    order = OrderService.get_order_by_id(payload['order_id'], profile='detail')
+    notification_logger.info(
+        'Orden %s confirmada para %s: %d items, total %s, factura %s',
+        order.id, order.user.email, len(order.order_items), order.total_amount,
+        order.invoice.invoice_number if order.invoice else '-'
+    )
+
+# Tipo de evento -> función que lo procesa (recibe el payload)
+OUTBOX_HANDLERS = {
+    'invoice.created': render_invoice,
+    'order.confirmation': send_order_confirmation
+}
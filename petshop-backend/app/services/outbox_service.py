@@ -0,0 +1,164 @@
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select, update
+from app import db
+from app.models import OutboxEvent
+
+logger = logging.getLogger('petshop.outbox')
+
+class OutboxService:
+    """
+    Cola local de tareas post-checkout (patrón outbox)
+    Los eventos se insertan en la misma transacción que la orden: si la orden
+    se confirma, sus tareas también, y el request responde sin esperarlas.
+    Un worker (flask outbox worker) los procesa después del commit con
+    reintentos y backoff; ver OUTBOX_HANDLERS para los tipos de evento.
+    """
+    
+    @staticmethod
+    def enqueue(event_type, payload):
+        """
+        Agrega un evento a la sesión actual (se confirma con el commit del llamador)
+        """
+        event = OutboxEvent(event_type=event_type, payload=payload)
+        db.session.add(event)
+        return event
+    
+    @staticmethod
+    def _claimable(now):
+        """
+        Pendientes ya disponibles, o tomados por un worker que no terminó a tiempo
+        """
+        stale = now - timedelta(seconds=current_app.config['OUTBOX_LOCK_TIMEOUT'])
+        return or_(
+            and_(OutboxEvent.status == 'pending', OutboxEvent.available_at <= now),
+            and_(OutboxEvent.status == 'processing', OutboxEvent.locked_at < stale)
+        )
+    
+    @staticmethod
+    def claim_batch(limit=None):
+        """
+        Marca hasta limit eventos como 'processing' para este worker y los retorna
+        En Postgres los candidatos se leen con SKIP LOCKED; el UPDATE condicional
+        garantiza en cualquier motor que dos workers no tomen el mismo evento.
+        """
+        limit = limit or current_app.config['OUTBOX_BATCH_SIZE']
+        now = datetime.utcnow()
+        candidates = (
+            select(OutboxEvent.id)
+            .where(OutboxService._claimable(now))
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+        )
+        if db.engine.dialect.name == 'postgresql':
+            candidates = candidates.with_for_update(skip_locked=True)
+        
+        ids = db.session.execute(candidates).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+        
+        claimed = db.session.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(ids), OutboxService._claimable(now))
+            .values(status='processing', locked_at=now, attempts=OutboxEvent.attempts + 1)
+            .returning(OutboxEvent.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.session.commit()
+        
+        if not claimed:
+            return []
+        return db.session.execute(
+            select(OutboxEvent)
+            .where(OutboxEvent.id.in_(claimed))
+            .order_by(OutboxEvent.id)
+            .execution_options(populate_existing=True)
+        ).scalars().all()
+    
+    @staticmethod
+    def process_batch(limit=None):
+        """
+        Toma un lote y ejecuta el handler de cada evento
+        Retorna el número de eventos procesados (con éxito o con error)
+        Un error deja el evento pendiente con backoff exponencial; tras
+        OUTBOX_MAX_ATTEMPTS intentos queda 'failed' para revisión manual.
+        """
+        from app.services.outbox_handlers import OUTBOX_HANDLERS
+        
+        events = OutboxService.claim_batch(limit)
+        for event in events:
+            event_id = event.id
+            try:
+                handler = OUTBOX_HANDLERS.get(event.event_type)
+                if handler is None:
+                    raise LookupError(f"Sin handler para el evento '{event.event_type}'")
+                handler(event.payload)
+                
+                event.status = 'done'
+                event.processed_at = datetime.utcnow()
+                event.last_error = None
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('Error procesando el evento %s (%s)', event_id, event.event_type)
+                OutboxService._schedule_retry(event_id, e)
+        return len(events)
+    
+    @staticmethod
+    def _schedule_retry(event_id, error):
+        event = db.session.get(OutboxEvent, event_id)
+        event.last_error = repr(error)[:2000]
+        if event.attempts >= current_app.config['OUTBOX_MAX_ATTEMPTS']:
+            event.status = 'failed'
+        else:
+            event.status = 'pending'
+            event.available_at = datetime.utcnow() + timedelta(seconds=min(2 ** event.attempts, 300))
+        event.locked_at = None
+        db.session.commit()
+    
+    @staticmethod
+    def drain(limit=None):
+        """
+        Procesa lotes hasta vaciar la cola de eventos disponibles
+        Retorna el total procesado (el worker en modo --once y los tests)
+        """
+        total = 0
+        while True:
+            processed = OutboxService.process_batch(limit)
+            if not processed:
+                return total
+            total += processed
+    
+    @staticmethod
+    def stats():
+        """
+        Profundidad de la cola por estado y lag (antigüedad del pendiente más viejo)
+        """
+        counts = dict(
+            db.session.execute(
+                select(OutboxEvent.status, func.count()).group_by(OutboxEvent.status)
+            ).all()
+        )
+        oldest = db.session.execute(
+            select(func.min(OutboxEvent.created_at)).where(OutboxEvent.status.in_(['pending', 'processing']))
+        ).scalar()
+        return {
+            'depth': counts.get('pending', 0) + counts.get('processing', 0),
+            'by_status': {status: counts.get(status, 0) for status in ('pending', 'processing', 'done', 'failed')},
+            'lag_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+        }
+    
+    @staticmethod
+    def purge_processed():
+        """
+        Borra los eventos 'done' más antiguos que OUTBOX_RETENTION_HOURS
+        Retorna el número de eventos borrados
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=current_app.config['OUTBOX_RETENTION_HOURS'])
+        result = db.session.execute(
+            delete(OutboxEvent).where(OutboxEvent.status == 'done', OutboxEvent.processed_at < cutoff)
+        )
+        db.session.commit()
+        return result.rowcount
@@ -1,11 +1,47 @@
 from app import db
-from app.models import Product
-from sqlalchemy.exc import IntegrityError
+from app.models import Product, StockMovement
+from decimal import Decimal, InvalidOperation
+from app.services.stock_ledger_service import StockLedgerService
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.utils import CacheInvalidator, RowProjection, chunked, keyset_paginate
+from functools import lru_cache
 from werkzeug.exceptions import BadRequest, NotFound
 
 class ProductService:
     """Servicio para gestionar productos"""
     
+    # Ordenamientos permitidos en el listado paginado: nombre -> (columna, descendente)
+    SORT_OPTIONS = {
+        'id': ('id', False),
+        '-id': ('id', True),
+        'created_at': ('created_at', False),
+        '-created_at': ('created_at', True),
+        'price': ('price', False),
+        '-price': ('price', True),
+        'name': ('name', False),
+        '-name': ('name', True)
+    }
+    
+    # Importación masiva: filas por lote (un INSERT, un commit y una invalidación por lote)
+    BULK_BATCH_SIZE = 1000
+    # Máximo de errores detallados en el resumen (el resto solo se cuenta)
+    BULK_MAX_REPORTED_ERRORS = 1000
+    
+    # Campos que se pueden pedir con ?fields=
+    PROJECTABLE_FIELDS = [
+        'id', 'name', 'description', 'price', 'stock',
+        'category', 'image_url', 'created_at', 'updated_at'
+    ]
+    
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _projection(fields, sort_field):
+        """
+        Proyección (columnas + conversión a dict) para fields; se arma una vez por combinación
+        """
+        return RowProjection(Product, fields, extra=[sort_field], aliases={'stock': 'available_stock'})
+    
     @staticmethod
     def create_product(name, price, stock, description=None, category=None, image_url=None):
         """
@@ -29,6 +65,12 @@ class ProductService:
         
         try:
             db.session.add(product)
+            if stock:
+                # Saldo inicial en el libro de movimientos (ya incluido en el snapshot)
+                db.session.flush()
+                db.session.add(StockMovement(
+                    product_id=product.id, delta=stock, reason='initial', compacted=True
+                ))
             db.session.commit()
             return product
         except IntegrityError:
@@ -57,6 +99,210 @@ class ProductService:
         
         return query.all()
     
+    @staticmethod
+    def get_products_page(category=None, limit=50, cursor=None, sort='id', fields=None):
+        """
+        Obtiene una página del catálogo usando paginación por keyset
+        fields: lista de columnas a seleccionar (None = todas)
+        Retorna (lista de diccionarios, next_cursor)
+        """
+        if sort not in ProductService.SORT_OPTIONS:
+            raise BadRequest(
+                f"Orden inválido. Opciones: {', '.join(ProductService.SORT_OPTIONS)}"
+            )
+        sort_field, descending = ProductService.SORT_OPTIONS[sort]
+        sort_column = getattr(Product, sort_field)
+        
+        if fields:
+            invalid = [f for f in fields if f not in ProductService.PROJECTABLE_FIELDS]
+            if invalid:
+                raise BadRequest(f"Campos inválidos: {', '.join(invalid)}")
+            # id es necesario para construir el cursor
+            fields = tuple(dict.fromkeys(['id'] + list(fields)))
+        else:
+            fields = tuple(ProductService.PROJECTABLE_FIELDS)
+        
+        # Filas (Row) en lugar de objetos Product: mismo formato que to_dict, sin
+        # instanciar modelos ni pasar por el identity map
+        projection = ProductService._projection(fields, sort_field)
+        query = db.session.query(*projection.columns)
+        
+        if category:
+            query = query.filter(Product.category == category)
+        
+        rows, next_cursor = keyset_paginate(
+            query, sort_column, Product.id,
+            cursor=cursor, limit=limit, descending=descending
+        )
+        
+        products = projection.rows_to_dicts(rows)
+        
+        return products, next_cursor
+    
+    @staticmethod
+    def _normalize_bulk_row(row):
+        """
+        Valida y convierte una fila de importación (CSV trae todo como texto)
+        """
+        data = {}
+        
+        if row.get('id') is not None:
+            try:
+                data['id'] = int(row['id'])
+            except (TypeError, ValueError):
+                raise ValueError("id debe ser un número entero")
+        
+        if 'id' not in data:
+            for field in ('name', 'price', 'stock'):
+                if row.get(field) is None:
+                    raise ValueError(f"Campo {field} es requerido")
+        
+        if row.get('name') is not None:
+            name = str(row['name']).strip()
+            if not name or len(name) > 100:
+                raise ValueError("name debe tener entre 1 y 100 caracteres")
+            data['name'] = name
+        
+        if row.get('price') is not None:
+            try:
+                price = Decimal(str(row['price']))
+            except InvalidOperation:
+                raise ValueError("price debe ser numérico")
+            if not price.is_finite() or price <= 0:
+                raise ValueError("El precio debe ser mayor a 0")
+            data['price'] = price
+        
+        if row.get('stock') is not None:
+            try:
+                stock = int(row['stock'])
+            except (TypeError, ValueError):
+                raise ValueError("stock debe ser un número entero")
+            if stock < 0:
+                raise ValueError("El stock no puede ser negativo")
+            data['stock'] = stock
+        
+        for field in ('description', 'category', 'image_url'):
+            if row.get(field) is not None:
+                data[field] = str(row[field])
+        
+        return data
+    
+    @staticmethod
+    def bulk_upsert(rows, batch_size=None):
+        """
+        Importa productos en lotes desde un iterable de (línea, dict o excepción)
+        Filas sin id se insertan con INSERT ... VALUES multi-fila por lote;
+        filas con id actualizan el producto existente (un stock distinto se
+        registra como ajuste en el libro de movimientos).
+        Cada lote se confirma por separado e invalida el cache una sola vez,
+        y el iterable se consume de forma perezosa (memoria constante).
+        Retorna un resumen con conteos y errores por línea.
+        """
+        batch_size = batch_size or ProductService.BULK_BATCH_SIZE
+        summary = {'inserted': 0, 'updated': 0, 'failed': 0, 'errors': [], 'errors_truncated': 0}
+        
+        def report(line, error):
+            summary['failed'] += 1
+            if len(summary['errors']) < ProductService.BULK_MAX_REPORTED_ERRORS:
+                summary['errors'].append({'line': line, 'error': str(error)})
+            else:
+                summary['errors_truncated'] += 1
+        
+        for batch in chunked(rows, batch_size):
+            inserts, updates = [], []
+            for line, row in batch:
+                if isinstance(row, Exception):
+                    report(line, row)
+                    continue
+                try:
+                    data = ProductService._normalize_bulk_row(row)
+                except ValueError as e:
+                    report(line, e)
+                    continue
+                (updates if 'id' in data else inserts).append((line, data))
+            
+            previous_categories = set()
+            available = {}
+            if updates:
+                existing_rows = db.session.execute(
+                    select(Product.id, Product.category, Product.available_stock)
+                    .where(Product.id.in_([data['id'] for _, data in updates]))
+                ).all()
+                available = {row.id: row.available_stock for row in existing_rows}
+                previous_categories = {row.category for row in existing_rows}
+                for line, data in updates:
+                    if data['id'] not in available:
+                        report(line, f"Producto {data['id']} no encontrado")
+                updates = [(line, data) for line, data in updates if data['id'] in available]
+            
+            if not inserts and not updates:
+                continue
+            
+            # El stock de los existentes no se sobrescribe: la diferencia va al libro
+            adjustments = [
+                {'product_id': data['id'], 'delta': data['stock'] - available[data['id']], 'reason': 'adjustment'}
+                for _, data in updates if 'stock' in data
+            ]
+            product_updates = [
+                {field: value for field, value in data.items() if field != 'stock'}
+                for _, data in updates
+            ]
+            product_updates = [data for data in product_updates if len(data) > 1]
+            
+            try:
+                if inserts:
+                    # executemany: SQLAlchemy lo envía como INSERT ... VALUES (...), (...)
+                    # por lotes (insertmanyvalues) y reutiliza la sentencia compilada.
+                    # Todas las filas deben tener las mismas columnas.
+                    optional = dict.fromkeys(('description', 'category', 'image_url'))
+                    new_ids = db.session.execute(
+                        insert(Product).returning(Product.id, sort_by_parameter_order=True),
+                        [{**optional, **data} for _, data in inserts]
+                    ).scalars().all()
+                    # Saldo inicial de cada producto nuevo (ya incluido en el snapshot)
+                    opening = [
+                        {'product_id': product_id, 'delta': data['stock'], 'reason': 'initial', 'compacted': True}
+                        for product_id, (_, data) in zip(new_ids, inserts) if data['stock']
+                    ]
+                    if opening:
+                        db.session.execute(insert(StockMovement), opening)
+                if product_updates:
+                    db.session.execute(update(Product), product_updates)
+                StockLedgerService.apply_movements(adjustments)
+                db.session.commit()
+            except (SQLAlchemyError, BadRequest, NotFound) as e:
+                db.session.rollback()
+                error = e.description if isinstance(e, (BadRequest, NotFound)) else (
+                    f"Error de base de datos en el lote: {e.__class__.__name__}"
+                )
+                for line, _ in inserts + updates:
+                    report(line, error)
+                continue
+            
+            summary['inserted'] += len(inserts)
+            summary['updated'] += len(updates)
+            
+            categories = previous_categories | {data.get('category') for _, data in inserts + updates}
+            CacheInvalidator.invalidate_products(
+                *categories,
+                product_ids=[data['id'] for _, data in updates]
+            )
+        
+        return summary
+    
+    @staticmethod
+    def iter_products(category=None, batch_size=1000):
+        """
+        Recorre el catálogo completo en bloques (cursor del lado del servidor)
+        Pensado para exportaciones: no carga todas las filas en memoria
+        """
+        query = select(Product).order_by(Product.id).execution_options(yield_per=batch_size)
+        if category:
+            query = query.where(Product.category == category)
+        
+        for product in db.session.execute(query).scalars():
+            yield product
+    
     @staticmethod
     def update_product(product_id, **kwargs):
         """
@@ -74,8 +320,16 @@ class ProductService:
                 if field == 'price' and value <= 0:
                     raise BadRequest("El precio debe ser mayor a 0")
                 
-                if field == 'stock' and value < 0:
-                    raise BadRequest("El stock no puede ser negativo")
+                if field == 'stock':
+                    if value < 0:
+                        raise BadRequest("El stock no puede ser negativo")
+                    # El stock no se sobrescribe: se registra la diferencia como ajuste
+                    StockLedgerService.apply_movements([{
+                        'product_id': product.id,
+                        'delta': value - product.available_stock,
+                        'reason': 'adjustment'
+                    }])
+                    continue
                 
                 setattr(product, field, value)
         
@@ -104,21 +358,36 @@ class ProductService:
     @staticmethod
     def update_stock(product_id, quantity):
         """
-        Actualiza el stock de un producto
+        Actualiza el stock de un producto (movimiento 'adjustment' en el libro)
         quantity puede ser positivo (agregar) o negativo (reducir)
         """
         product = ProductService.get_product_by_id(product_id)
         
-        new_stock = product.stock + quantity
-        
-        if new_stock < 0:
-            raise BadRequest(f"Stock insuficiente. Stock actual: {product.stock}")
-        
-        product.stock = new_stock
-        db.session.commit()
+        try:
+            StockLedgerService.apply_movements([
+                {'product_id': product.id, 'delta': quantity, 'reason': 'adjustment'}
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
         return product
     
+    @staticmethod
+    def reserve_stock(quantities, order_id=None):
+        """
+        Descuenta el stock de varios productos: bloquea sus filas, valida el
+        disponible y registra las ventas en el libro con un INSERT
+        quantities: {product_id: cantidad}
+        Dos checkouts concurrentes nunca pueden vender más de lo disponible
+        (ver StockLedgerService.apply_movements). No hace commit.
+        """
+        StockLedgerService.apply_movements([
+            {'product_id': product_id, 'delta': -quantity, 'reason': 'sale', 'order_id': order_id}
+            for product_id, quantity in quantities.items()
+        ])
+    
     @staticmethod
     def check_stock_availability(product_id, quantity):
         """
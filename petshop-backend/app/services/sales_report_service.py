@@ -0,0 +1,386 @@
+from app import db
+from app.models import Order, OrderItem, Product, SalesDaily, ProductSalesDaily, ProductSalesMonthly
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from sqlalchemy import delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from app.utils import chunked
+from werkzeug.exceptions import BadRequest
+
+class SalesReportService:
+    """
+    Reportes de ventas sobre tablas de rollup (sales_daily, product_sales_daily,
+    product_sales_monthly). El checkout, la cancelación y la devolución ajustan
+    los rollups en su misma transacción; los reportes suman filas por día o por
+    mes y no recorren order_items.
+    """
+    
+    GRANULARITIES = ('day', 'week', 'month')
+    TOP_PRODUCTS_ORDER = ('revenue', 'units')
+    
+    # Filas por INSERT ... ON CONFLICT (límite de parámetros de SQLite)
+    UPSERT_BATCH_SIZE = 1000
+    
+    @staticmethod
+    def _upsert(model, keys, rows):
+        """
+        Suma los deltas de rows a las filas existentes (o las crea) en un solo INSERT
+        Las filas se ordenan por clave: checkouts concurrentes bloquean en el mismo orden
+        """
+        if not rows:
+            return
+        table = model.__table__
+        dialect_insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+        for batch in chunked(rows, SalesReportService.UPSERT_BATCH_SIZE):
+            statement = dialect_insert(table).values(batch)
+            statement = statement.on_conflict_do_update(
+                index_elements=keys,
+                set_={
+                    column: table.c[column] + statement.excluded[column]
+                    for column in batch[0] if column not in keys
+                }
+            )
+            db.session.execute(statement)
+    
+    @staticmethod
+    def record_status_change(order, items, old_status=None):
+        """
+        Ajusta los rollups del día de la orden al pasar de old_status a order.status
+        items: iterable de (product_id, quantity, subtotal)
+        old_status None: la orden es nueva (checkout)
+        No hace commit: va en la transacción del cambio de estado
+        """
+        SalesReportService.record_status_changes([(order, items, old_status)])
+    
+    @staticmethod
+    def record_status_changes(changes):
+        """
+        Igual que record_status_change para varias órdenes: los deltas se agrupan
+        por día y producto y se aplican con un INSERT por tabla
+        changes: iterable de (order, items, old_status)
+        """
+        daily = defaultdict(lambda: defaultdict(int))
+        products = defaultdict(lambda: {'units_sold': 0, 'revenue': 0})
+        
+        for order, items, old_status in changes:
+            if old_status == order.status:
+                continue
+            items = list(items)
+            day = order.created_at.date()
+            for status, sign in ((old_status, -1), (order.status, 1)):
+                if status == 'completed':
+                    daily[day]['orders_count'] += sign
+                    daily[day]['revenue'] += sign * order.total_amount
+                    for product_id, quantity, subtotal in items:
+                        daily[day]['units_sold'] += sign * quantity
+                        products[day, product_id]['units_sold'] += sign * quantity
+                        products[day, product_id]['revenue'] += sign * subtotal
+                elif status in ('cancelled', 'returned'):
+                    daily[day][f'{status}_orders'] += sign
+        
+        columns = ('orders_count', 'units_sold', 'revenue', 'cancelled_orders', 'returned_orders')
+        SalesReportService._upsert(SalesDaily, ['day'], [
+            {'day': day, **{name: deltas[name] for name in columns}}
+            for day, deltas in daily.items() if any(deltas.values())
+        ])
+        
+        monthly = defaultdict(lambda: {'units_sold': 0, 'revenue': 0})
+        for (day, product_id), deltas in products.items():
+            month = monthly[day.replace(day=1), product_id]
+            month['units_sold'] += deltas['units_sold']
+            month['revenue'] += deltas['revenue']
+        SalesReportService._upsert(ProductSalesDaily, ['day', 'product_id'], [
+            {'day': day, 'product_id': product_id, **deltas}
+            for (day, product_id), deltas in products.items()
+        ])
+        SalesReportService._upsert(ProductSalesMonthly, ['month', 'product_id'], [
+            {'month': month, 'product_id': product_id, **deltas}
+            for (month, product_id), deltas in monthly.items()
+        ])
+    
+    @staticmethod
+    def _next_month(day):
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    
+    @staticmethod
+    def _day_bounds(start=None, end=None):
+        """
+        Convierte el rango de parse_date_range (datetimes, end exclusivo) a días [desde, hasta)
+        """
+        start_day = start.date() if start else None
+        end_day = None
+        if end:
+            end_day = end.date() if end.time() == time.min else end.date() + timedelta(days=1)
+        return start_day, end_day
+    
+    @staticmethod
+    def _filter_days(query, column, start=None, end=None):
+        start_day, end_day = SalesReportService._day_bounds(start, end)
+        if start_day is not None:
+            query = query.where(column >= start_day)
+        if end_day is not None:
+            query = query.where(column < end_day)
+        return query
+    
+    @staticmethod
+    def _period(day, granularity):
+        if granularity == 'week':
+            return day - timedelta(days=day.weekday())  # Semana ISO: desde el lunes
+        if granularity == 'month':
+            return day.replace(day=1)
+        return day
+    
+    @staticmethod
+    def sales_report(granularity='day', start=None, end=None):
+        """
+        Ventas por período (día, semana o mes) y totales del rango
+        Retorna {'granularity', 'periods': [...], 'totals': {...}}
+        """
+        if granularity not in SalesReportService.GRANULARITIES:
+            raise BadRequest(
+                f"granularity inválido. Opciones: {', '.join(SalesReportService.GRANULARITIES)}"
+            )
+        
+        query = SalesReportService._filter_days(
+            select(
+                SalesDaily.day, SalesDaily.revenue, SalesDaily.orders_count, SalesDaily.units_sold,
+                SalesDaily.cancelled_orders, SalesDaily.returned_orders
+            ),
+            SalesDaily.day, start, end
+        )
+        rows = db.session.execute(query.order_by(SalesDaily.day))
+        
+        counters = ('orders_count', 'units_sold', 'cancelled_orders', 'returned_orders')
+        
+        def empty():
+            return {'revenue': Decimal('0'), **dict.fromkeys(counters, 0)}
+        
+        periods = {}
+        totals = empty()
+        for row in rows:
+            period = SalesReportService._period(row.day, granularity)
+            bucket = periods.setdefault(period, empty())
+            for target in (bucket, totals):
+                target['revenue'] += row.revenue
+                for counter in counters:
+                    target[counter] += getattr(row, counter)
+        
+        def to_dict(data):
+            orders = data['orders_count']
+            return {
+                **{counter: data[counter] for counter in counters},
+                'revenue': float(data['revenue']),
+                'average_order_value': round(float(data['revenue']) / orders, 2) if orders else 0.0
+            }
+        
+        return {
+            'granularity': granularity,
+            'periods': [{'period': period.isoformat(), **to_dict(data)} for period, data in periods.items()],
+            'totals': to_dict(totals)
+        }
+    
+    @staticmethod
+    def _product_sales(start=None, end=None):
+        """
+        Subconsulta (product_id, units_sold, revenue) del rango: los meses completos
+        salen de product_sales_monthly y solo los días de los bordes de product_sales_daily
+        """
+        start_day, end_day = SalesReportService._day_bounds(start, end)
+        first_month = start_day
+        if start_day is not None and start_day.day != 1:
+            first_month = SalesReportService._next_month(start_day)
+        last_month = end_day.replace(day=1) if end_day is not None else None  # exclusivo
+        
+        parts = []
+        if first_month is None or last_month is None or first_month < last_month:
+            monthly = select(ProductSalesMonthly.product_id, ProductSalesMonthly.units_sold, ProductSalesMonthly.revenue)
+            if first_month is not None:
+                monthly = monthly.where(ProductSalesMonthly.month >= first_month)
+            if last_month is not None:
+                monthly = monthly.where(ProductSalesMonthly.month < last_month)
+            parts.append(monthly)
+            edges = [(start_day, first_month), (last_month, end_day)]
+        else:
+            edges = [(start_day, end_day)]
+        
+        for edge_start, edge_end in edges:
+            if edge_start is None or edge_end is None or edge_start >= edge_end:
+                continue
+            parts.append(
+                select(ProductSalesDaily.product_id, ProductSalesDaily.units_sold, ProductSalesDaily.revenue)
+                .where(ProductSalesDaily.day >= edge_start, ProductSalesDaily.day < edge_end)
+            )
+        
+        if len(parts) == 1:
+            return parts[0].subquery()
+        return union_all(*parts).subquery()
+    
+    @staticmethod
+    def top_products(start=None, end=None, limit=10, by='revenue'):
+        """
+        Productos más vendidos del rango, por revenue o por unidades
+        """
+        if by not in SalesReportService.TOP_PRODUCTS_ORDER:
+            raise BadRequest(
+                f"by inválido. Opciones: {', '.join(SalesReportService.TOP_PRODUCTS_ORDER)}"
+            )
+        
+        sales = SalesReportService._product_sales(start, end)
+        units = func.sum(sales.c.units_sold).label('units_sold')
+        revenue = func.sum(sales.c.revenue).label('revenue')
+        ranking = (
+            select(sales.c.product_id, units, revenue)
+            .group_by(sales.c.product_id)
+            .having(units > 0)
+            .order_by((revenue if by == 'revenue' else units).desc(), sales.c.product_id)
+            .limit(limit)
+            .subquery()
+        )
+        
+        query = (
+            select(ranking, Product.name, Product.category)
+            .outerjoin(Product, Product.id == ranking.c.product_id)
+            .order_by(
+                (ranking.c.revenue if by == 'revenue' else ranking.c.units_sold).desc(),
+                ranking.c.product_id
+            )
+        )
+        return [
+            {
+                'product_id': row.product_id,
+                'name': row.name,
+                'category': row.category,
+                'units_sold': int(row.units_sold),
+                'revenue': float(row.revenue)
+            }
+            for row in db.session.execute(query)
+        ]
+    
+    @staticmethod
+    def category_revenue(start=None, end=None):
+        """
+        Revenue y unidades por categoría (categoría actual del producto)
+        """
+        sales = SalesReportService._product_sales(start, end)
+        units = func.sum(sales.c.units_sold).label('units_sold')
+        revenue = func.sum(sales.c.revenue).label('revenue')
+        query = (
+            select(Product.category, units, revenue)
+            .join(Product, Product.id == sales.c.product_id)
+            .group_by(Product.category)
+            .order_by(revenue.desc())
+        )
+        return [
+            {'category': row.category, 'units_sold': int(row.units_sold), 'revenue': float(row.revenue)}
+            for row in db.session.execute(query)
+            if row.units_sold
+        ]
+    
+    @staticmethod
+    def rebuild(start_day=None, end_day=None):
+        """
+        Recalcula los rollups desde orders/order_items para los días [start_day, end_day)
+        Sin rango, cubre desde la primera hasta la última orden y borra las filas fuera de ese rango.
+        Cada mes se borra y recalcula en su propia transacción; product_sales_monthly se
+        rearma desde los días del mes (incluidos los que quedan fuera del rango).
+        Retorna {'days': días recalculados, 'product_rows': filas de product_sales_daily}
+        """
+        full_rebuild = start_day is None and end_day is None
+        if start_day is None or end_day is None:
+            first, last = db.session.execute(
+                select(func.min(Order.created_at), func.max(Order.created_at))
+            ).one()
+            if first is None:
+                first = last = datetime.utcnow()
+            start_day = start_day or first.date()
+            end_day = end_day or last.date() + timedelta(days=1)
+        
+        day_column = func.date(Order.created_at, type_=db.Date)
+        result = {'days': 0, 'product_rows': 0}
+        chunk_start = start_day
+        
+        while chunk_start < end_day:
+            month = chunk_start.replace(day=1)
+            next_month = SalesReportService._next_month(month)
+            chunk_end = min(next_month, end_day)
+            window = (
+                Order.created_at >= datetime.combine(chunk_start, time.min),
+                Order.created_at < datetime.combine(chunk_end, time.min)
+            )
+            
+            daily = defaultdict(lambda: {
+                'orders_count': 0, 'units_sold': 0, 'revenue': 0,
+                'cancelled_orders': 0, 'returned_orders': 0
+            })
+            statuses = db.session.execute(
+                select(day_column, Order.status, func.count(), func.sum(Order.total_amount))
+                .where(*window)
+                .group_by(day_column, Order.status)
+            )
+            for day, status, count, amount in statuses:
+                if status == 'completed':
+                    daily[day]['orders_count'] = count
+                    daily[day]['revenue'] = amount
+                elif status in ('cancelled', 'returned'):
+                    daily[day][f'{status}_orders'] = count
+            
+            product_rows = []
+            items = db.session.execute(
+                select(day_column, OrderItem.product_id, func.sum(OrderItem.quantity), func.sum(OrderItem.subtotal))
+                .join(Order, Order.id == OrderItem.order_id)
+                .where(Order.status == 'completed', *window)
+                .group_by(day_column, OrderItem.product_id)
+            )
+            for day, product_id, quantity, amount in items:
+                daily[day]['units_sold'] += quantity
+                product_rows.append({'day': day, 'product_id': product_id, 'units_sold': quantity, 'revenue': amount})
+            
+            db.session.execute(delete(SalesDaily).where(SalesDaily.day >= chunk_start, SalesDaily.day < chunk_end))
+            db.session.execute(delete(ProductSalesDaily).where(
+                ProductSalesDaily.day >= chunk_start, ProductSalesDaily.day < chunk_end
+            ))
+            if daily:
+                db.session.execute(insert(SalesDaily), [{'day': day, **data} for day, data in daily.items()])
+            if product_rows:
+                db.session.execute(insert(ProductSalesDaily), product_rows)
+            SalesReportService._rebuild_month(month, next_month)
+            db.session.commit()
+            
+            result['days'] += (chunk_end - chunk_start).days
+            result['product_rows'] += len(product_rows)
+            chunk_start = chunk_end
+        
+        if full_rebuild:
+            # Días y meses sin órdenes fuera del rango (p. ej. órdenes borradas)
+            for model, column, lower, upper in (
+                (SalesDaily, SalesDaily.day, start_day, end_day),
+                (ProductSalesDaily, ProductSalesDaily.day, start_day, end_day),
+                (ProductSalesMonthly, ProductSalesMonthly.month, start_day.replace(day=1),
+                 SalesReportService._next_month(end_day - timedelta(days=1)))
+            ):
+                db.session.execute(delete(model).where(or_(column < lower, column >= upper)))
+            db.session.commit()
+        
+        return result
+    
+    @staticmethod
+    def _rebuild_month(month, next_month):
+        """
+        Rearma las filas de product_sales_monthly de un mes sumando product_sales_daily
+        """
+        db.session.execute(delete(ProductSalesMonthly).where(ProductSalesMonthly.month == month))
+        db.session.execute(
+            insert(ProductSalesMonthly).from_select(
+                ['month', 'product_id', 'units_sold', 'revenue'],
+                select(
+                    literal(month, db.Date),
+                    ProductSalesDaily.product_id,
+                    func.sum(ProductSalesDaily.units_sold),
+                    func.sum(ProductSalesDaily.revenue)
+                )
+                .where(ProductSalesDaily.day >= month, ProductSalesDaily.day < next_month)
+                .group_by(ProductSalesDaily.product_id)
+            )
+        )
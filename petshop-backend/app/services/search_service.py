@@ -0,0 +1,154 @@
+import re
+from app import db
+from app.models import Product
+from sqlalchemy import case, func, literal_column, select, table, column
+from werkzeug.exceptions import BadRequest
+
+class SearchService:
+    """Servicio de búsqueda de texto completo y facetas sobre el catálogo"""
+    
+    # Límites de los rangos de precio para la faceta de precios
+    PRICE_BUCKETS = [5000, 10000, 25000, 50000]
+    
+    # Pesos bm25 de FTS5 para (name, category, description)
+    FTS5_WEIGHTS = (10.0, 5.0, 1.0)
+    
+    @staticmethod
+    def _dialect():
+        return db.session.get_bind().dialect.name
+    
+    @staticmethod
+    def _price_bucket():
+        """
+        Expresión CASE que asigna cada producto a su rango de precio
+        """
+        bounds = SearchService.PRICE_BUCKETS
+        whens = []
+        lower = 0
+        for upper in bounds:
+            whens.append((Product.price < upper, f'{lower}-{upper}'))
+            lower = upper
+        return case(*whens, else_=f'{bounds[-1]}+')
+    
+    @staticmethod
+    def _fts5_query(q):
+        """
+        Convierte el texto del usuario en una consulta FTS5 segura:
+        cada palabra como prefijo y todas requeridas (AND)
+        """
+        terms = re.findall(r'\w+', q, flags=re.UNICODE)
+        return ' '.join(f'"{term}"*' for term in terms)
+    
+    @staticmethod
+    def _text_match(q):
+        """
+        Retorna (subconsulta con id y score) para el texto buscado, según la base de datos
+        score: mayor es más relevante
+        """
+        if SearchService._dialect() == 'postgresql':
+            ts_query = func.websearch_to_tsquery('spanish', q)
+            search_vector = literal_column('products.search_vector')
+            return (
+                select(
+                    Product.id.label('id'),
+                    func.ts_rank(search_vector, ts_query).label('score')
+                )
+                .where(search_vector.op('@@')(ts_query))
+                .subquery('matches')
+            )
+        
+        # SQLite: índice FTS5 (bm25 retorna valores más bajos para mejores resultados);
+        # los pesos por columna imitan setweight A/B/C de Postgres
+        fts_query = SearchService._fts5_query(q)
+        if not fts_query:
+            raise BadRequest("La búsqueda no contiene palabras válidas")
+        products_fts = table('products_fts', column('rowid'))
+        return (
+            select(
+                products_fts.c.rowid.label('id'),
+                (-func.bm25(literal_column('products_fts'), *SearchService.FTS5_WEIGHTS)).label('score')
+            )
+            .select_from(products_fts)
+            .where(literal_column('products_fts').op('MATCH')(fts_query))
+            .subquery('matches')
+        )
+    
+    @staticmethod
+    def search_products(q=None, category=None, min_price=None, max_price=None,
+                        in_stock=False, page=1, limit=20):
+        """
+        Busca productos por texto con filtros, ranking y facetas
+        Retorna {'products', 'total', 'page', 'limit', 'facets'}
+        Las facetas de categoría ignoran el filtro de categoría y las de precio
+        ignoran el filtro de precio, para mostrar cuántos resultados habría en cada opción.
+        """
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise BadRequest("min_price no puede ser mayor que max_price")
+        
+        matches = SearchService._text_match(q) if q else None
+        
+        def base(columns, skip=None):
+            query = select(*columns).select_from(Product)
+            if matches is not None:
+                query = query.join(matches, matches.c.id == Product.id)
+            if category and skip != 'category':
+                query = query.where(Product.category == category)
+            if min_price is not None and skip != 'price':
+                query = query.where(Product.price >= min_price)
+            if max_price is not None and skip != 'price':
+                query = query.where(Product.price <= max_price)
+            if in_stock:
+                query = query.where(Product.available_stock > 0)
+            return query
+        
+        # Resultados rankeados
+        score = matches.c.score if matches is not None else literal_column('NULL')
+        results_query = base([Product, score.label('score')])
+        if matches is not None:
+            results_query = results_query.order_by(matches.c.score.desc(), Product.id)
+        else:
+            results_query = results_query.order_by(Product.name, Product.id)
+        rows = db.session.execute(
+            results_query.limit(limit).offset((page - 1) * limit)
+        ).all()
+        
+        products = []
+        for product, row_score in rows:
+            data = product.to_dict()
+            data['score'] = round(float(row_score), 6) if row_score is not None else None
+            products.append(data)
+        
+        total = db.session.execute(
+            base([func.count()]).order_by(None)
+        ).scalar()
+        
+        # Facetas
+        category_rows = db.session.execute(
+            base([Product.category, func.count()], skip='category')
+            .group_by(Product.category)
+            .order_by(func.count().desc(), Product.category)
+        ).all()
+        
+        bucket = SearchService._price_bucket().label('bucket')
+        price_rows = dict(db.session.execute(
+            base([bucket, func.count()], skip='price').group_by(bucket)
+        ).all())
+        
+        bounds = [0] + SearchService.PRICE_BUCKETS
+        price_labels = [f'{bounds[i]}-{bounds[i + 1]}' for i in range(len(bounds) - 1)]
+        price_labels.append(f'{bounds[-1]}+')
+        
+        return {
+            'products': products,
+            'total': total,
+            'page': page,
+            'limit': limit,
+            'facets': {
+                'category': [
+                    {'value': value, 'count': count} for value, count in category_rows
+                ],
+                'price': [
+                    {'range': label, 'count': price_rows.get(label, 0)} for label in price_labels
+                ]
+            }
+        }
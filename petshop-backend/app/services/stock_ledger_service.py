@@ -0,0 +1,205 @@
+from app import db
+from app.models import Product, StockMovement
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import Integer, case, column, func, insert, select, update, values
+from app.utils import apply_date_range, keyset_paginate
+from werkzeug.exceptions import BadRequest, NotFound
+
+class StockLedgerService:
+    """
+    Libro de movimientos de stock (stock_movements) sobre el snapshot products.stock
+    Todo cambio de stock es un INSERT en el libro con su motivo; ninguno escribe
+    la fila del producto. Los que restan (ventas, ajustes a la baja) bloquean
+    antes la fila del producto y validan contra el disponible.
+    Stock disponible = snapshot + pendientes (Product.available_stock);
+    `flask stock compact` suma los pendientes al snapshot.
+    """
+    
+    @staticmethod
+    def apply_movements(movements):
+        """
+        Registra movimientos de stock con un único INSERT
+        movements: [{'product_id', 'delta', 'reason', 'order_id'?}] (ver StockMovement.REASONS)
+        Si el lote deja algún producto con saldo negativo se valida antes su
+        disponible (ver _check_available); si alguno no existe o no alcanza lanza
+        NotFound o BadRequest. No hace commit ni rollback: la transacción es del llamador.
+        """
+        movements = [movement for movement in movements if movement['delta']]
+        if not movements:
+            return
+        
+        net = defaultdict(int)
+        for movement in movements:
+            net[movement['product_id']] += movement['delta']
+        decrements = {product_id: delta for product_id, delta in net.items() if delta < 0}
+        
+        if decrements:
+            StockLedgerService._check_available(decrements)
+        
+        db.session.execute(insert(StockMovement), [
+            {
+                'product_id': movement['product_id'],
+                'delta': movement['delta'],
+                'reason': movement['reason'],
+                'order_id': movement.get('order_id')
+            }
+            for movement in movements
+        ])
+    
+    @staticmethod
+    def _check_available(decrements):
+        """
+        Bloquea las filas de los productos (SELECT ... FOR UPDATE, en orden de id
+        para no generar deadlocks entre checkouts) y valida snapshot + pendientes
+        El bloqueo no escribe la fila; dos descuentos concurrentes del mismo
+        producto se serializan hasta el commit, así que nunca venden más de lo
+        disponible. El disponible se lee en una segunda consulta: con READ
+        COMMITTED ve los movimientos que confirmó quien tenía el bloqueo (la
+        subconsulta de la primera usaría la foto anterior a la espera).
+        SQLite ignora FOR UPDATE: serializa las escrituras a nivel de base.
+        """
+        product_ids = sorted(decrements)
+        db.session.execute(
+            select(Product.id).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+        ).all()
+        rows = db.session.execute(
+            select(Product.id, Product.name, Product.available_stock).where(Product.id.in_(product_ids))
+        ).all()
+        
+        found = {row.id for row in rows}
+        for product_id in product_ids:
+            if product_id not in found:
+                raise NotFound(f"Producto {product_id} no encontrado")
+        for row in sorted(rows, key=lambda row: row.id):
+            if row.available_stock + decrements[row.id] < 0:
+                raise BadRequest(
+                    f"Stock insuficiente para {row.name}. "
+                    f"Disponible: {row.available_stock}, Solicitado: {-decrements[row.id]}"
+                )
+    
+    @staticmethod
+    def _compact_pending(product_ids):
+        """
+        Marca como compactados los movimientos pendientes de los productos y
+        retorna ({product_id: suma}, filas) de exactamente esas filas (RETURNING)
+        Dos transacciones nunca compactan el mismo movimiento: la segunda
+        espera el bloqueo de la fila y la descarta al ver compacted = true.
+        """
+        rows = db.session.execute(
+            update(StockMovement)
+            .where(StockMovement.product_id.in_(product_ids), ~StockMovement.compacted)
+            .values(compacted=True)
+            .returning(StockMovement.product_id, StockMovement.delta)
+            .execution_options(synchronize_session=False)
+        ).all()
+        
+        folded = defaultdict(int)
+        for row in rows:
+            folded[row.product_id] += row.delta
+        return folded, len(rows)
+    
+    @staticmethod
+    def _update_snapshots(deltas):
+        """
+        Suma a products.stock el delta de cada producto con un único UPDATE
+        Postgres: UPDATE ... FROM (VALUES ...); otros motores: CASE por id.
+        Los descuentos ya se validaron al registrarlos (ver _check_available).
+        """
+        if db.engine.dialect.name == 'postgresql':
+            rows = values(
+                column('product_id', Integer), column('delta', Integer), name='deltas'
+            ).data(sorted(deltas.items()))
+            delta = rows.c.delta
+            statement = update(Product).where(Product.id == rows.c.product_id)
+        else:
+            delta = case(deltas, value=Product.id)
+            statement = update(Product).where(Product.id.in_(list(deltas)))
+        
+        db.session.execute(
+            statement
+            .values(stock=Product.stock + delta)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def compact(batch_size=None):
+        """
+        Suma los movimientos pendientes al snapshot de cada producto, de a
+        batch_size productos (STOCK_COMPACT_BATCH_SIZE) por transacción
+        Recorre los productos una vez en orden de id: lo que llegue mientras
+        corre queda para la próxima pasada.
+        Retorna {'products', 'movements', 'batches'}
+        """
+        batch_size = batch_size or current_app.config['STOCK_COMPACT_BATCH_SIZE']
+        stats = {'products': 0, 'movements': 0, 'batches': 0}
+        last_id = 0
+        
+        while True:
+            product_ids = db.session.execute(
+                select(StockMovement.product_id)
+                .where(~StockMovement.compacted, StockMovement.product_id > last_id)
+                .group_by(StockMovement.product_id)
+                .order_by(StockMovement.product_id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not product_ids:
+                db.session.commit()
+                return stats
+            last_id = product_ids[-1]
+            
+            try:
+                # Mismo orden de bloqueo que los descuentos (_check_available)
+                db.session.execute(
+                    select(Product.id).where(Product.id.in_(product_ids)).order_by(Product.id).with_for_update()
+                ).all()
+                folded, count = StockLedgerService._compact_pending(product_ids)
+                if folded:
+                    StockLedgerService._update_snapshots(folded)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            
+            stats['products'] += len(folded)
+            stats['movements'] += count
+            stats['batches'] += 1
+    
+    @staticmethod
+    def stock_at(product_id, at):
+        """
+        Stock disponible de un producto en el instante at
+        Se reconstruye hacia atrás desde el disponible actual restando los
+        movimientos posteriores: no necesita el historial completo, y antes
+        del primer movimiento registrado retorna el saldo de ese momento.
+        """
+        later = (
+            select(func.coalesce(func.sum(StockMovement.delta), 0))
+            .where(StockMovement.product_id == Product.id, StockMovement.created_at > at)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+        stock = db.session.execute(
+            select(Product.available_stock - later).where(Product.id == product_id)
+        ).scalar()
+        if stock is None:
+            raise NotFound(f"Producto {product_id} no encontrado")
+        return stock
+    
+    @staticmethod
+    def get_movements_page(product_id, limit=50, cursor=None, start=None, end=None):
+        """
+        Movimientos de un producto, del más reciente al más antiguo (keyset por id)
+        Retorna (lista de movimientos, next_cursor)
+        """
+        if db.session.get(Product, product_id) is None:
+            raise NotFound(f"Producto {product_id} no encontrado")
+        
+        query = apply_date_range(
+            StockMovement.query.filter(StockMovement.product_id == product_id),
+            StockMovement.created_at, start, end
+        )
+        return keyset_paginate(
+            query, StockMovement.id, StockMovement.id,
+            cursor=cursor, limit=limit, descending=True
+        )
@@ -1,7 +1,18 @@
-from app import db
+import hashlib
+import hmac
+import math
+from app import db, cache
 from app.models import User
+from app.utils import (
+    LoginStats, TokenBucket, apply_date_range, keyset_paginate, needs_rehash, revoke_user_tokens
+)
+from flask import current_app
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from werkzeug.exceptions import BadRequest, NotFound, Conflict
+from werkzeug.exceptions import BadRequest, NotFound, Conflict, TooManyRequests
+
+# Valores de ejemplo de config.py: nunca sirven como clave del cache de credenciales
+DEFAULT_SECRETS = ('dev-secret-key', 'jwt-secret-key')
 
 class UserService:
     """Servicio para gestionar usuarios y autenticación"""
@@ -38,15 +49,101 @@ class UserService:
             raise Conflict("Error al crear usuario")
     
     @staticmethod
-    def authenticate(email, password):
+    def _login_buckets():
+        config = current_app.config
+        return (
+            TokenBucket('login-ip', config['LOGIN_IP_BURST'], config['LOGIN_IP_RATE']),
+            TokenBucket('login-account-ip', config['LOGIN_ACCOUNT_BURST'], config['LOGIN_ACCOUNT_RATE']),
+            TokenBucket('login-account', config['LOGIN_ACCOUNT_GLOBAL_BURST'], config['LOGIN_ACCOUNT_GLOBAL_RATE'])
+        )
+    
+    @staticmethod
+    def _account_key(email):
+        # El email no va en claro en las keys del cache
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+    
+    @staticmethod
+    def _retry_after(wait):
+        # Un bucket con rate 0 no se recupera (espera infinita): sin Retry-After
+        return None if math.isinf(wait) else math.ceil(wait)
+    
+    @staticmethod
+    def _verified_secret():
+        """
+        Clave del cache de credenciales verificadas (LOGIN_VERIFIED_SECRET) o None si
+        el cache está desactivado: sin TTL, sin clave, con una clave de ejemplo o
+        reutilizando SECRET_KEY/JWT_SECRET_KEY
+        """
+        config = current_app.config
+        secret = config.get('LOGIN_VERIFIED_SECRET')
+        if not config['LOGIN_VERIFIED_TTL'] or not secret or secret in DEFAULT_SECRETS:
+            return None
+        if secret in (config.get('SECRET_KEY'), config.get('JWT_SECRET_KEY')):
+            return None
+        return secret
+    
+    @staticmethod
+    def _verified_digest(secret, user, password):
+        """
+        HMAC de la contraseña y el hash guardado: no sirve para adivinar la
+        contraseña sin la clave (que no vive en el cache) y deja de coincidir al cambiarla
+        """
+        message = f'{user.password_hash}\0{password}'.encode()
+        return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    
+    @staticmethod
+    def authenticate(email, password, remote_addr=None):
         """
-        Autentica un usuario con email y password
+        Autentica un usuario con email y password, de lo más barato a lo más caro:
+        1. Token buckets en el cache: por IP (cada intento), por cuenta+IP (fallidos) y
+           por cuenta desde cualquier IP (fallidos, límite mucho más alto). Los fallos de
+           una IP no bloquean la cuenta para las demás hasta llegar al límite global
+        2. Búsqueda del usuario por email
+        3. Cache de credenciales verificadas (HMAC con LOGIN_VERIFIED_SECRET en lugar del hash lento)
+        4. Hash de la contraseña; si fue generado con otro PASSWORD_HASH_METHOD se regenera
+        Lanza TooManyRequests (con retry_after, None si el bucket no se recupera) si se supera un límite
         """
+        ip_bucket, account_ip_bucket, account_bucket = UserService._login_buckets()
+        remote_addr = remote_addr or 'unknown'
+        account = UserService._account_key(email)
+        account_ip = f'{account}:{remote_addr}'
+        
+        wait = ip_bucket.consume(remote_addr)
+        if wait:
+            LoginStats.record('rate_limited_ip')
+            raise TooManyRequests("Demasiados intentos de inicio de sesión", retry_after=UserService._retry_after(wait))
+        wait = max(account_ip_bucket.retry_after(account_ip), account_bucket.retry_after(account))
+        if wait:
+            LoginStats.record('rate_limited_account')
+            raise TooManyRequests("Demasiados intentos fallidos para esta cuenta", retry_after=UserService._retry_after(wait))
+        
         user = User.query.filter_by(email=email).first()
         
+        verified_secret = UserService._verified_secret()
+        verified_key = f'auth:verified:{user.id}' if user else None
+        if user and verified_secret:
+            cached = cache.get(verified_key)
+            if cached and hmac.compare_digest(cached, UserService._verified_digest(verified_secret, user, password)):
+                LoginStats.record('verified_cache')
+                return user
+        
         if not user or not user.check_password(password):
+            account_ip_bucket.consume(account_ip)
+            account_bucket.consume(account)
+            LoginStats.record('invalid')
             raise BadRequest("Credenciales inválidas")
         
+        if needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
+            LoginStats.record('rehashed')
+        
+        if verified_secret:
+            cache.set(
+                verified_key, UserService._verified_digest(verified_secret, user, password),
+                timeout=current_app.config['LOGIN_VERIFIED_TTL']
+            )
+        LoginStats.record('success')
         return user
     
     @staticmethod
@@ -70,19 +167,44 @@ class UserService:
         return user
     
     @staticmethod
-    def get_all_users():
+    def _filter_users(query, role=None, start=None, end=None):
+        if role:
+            if role not in ['admin', 'client']:
+                raise BadRequest("Rol inválido")
+            query = query.where(User.role == role)
+        return apply_date_range(query, User.created_at, start, end)
+    
+    @staticmethod
+    def get_users_page(role=None, start=None, end=None, limit=50, cursor=None):
         """
-        Obtiene todos los usuarios
+        Obtiene una página de usuarios, del más reciente al más antiguo
+        start/end: rango de created_at (ver parse_date_range)
+        Retorna (usuarios, next_cursor)
         """
-        return User.query.all()
+        query = UserService._filter_users(User.query, role, start, end)
+        return keyset_paginate(
+            query, User.created_at, User.id,
+            cursor=cursor, limit=limit, descending=True
+        )
+    
+    @staticmethod
+    def iter_users(role=None, start=None, end=None, batch_size=1000):
+        """
+        Recorre todos los usuarios filtrados en bloques (cursor del lado del servidor)
+        """
+        query = UserService._filter_users(select(User), role, start, end)
+        query = query.order_by(User.created_at.desc(), User.id.desc())
+        return db.session.execute(query.execution_options(yield_per=batch_size)).scalars()
     
     @staticmethod
     def update_user(user_id, **kwargs):
         """
         Actualiza un usuario
         Campos permitidos: first_name, last_name, email
+        Cambiar el email revoca los tokens emitidos (llevan el email como claim)
         """
         user = UserService.get_user_by_id(user_id)
+        previous_email = user.email
         
         # Campos permitidos para actualizar
         allowed_fields = ['first_name', 'last_name', 'email']
@@ -98,10 +220,13 @@ class UserService:
         
         try:
             db.session.commit()
-            return user
         except IntegrityError:
             db.session.rollback()
             raise Conflict("Error al actualizar usuario")
+        
+        if user.email != previous_email:
+            revoke_user_tokens(user_id)
+        return user
     
     @staticmethod
     def delete_user(user_id):
@@ -113,6 +238,7 @@ class UserService:
         try:
             db.session.delete(user)
             db.session.commit()
+            revoke_user_tokens(user_id)
             return True
         except Exception as e:
             db.session.rollback()
@@ -121,7 +247,7 @@ class UserService:
     @staticmethod
     def change_password(user_id, old_password, new_password):
         """
-        Cambia la contraseña de un usuario
+        Cambia la contraseña de un usuario y revoca sus tokens emitidos hasta ahora
         """
         user = UserService.get_user_by_id(user_id)
         
@@ -130,4 +256,5 @@ class UserService:
         
         user.set_password(new_password)
         db.session.commit()
+        revoke_user_tokens(user_id)
         return user
\ No newline at end of file
@@ -1,6 +1,55 @@
-from app.utils.cache_utils import CacheKeys, CacheInvalidator
+from app.utils.cache_utils import CacheKeys, CacheTags, CacheInvalidator
+from app.utils.cache_decorators import cached_view, get_or_compute, CacheStats
+from app.utils.query_profiles import apply_load_profile
+from app.utils.query_counter import QueryCounter, assert_max_queries
+from app.utils.pagination import (
+    encode_cursor, decode_cursor, keyset_paginate, parse_limit,
+    parse_date_range, apply_date_range
+)
+from app.utils.pool_stats import TimedQueuePool, pool_status
+from app.utils.bulk_io import iter_csv_rows, iter_ndjson_rows, chunked, csv_lines, ndjson_lines
+from app.utils.json_provider import FastJSONProvider, json_default
+from app.utils.serialization import RowProjection
+from app.utils.rate_limit import TokenBucket
+from app.utils.passwords import LoginStats, hash_password, verify_password, needs_rehash
+from app.utils.token_revocation import (
+    revoke_token, revoke_user_tokens, is_token_revoked, purge_revoked_tokens, issued_at_ms
+)
 
 __all__ = [
     'CacheKeys',
-    'CacheInvalidator'
-]
\ No newline at end of file
+    'CacheTags',
+    'CacheInvalidator',
+    'cached_view',
+    'get_or_compute',
+    'CacheStats',
+    'apply_load_profile',
+    'QueryCounter',
+    'assert_max_queries',
+    'encode_cursor',
+    'decode_cursor',
+    'keyset_paginate',
+    'parse_limit',
+    'parse_date_range',
+    'apply_date_range',
+    'iter_csv_rows',
+    'iter_ndjson_rows',
+    'chunked',
+    'csv_lines',
+    'ndjson_lines',
+    'FastJSONProvider',
+    'json_default',
+    'RowProjection',
+    'TokenBucket',
+    'LoginStats',
+    'hash_password',
+    'verify_password',
+    'needs_rehash',
+    'revoke_token',
+    'revoke_user_tokens',
+    'is_token_revoked',
+    'purge_revoked_tokens',
+    'issued_at_ms',
+    'TimedQueuePool',
+    'pool_status'
+]
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from itertools import islice
+from flask import current_app
+
+def iter_csv_rows(stream, encoding='utf-8'):
+    """
+    Lee un CSV (con encabezado) desde un stream binario, fila por fila
+    Genera (número de línea, dict o excepción)
+    """
+    text = io.TextIOWrapper(stream, encoding=encoding, newline='')
+    reader = csv.DictReader(text)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except (csv.Error, UnicodeDecodeError) as e:
+            yield reader.line_num, e
+            continue
+        # Campos vacíos del CSV se interpretan como ausentes
+        yield reader.line_num, {k: v for k, v in row.items() if k and v not in (None, '')}
+
+def iter_ndjson_rows(stream, encoding='utf-8'):
+    """
+    Lee NDJSON (un objeto JSON por línea) desde un stream binario
+    Genera (número de línea, dict o excepción); ignora líneas vacías
+    """
+    for line_num, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line.decode(encoding))
+        except (ValueError, UnicodeDecodeError) as e:
+            yield line_num, e
+            continue
+        if not isinstance(row, dict):
+            yield line_num, ValueError("Cada línea debe ser un objeto JSON")
+            continue
+        yield line_num, row
+
+def chunked(iterable, size):
+    """
+    Agrupa un iterable en listas de tamaño size sin materializarlo completo
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def csv_lines(rows, fieldnames):
+    """
+    Genera un CSV línea por línea a partir de diccionarios
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+def ndjson_lines(rows):
+    """
+    Genera NDJSON línea por línea a partir de diccionarios
+    Usa el serializador de la app (orjson si está disponible, ver JSON_BACKEND)
+    """
+    dumps = current_app.json.dumps_line
+    for row in rows:
+        yield dumps(row) + '\n'
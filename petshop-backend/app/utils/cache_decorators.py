@@ -0,0 +1,217 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+from app import cache
+from app.utils.cache_utils import CacheTags
+
+class CacheStats:
+    """
+    Contadores de cache por vista (en memoria del proceso)
+    hit: respuesta fresca desde cache
+    miss: se recalculó el valor
+    stale: se sirvió un valor vencido mientras otro worker lo recalcula
+    coalesced: se esperó el resultado que calculaba otro request
+    early_refresh: se recalculó antes de vencer (refresco probabilístico)
+    """
+    EVENTS = ('hit', 'miss', 'stale', 'coalesced', 'early_refresh')
+    
+    _lock = threading.Lock()
+    _counters = defaultdict(lambda: dict.fromkeys(CacheStats.EVENTS, 0))
+    
+    @classmethod
+    def record(cls, name, event):
+        with cls._lock:
+            cls._counters[name][event] += 1
+    
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            return {name: dict(counters) for name, counters in cls._counters.items()}
+    
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._counters.clear()
+
+class _SingleFlight:
+    """
+    Agrupa los cálculos concurrentes de una misma key dentro del proceso:
+    el primer hilo calcula y los demás esperan su resultado.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def run(self, key, fn):
+        """
+        Retorna (resultado, True si se esperó a otro hilo)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'event': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+        
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+        
+        try:
+            call['result'] = fn()
+            return call['result'], False
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['event'].set()
+
+_single_flight = _SingleFlight()
+
+def _config(name, default):
+    return current_app.config.get(name, default)
+
+def get_or_compute(key, compute, timeout, stale_ttl=None, name=None, should_cache=None):
+    """
+    Obtiene un valor del cache o lo calcula, protegiendo contra estampidas
+    - Single-flight: un solo request (por proceso y entre workers, con un lock
+      en el cache) recalcula; los demás esperan o reciben el valor vencido.
+    - Stale-while-revalidate: durante stale_ttl segundos después de vencer se
+      sirve el valor viejo mientras un worker lo recalcula.
+    - Refresco temprano probabilístico (XFetch): cuanto más cerca del vencimiento
+      y más caro el cálculo, más probable que un request lo refresque antes.
+    should_cache: callable que decide si el valor calculado se guarda
+    """
+    name = name or key
+    if stale_ttl is None:
+        stale_ttl = _config('CACHE_STALE_TTL', 60)
+    beta = _config('CACHE_EARLY_REFRESH_BETA', 1.0)
+    lock_key = f'lock/{key}'
+    
+    def recompute():
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        if should_cache is None or should_cache(value):
+            entry = {'value': value, 'expires_at': time.time() + timeout, 'delta': delta}
+            cache.set(key, entry, timeout=timeout + stale_ttl)
+        return value
+    
+    def recompute_with_lock():
+        try:
+            return recompute()
+        finally:
+            cache.delete(lock_key)
+    
+    entry = cache.get(key)
+    now = time.time()
+    
+    if entry is not None:
+        expires_at = entry['expires_at']
+        if now < expires_at:
+            # XFetch: now - delta * beta * ln(rand) >= expiry
+            early = now - entry['delta'] * beta * math.log(random.random() or 1e-12) >= expires_at
+            if early and cache.add(lock_key, 1, timeout=_config('CACHE_LOCK_TIMEOUT', 10)):
+                CacheStats.record(name, 'early_refresh')
+                return recompute_with_lock()
+            CacheStats.record(name, 'hit')
+            return entry['value']
+        
+        # Vencido pero dentro de la ventana stale
+        if cache.add(lock_key, 1, timeout=_config('CACHE_LOCK_TIMEOUT', 10)):
+            CacheStats.record(name, 'miss')
+            return recompute_with_lock()
+        CacheStats.record(name, 'stale')
+        return entry['value']
+    
+    def fill():
+        # Otro worker puede estar calculando: esperar un momento su resultado
+        if not cache.add(lock_key, 1, timeout=_config('CACHE_LOCK_TIMEOUT', 10)):
+            deadline = time.time() + _config('CACHE_COALESCE_WAIT', 5)
+            while time.time() < deadline:
+                time.sleep(0.05)
+                waited = cache.get(key)
+                if waited is not None:
+                    return waited['value'], True
+            return recompute(), False
+        return recompute_with_lock(), False
+    
+    (value, coalesced_remote), coalesced_local = _single_flight.run(key, fill)
+    CacheStats.record(name, 'coalesced' if coalesced_local or coalesced_remote else 'miss')
+    return value
+
+def _default_cache_key():
+    """
+    Key base por defecto: ruta + query string ordenada
+    """
+    query = urlencode(sorted(request.args.items(multi=True)))
+    return f'view/{request.path}?{query}' if query else f'view/{request.path}'
+
+def response_etag(body):
+    """
+    ETag fuerte a partir del contenido de la respuesta
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def cached_view(timeout, tags, key_prefix=None, stale_ttl=None, unless=None, http_cache=False):
+    """
+    Cachea la respuesta de una vista registrándola con tags
+    tags: lista de tags o callable que recibe los kwargs de la vista
+          Ej: tags=lambda product_id: [CacheTags.PRODUCT.format(product_id)]
+    key_prefix: callable que retorna la key base (por defecto ruta + query string)
+    stale_ttl: segundos en que se sirve el valor vencido mientras se recalcula
+               (por defecto CACHE_STALE_TTL)
+    unless: callable sin argumentos; si retorna True la vista se ejecuta sin
+            cache (ej. respuestas en streaming que no deben guardarse en memoria)
+    http_cache: solo vistas públicas. Agrega ETag (hash del cuerpo, calculado una
+                vez al cachear) y Cache-Control public con max-age=timeout, y
+                responde 304 sin cuerpo si If-None-Match coincide
+    Solo se cachean respuestas 200. Usa get_or_compute, así que un request
+    recalcula mientras los demás esperan o reciben el valor anterior.
+    Uso:
+        @product_bp.route('/<int:product_id>')
+        @cached_view(timeout=600, tags=lambda product_id: [...])
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if unless is not None and unless():
+                return fn(*args, **kwargs)
+            
+            view_tags = tags(**kwargs) if callable(tags) else tags
+            base_key = key_prefix() if key_prefix else _default_cache_key()
+            cache_key = CacheTags.make_key(base_key, view_tags)
+            
+            def render():
+                response = make_response(fn(*args, **kwargs))
+                body = response.get_data()
+                return (body, response.status_code, response.content_type, response_etag(body))
+            
+            body, status, content_type, *etag = get_or_compute(
+                cache_key, render, timeout,
+                stale_ttl=stale_ttl,
+                name=request.endpoint,
+                should_cache=lambda rendered: rendered[1] == 200
+            )
+            response = current_app.response_class(body, status=status, content_type=content_type)
+            if not http_cache or status != 200:
+                return response
+            
+            # Entradas cacheadas antes de guardar el ETag no lo traen
+            response.set_etag(etag[0] if etag else response_etag(body))
+            response.cache_control.public = True
+            response.cache_control.max_age = timeout
+            return response.make_conditional(request)
+        return decorator
+    return wrapper
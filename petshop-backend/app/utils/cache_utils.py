@@ -1,3 +1,4 @@
+import uuid
 from app import cache
 
 class CacheKeys:
@@ -9,6 +10,7 @@ class CacheKeys:
     ALL_PRODUCTS = 'all_products'
     PRODUCTS_BY_CATEGORY = 'products_category_{}'
     PRODUCT_DETAIL = 'product_{}'
+    PRODUCTS_PAGE = 'products_page_{category}_{sort}_{limit}_{cursor}_{fields}'
     
     # Payment Methods
     ALL_PAYMENT_METHODS = 'all_payment_methods'
@@ -21,32 +23,99 @@ class CacheKeys:
     INVOICE_BY_NUMBER = 'invoice_number_{}'
     INVOICE_BY_ORDER = 'invoice_order_{}'
 
+class CacheTags:
+    """
+    Invalidación por tags con versionado
+    Cada entrada cacheada se registra con tags (products, product:42,
+    category:alimento...) y su key incluye la versión actual de cada tag.
+    Invalidar un tag solo cambia su versión (O(1)): las entradas viejas
+    quedan inaccesibles y expiran solas por TTL, sin recorrer keys.
+    Funciona igual con los backends simple y redis porque solo usa get/set/add.
+    """
+    # Tags
+    PRODUCTS = 'products'
+    PRODUCT = 'product:{}'
+    CATEGORY = 'category:{}'
+    PAYMENT_METHODS = 'payment_methods'
+    PAYMENT_METHOD = 'payment_method:{}'
+    INVOICES = 'invoices'
+    INVOICE = 'invoice:{}'
+    INVOICE_NUMBER = 'invoice_number:{}'
+    INVOICE_ORDER = 'invoice_order:{}'
+    
+    VERSION_KEY = 'tag_version_{}'
+    
+    @staticmethod
+    def get_versions(tags):
+        """
+        Obtiene la versión actual de cada tag, inicializando las que no existen
+        """
+        if not tags:
+            return {}
+        
+        keys = [CacheTags.VERSION_KEY.format(tag) for tag in tags]
+        versions = dict(zip(tags, cache.get_many(*keys)))
+        
+        for tag, key in zip(tags, keys):
+            if versions[tag] is None:
+                # Versión aleatoria: si la key se perdió, no revive entradas viejas
+                new_version = uuid.uuid4().hex[:12]
+                if not cache.add(key, new_version, timeout=0):
+                    new_version = cache.get(key) or new_version
+                versions[tag] = new_version
+        
+        return versions
+    
+    @staticmethod
+    def make_key(base_key, tags):
+        """
+        Construye la key final a partir de la key base y las versiones de sus tags
+        """
+        versions = CacheTags.get_versions(sorted(set(tags)))
+        suffix = ';'.join(f'{tag}={version}' for tag, version in versions.items())
+        return f'{base_key}|{suffix}' if suffix else base_key
+    
+    @staticmethod
+    def invalidate(*tags):
+        """
+        Invalida todas las entradas registradas con alguno de los tags
+        """
+        if not tags:
+            return
+        cache.set_many(
+            {CacheTags.VERSION_KEY.format(tag): uuid.uuid4().hex[:12] for tag in tags},
+            timeout=0
+        )
+
 class CacheInvalidator:
     """
     Maneja la invalidación de cache cuando los datos cambian
     """
     
     @staticmethod
-    def invalidate_products():
-        """
-        Invalida todo el cache relacionado con productos
-        Se debe llamar cuando se crea, actualiza o elimina un producto
-        """
-        cache.delete(CacheKeys.ALL_PRODUCTS)
-        # Invalidar cache de todas las categorías
-        # (En una implementación real, podrías llevar un registro de categorías)
-        cache.delete_many(*[
-            CacheKeys.PRODUCTS_BY_CATEGORY.format(cat) 
-            for cat in ['alimento', 'juguete', 'accesorio', 'medicina', 'higiene']
-        ])
+    def invalidate_products(*categories, product_ids=()):
+        """
+        Invalida los listados de productos
+        Se debe llamar cuando se crea, actualiza o elimina un producto;
+        categories: categorías afectadas, para invalidar sus listados filtrados
+        product_ids: productos cuyo detalle también cambió (importación masiva)
+        """
+        CacheTags.invalidate(
+            CacheTags.PRODUCTS,
+            *[CacheTags.CATEGORY.format(category) for category in categories if category],
+            *[CacheTags.PRODUCT.format(product_id) for product_id in product_ids]
+        )
     
     @staticmethod
-    def invalidate_product(product_id):
+    def invalidate_product(product_id, *categories):
         """
-        Invalida el cache de un producto específico
+        Invalida el cache de un producto específico y los listados que lo incluyen
         """
-        cache.delete(CacheKeys.PRODUCT_DETAIL.format(product_id))
-        CacheInvalidator.invalidate_products()
+        CacheTags.invalidate(
+            CacheTags.PRODUCT.format(product_id),
+            CacheTags.PRODUCTS,
+            *[CacheTags.CATEGORY.format(category) for category in categories if category]
+        )
     
     @staticmethod
     def invalidate_payment_methods():
@@ -54,16 +123,17 @@ class CacheInvalidator:
         Invalida todo el cache relacionado con métodos de pago
         Se debe llamar cuando se crea, actualiza o elimina un método de pago
         """
-        cache.delete(CacheKeys.ALL_PAYMENT_METHODS)
-        cache.delete(CacheKeys.ACTIVE_PAYMENT_METHODS)
+        CacheTags.invalidate(CacheTags.PAYMENT_METHODS)
     
     @staticmethod
     def invalidate_payment_method(payment_method_id):
         """
         Invalida el cache de un método de pago específico
         """
-        cache.delete(CacheKeys.PAYMENT_METHOD_DETAIL.format(payment_method_id))
-        CacheInvalidator.invalidate_payment_methods()
+        CacheTags.invalidate(
+            CacheTags.PAYMENT_METHOD.format(payment_method_id),
+            CacheTags.PAYMENT_METHODS
+        )
     
     @staticmethod
     def invalidate_invoices():
@@ -71,16 +141,17 @@ class CacheInvalidator:
         Invalida todo el cache relacionado con facturas
         Se debe llamar cuando se crea una nueva factura
         """
-        cache.delete(CacheKeys.ALL_INVOICES)
+        CacheTags.invalidate(CacheTags.INVOICES)
     
     @staticmethod
     def invalidate_invoice(invoice_id, invoice_number=None, order_id=None):
         """
         Invalida el cache de una factura específica
+        Se debe llamar cuando cambia su estado (cancelación o devolución)
         """
-        cache.delete(CacheKeys.INVOICE_BY_ID.format(invoice_id))
+        tags = [CacheTags.INVOICE.format(invoice_id), CacheTags.INVOICES]
         if invoice_number:
-            cache.delete(CacheKeys.INVOICE_BY_NUMBER.format(invoice_number))
+            tags.append(CacheTags.INVOICE_NUMBER.format(invoice_number))
         if order_id:
-            cache.delete(CacheKeys.INVOICE_BY_ORDER.format(order_id))
-        CacheInvalidator.invalidate_invoices()
\ No newline at end of file
+            tags.append(CacheTags.INVOICE_ORDER.format(order_id))
+        CacheTags.invalidate(*tags)
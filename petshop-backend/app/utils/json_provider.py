@@ -0,0 +1,83 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Backend opcional: sin orjson se usa json de la librería estándar
+    orjson = None
+
+JSON_BACKENDS = ('auto', 'orjson', 'json')
+
+def json_default(value):
+    """
+    Tipos que no son JSON nativos, con el mismo formato que los to_dict de los modelos
+    Decimal -> float, fechas -> ISO 8601
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def resolve_json_backend(name):
+    """
+    Valida JSON_BACKEND; 'auto' usa orjson si está instalado
+    """
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON_BACKEND inválido: {name}. Opciones: {', '.join(JSON_BACKENDS)}")
+    if name == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson requiere el paquete orjson (pip install orjson)")
+    if name == 'auto':
+        return 'orjson' if orjson is not None else 'json'
+    return name
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Serializador de respuestas de la app (jsonify y vistas que retornan dict)
+    Con orjson arma el cuerpo directamente en bytes; con 'json' se comporta como
+    el provider de Flask salvo Decimal (float) y fechas (ISO 8601).
+    orjson no escapa caracteres no ASCII (ensure_ascii): el JSON es equivalente.
+    """
+    default = staticmethod(json_default)
+    
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = resolve_json_backend(app.config.get('JSON_BACKEND', 'auto'))
+    
+    def _orjson_options(self, pretty=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        # Argumentos extra (indent, separators...) solo los entiende json
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.dumps(obj, default=json_default, option=self._orjson_options()).decode()
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+    
+    def dumps_line(self, obj):
+        """
+        Un objeto compacto, sin ordenar claves ni escapar no ASCII (líneas de NDJSON)
+        """
+        if self.backend == 'orjson':
+            return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        return json.dumps(obj, default=json_default, ensure_ascii=False)
+    
+    def response(self, *args, **kwargs):
+        if self.backend != 'orjson':
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=json_default, option=self._orjson_options(pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+from werkzeug.exceptions import BadRequest
+
+def encode_cursor(sort_value, row_id):
+    """
+    Codifica la posición (valor de orden, id) del último elemento de una página
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, Decimal):
+        sort_value = str(sort_value)
+    
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_column):
+    """
+    Decodifica un cursor y convierte el valor al tipo de la columna de orden
+    Un cursor que decodifica pero no tiene la forma [valor, id] del tipo esperado
+    también es inválido (BadRequest, no un error de la consulta)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        python_type = sort_column.type.python_type
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif python_type is Decimal:
+            if isinstance(sort_value, bool) or not isinstance(sort_value, (int, float, str)):
+                raise TypeError
+            # Las proyecciones leen Numeric como float: str evita Decimal(0.1) inexacto
+            sort_value = Decimal(str(sort_value))
+            if not sort_value.is_finite():
+                raise ValueError
+        elif python_type is float and isinstance(sort_value, int) and not isinstance(sort_value, bool):
+            sort_value = float(sort_value)
+        
+        if isinstance(sort_value, bool) or not isinstance(sort_value, python_type):
+            raise TypeError
+        if isinstance(row_id, bool) or not isinstance(row_id, int):
+            raise TypeError
+        return sort_value, row_id
+    except (ValueError, TypeError, InvalidOperation, json.JSONDecodeError):
+        raise BadRequest("Cursor inválido")
+
+def keyset_paginate(query, sort_column, id_column, cursor=None, limit=50, descending=False):
+    """
+    Aplica paginación por keyset sobre (sort_column, id_column)
+    Retorna (filas, next_cursor); next_cursor es None en la última página.
+    A diferencia de OFFSET, el costo no crece con el número de página.
+    """
+    if sort_column is id_column:
+        order_by = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order_by = [
+            sort_column.desc() if descending else sort_column.asc(),
+            id_column.desc() if descending else id_column.asc()
+        ]
+    
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_column)
+        if sort_column is id_column:
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        elif descending:
+            query = query.filter(or_(
+                sort_column < last_value,
+                and_(sort_column == last_value, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id)
+            ))
+    
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    
+    return rows, next_cursor
+
+def parse_limit(value, default=50, maximum=200):
+    """
+    Valida el parámetro limit de la query string
+    """
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest("limit debe ser un número entero")
+    if limit <= 0:
+        raise BadRequest("limit debe ser mayor a 0")
+    return min(limit, maximum)
+
+
+def parse_date_range(date_from=None, date_to=None):
+    """
+    Valida el rango de fechas de la query string (ISO 8601: 2024-01-31 o 2024-01-31T10:00:00)
+    Retorna (desde, hasta) con 'hasta' exclusivo; una fecha sin hora en date_to
+    incluye el día completo. Cualquiera de los dos puede ser None.
+    """
+    def parse(value, name):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise BadRequest(f"{name} debe ser una fecha ISO 8601 (YYYY-MM-DD)")
+    
+    start = parse(date_from, 'date_from') if date_from else None
+    end = None
+    if date_to:
+        end = parse(date_to, 'date_to')
+        if len(date_to) == 10:
+            end += timedelta(days=1)
+    
+    if start and end and start >= end:
+        raise BadRequest("date_from debe ser anterior a date_to")
+    return start, end
+
+def apply_date_range(query, column, start=None, end=None):
+    """
+    Filtra start <= column < end (ver parse_date_range)
+    Funciona con Query y con select()
+    """
+    if start is not None:
+        query = query.where(column >= start)
+    if end is not None:
+        query = query.where(column < end)
+    return query
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class LoginStats:
+    """
+    Contadores del login y tiempo de CPU en hashes de contraseña (en memoria del proceso)
+    Eventos: ver EVENTS; hashes: 'hash' (generar) y 'verify' (comprobar)
+    """
+    EVENTS = (
+        'success', 'verified_cache', 'invalid',
+        'rate_limited_ip', 'rate_limited_account', 'rehashed'
+    )
+    
+    _lock = threading.Lock()
+    _events = dict.fromkeys(EVENTS, 0)
+    _hash = defaultdict(lambda: {'count': 0, 'sum': 0.0, 'max': 0.0})
+    
+    @classmethod
+    def record(cls, event):
+        with cls._lock:
+            cls._events[event] += 1
+    
+    @classmethod
+    def observe_hash(cls, operation, seconds):
+        with cls._lock:
+            timing = cls._hash[operation]
+            timing['count'] += 1
+            timing['sum'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+    
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            return {
+                'events': dict(cls._events),
+                'hash': {operation: dict(timing) for operation, timing in cls._hash.items()}
+            }
+    
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._events = dict.fromkeys(cls.EVENTS, 0)
+            cls._hash.clear()
+
+def _hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    """
+    Prefijo que werkzeug escribe para method con sus parámetros completos
+    ('pbkdf2' -> 'pbkdf2:sha256:600000'); se calcula una vez por proceso
+    """
+    return generate_password_hash('', method).split('$', 1)[0]
+
+def hash_password(password):
+    """
+    Hashea con PASSWORD_HASH_METHOD (formato de werkzeug: método$salt$hash)
+    """
+    start = time.perf_counter()
+    password_hash = generate_password_hash(password, _hash_method())
+    LoginStats.observe_hash('hash', time.perf_counter() - start)
+    return password_hash
+
+def verify_password(password_hash, password):
+    start = time.perf_counter()
+    valid = check_password_hash(password_hash, password)
+    LoginStats.observe_hash('verify', time.perf_counter() - start)
+    return valid
+
+def needs_rehash(password_hash):
+    """
+    True si el hash se generó con un método o costo distinto de PASSWORD_HASH_METHOD
+    """
+    return password_hash.split('$', 1)[0] != _method_prefix(_hash_method())
@@ -0,0 +1,71 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout de conexión
+    La espera incluye el tiempo en cola cuando el pool está agotado,
+    la apertura de conexiones nuevas y el pre-ping.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += elapsed
+            self._wait_max = max(self._wait_max, elapsed)
+        return connection
+    
+    def wait_stats(self):
+        """
+        Checkouts, tiempos de espera (ms) y timeouts desde que se creó el pool
+        """
+        with self._stats_lock:
+            return {
+                'checkouts': self._checkouts,
+                'avg_ms': round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'max_ms': round(self._wait_max * 1000, 3),
+                'total_ms': round(self._wait_total * 1000, 3),
+                'timeouts': self._timeouts
+            }
+
+def pool_status(engine):
+    """
+    Estado del pool de conexiones de un engine
+    checked_out: conexiones en uso; overflow: conexiones abiertas por encima de size
+    """
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout()
+        })
+    
+    if isinstance(pool, TimedQueuePool):
+        status['wait'] = pool.wait_stats()
+    
+    return status
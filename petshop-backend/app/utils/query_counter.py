@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+class QueryCounter:
+    """
+    Cuenta las sentencias SQL que se ejecutan dentro de un bloque with
+    Uso:
+        with QueryCounter() as counter:
+            ...
+        counter.count
+    """
+    
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+    
+    @property
+    def count(self):
+        return len(self.statements)
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+@contextmanager
+def assert_max_queries(budget):
+    """
+    Falla si el bloque ejecuta más consultas que el presupuesto dado
+    Uso en tests:
+        with assert_max_queries(2):
+            client.get('/api/orders/1')
+    """
+    with QueryCounter() as counter:
+        yield counter
+    
+    if counter.count > budget:
+        executed = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(
+            f"Se ejecutaron {counter.count} consultas, presupuesto: {budget}\n{executed}"
+        )
@@ -0,0 +1,15 @@
+def apply_load_profile(query, profiles, profile):
+    """
+    Aplica a una consulta las opciones de carga de un perfil con nombre
+    profiles: {nombre: callable que retorna la lista de opciones}
+    Las opciones se construyen al llamar porque los backrefs de los modelos
+    no existen hasta que SQLAlchemy configura los mappers.
+    """
+    if profile not in profiles:
+        raise ValueError(
+            f"Perfil de carga inválido: {profile}. "
+            f"Opciones: {', '.join(profiles)}"
+        )
+    
+    options = profiles[profile]()
+    return query.options(*options) if options else query
@@ -0,0 +1,64 @@
+import math
+import time
+from app import cache
+
+class TokenBucket:
+    """
+    Token bucket guardado en el backend de Flask-Caching (una entrada por key)
+    capacity: ráfaga máxima (0 desactiva el límite); rate: tokens que se recuperan por segundo
+    Se guarda (tokens, instante) y el saldo se recalcula al leer: no hay
+    tareas de recarga. El get/set no es atómico entre workers: dos intentos
+    simultáneos de la misma key pueden pasar con un solo token.
+    Con el NullCache (tests) el bucket siempre está lleno.
+    """
+    
+    def __init__(self, name, capacity, rate):
+        self.name = name
+        self.capacity = capacity
+        self.rate = rate
+    
+    def _key(self, key):
+        return f'ratelimit:{self.name}:{key}'
+    
+    def _tokens(self, key, now):
+        entry = cache.get(self._key(key))
+        if entry is None:
+            return float(self.capacity)
+        tokens, updated_at = entry
+        return min(float(self.capacity), tokens + (now - updated_at) * self.rate)
+    
+    def _wait(self, tokens, needed):
+        if tokens >= needed:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (needed - tokens) / self.rate
+    
+    def retry_after(self, key, tokens=1):
+        """
+        Segundos hasta tener tokens disponibles (0 si ya los hay), sin consumir
+        """
+        if self.capacity <= 0:
+            return 0.0
+        return self._wait(self._tokens(key, time.time()), tokens)
+    
+    def consume(self, key, tokens=1):
+        """
+        Consume tokens si alcanzan; retorna 0 o los segundos a esperar (sin consumir)
+        """
+        if self.capacity <= 0:
+            return 0.0
+        now = time.time()
+        available = self._tokens(key, now)
+        wait = self._wait(available, tokens)
+        if wait:
+            return wait
+        
+        available -= tokens
+        # La entrada vence cuando el bucket ya estaría lleno otra vez
+        refill = (self.capacity - available) / self.rate if self.rate > 0 else 0
+        cache.set(self._key(key), (available, now), timeout=math.ceil(refill) + 1 if refill else 0)
+        return 0.0
+    
+    def reset(self, key):
+        cache.delete(self._key(key))
@@ -0,0 +1,43 @@
+from sqlalchemy import Date, DateTime, Float, Numeric, Time, type_coerce
+
+class RowProjection:
+    """
+    Columnas de un modelo listas para serializar filas (Row) sin instanciar objetos
+    Cada diccionario tiene el mismo formato que el to_dict del modelo:
+    - Numeric se lee como float (type_coerce: sin Decimal intermedio, el SQL no cambia)
+    - DateTime/Date se convierten a ISO 8601
+    extra: columnas que se seleccionan pero no van en la salida (p. ej. la de orden)
+    aliases: {clave: atributo del modelo} para claves que no se leen de su columna
+    """
+    
+    def __init__(self, model, fields, extra=(), aliases=None):
+        self.fields = list(fields)
+        self.extra = [f for f in dict.fromkeys(extra) if f not in self.fields]
+        self.keys = self.fields + self.extra
+        self.columns = []
+        self._iso = []
+        
+        aliases = aliases or {}
+        for key in self.keys:
+            column = getattr(model, aliases.get(key, key))
+            if key in aliases:
+                column = column.label(key)
+            column_type = column.type
+            if isinstance(column_type, Numeric) and not isinstance(column_type, Float):
+                column = type_coerce(column, Float).label(key)
+            elif isinstance(column_type, (DateTime, Date, Time)):
+                self._iso.append(key)
+            self.columns.append(column)
+    
+    def row_to_dict(self, row):
+        data = dict(zip(self.keys, row))
+        for key in self._iso:
+            value = data[key]
+            if value is not None:
+                data[key] = value.isoformat()
+        for key in self.extra:
+            del data[key]
+        return data
+    
+    def rows_to_dicts(self, rows):
+        return [self.row_to_dict(row) for row in rows]
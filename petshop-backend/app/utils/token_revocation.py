@@ -0,0 +1,142 @@
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app import cache, db
+
+# La base guarda la revocación (revoked_tokens, users.tokens_valid_after) y el
+# cache compartido (Redis) la sirve: cada request lee una sola key por usuario.
+# Quien revoca escribe el estado nuevo en el cache antes del commit, con la fila
+# del usuario bloqueada; quien lee la base por un miss solo lo agrega si la key
+# sigue vacía (cache.add). Ninguna lectura pisa una revocación, y los workers que
+# comparten el cache la ven al instante. Con un cache por proceso (SimpleCache)
+# solo el worker que revoca la ve: usarlo con un único worker.
+
+EPOCH = datetime(1970, 1, 1)
+
+def _state_key(user_id):
+    return f'auth:revocation:{user_id}'
+
+def _state_timeout():
+    # Ningún token vive más que JWT_ACCESS_TOKEN_EXPIRES: hasta entonces el estado
+    # solo cambia por una revocación, que lo reescribe
+    expires = current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+    if isinstance(expires, timedelta):
+        return int(expires.total_seconds())
+    return int(expires or 0)
+
+def _load_state(user_id):
+    """
+    Corte por usuario (milisegundos) y jti revocados vigentes, en una sola consulta
+    """
+    from sqlalchemy import and_, select
+    from app.models import RevokedToken, User
+    
+    rows = db.session.execute(
+        select(User.tokens_valid_after, RevokedToken.jti)
+        .outerjoin(RevokedToken, and_(
+            RevokedToken.user_id == User.id,
+            RevokedToken.expires_at > datetime.utcnow()
+        ))
+        .where(User.id == user_id)
+    ).all()
+    if not rows:
+        return {'deleted': True}
+    valid_after = rows[0].tokens_valid_after
+    return {
+        'valid_after': (valid_after - EPOCH) // timedelta(milliseconds=1) if valid_after else None,
+        'jtis': [row.jti for row in rows if row.jti]
+    }
+
+def _lock_user(user_id):
+    """
+    Serializa las revocaciones de un usuario hasta el commit (SELECT ... FOR UPDATE)
+    """
+    from sqlalchemy import select
+    from app.models import User
+    
+    db.session.execute(select(User.id).where(User.id == user_id).with_for_update()).all()
+
+def _publish_state(user_id):
+    """
+    Escribe en el cache el estado que deja la transacción, antes del commit
+    Si el commit falla el token queda revocado en el cache igual: falla cerrado
+    """
+    db.session.flush()
+    cache.set(_state_key(user_id), _load_state(user_id), timeout=_state_timeout())
+
+def issued_at_ms():
+    """
+    Claim iat_ms de los tokens: iat del JWT tiene resolución de un segundo
+    """
+    return int(time.time() * 1000)
+
+def revoke_token(claims):
+    """
+    Revoca un token (logout) hasta que expire; `flask tokens purge` borra los vencidos
+    """
+    from app.models import RevokedToken
+    
+    user_id = int(claims['sub'])
+    _lock_user(user_id)
+    db.session.merge(RevokedToken(
+        jti=claims['jti'],
+        user_id=user_id,
+        expires_at=datetime.utcfromtimestamp(claims['exp'])
+    ))
+    _publish_state(user_id)
+    db.session.commit()
+
+def revoke_user_tokens(user_id):
+    """
+    Revoca todos los tokens emitidos hasta ahora para un usuario (cambio de
+    contraseña o email, eliminación) guardando el corte en users.tokens_valid_after
+    El corte tiene resolución de microsegundos y se compara con el claim iat_ms
+    """
+    from sqlalchemy import update
+    from app.models import User
+    
+    _lock_user(user_id)
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(tokens_valid_after=datetime.utcfromtimestamp(time.time()))
+        .execution_options(synchronize_session=False)
+    )
+    _publish_state(user_id)
+    db.session.commit()
+
+def is_token_revoked(claims):
+    """
+    Revocado por jti, emitido antes del corte de su usuario o de un usuario eliminado
+    Una lectura del cache; si la key no está (cache vacío, desalojo, NullCache)
+    el estado se lee de la base en una consulta y se agrega al cache
+    """
+    user_id = int(claims['sub'])
+    key = _state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = _load_state(user_id)
+        # add y no set: si una revocación escribió la key mientras se leía la base, gana la revocación
+        cache.add(key, state, timeout=_state_timeout())
+    
+    if state.get('deleted'):
+        return True
+    if claims.get('jti') in state['jtis']:
+        return True
+    if state['valid_after'] is None:
+        return False
+    if 'iat_ms' in claims:
+        return claims['iat_ms'] < state['valid_after']
+    # Tokens sin iat_ms: los del mismo segundo que el corte también se revocan
+    return claims.get('iat', 0) <= state['valid_after'] // 1000
+
+def purge_revoked_tokens():
+    """
+    Borra los jti revocados que ya expiraron; retorna cuántos
+    """
+    from sqlalchemy import delete
+    from app.models import RevokedToken
+    
+    result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+    db.session.commit()
+    return result.rowcount
@@ -90,9 +90,20 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # objetos de búsqueda creados con DDL manual (ver app/models/product.py);
+    # autogenerate no debe intentar borrarlos
+    def include_object(object, name, type_, reflected, compare_to):
+        if name == 'search_vector' or name == 'ix_products_search_vector':
+            return False
+        if name and name.startswith('products_fts'):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
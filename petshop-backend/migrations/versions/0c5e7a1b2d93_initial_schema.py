@@ -0,0 +1,170 @@
+"""initial schema
+
+Revision ID: 0c5e7a1b2d93
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+Esquema original (usuarios, productos, carritos, órdenes, facturas). Las demás
+migraciones del repositorio dependen de esta.
+
+Bases que ya tienen estas tablas (creadas con una migración inicial generada
+localmente o con db.create_all()): borrar la migración local y marcar la
+revisión en la que está la base, p. ej. `flask db stamp --purge 0c5e7a1b2d93`
+antes de `flask db upgrade`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e7a1b2d93'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('first_name', sa.String(length=50), nullable=False),
+        sa.Column('last_name', sa.String(length=50), nullable=False),
+        sa.Column('role', sa.Enum('admin', 'client', name='user_roles'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('stock', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=True),
+        sa.Column('image_url', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'payment_methods',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+
+    op.create_table(
+        'addresses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('full_name', sa.String(length=100), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('address_line1', sa.String(length=255), nullable=False),
+        sa.Column('address_line2', sa.String(length=255), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('state', sa.String(length=100), nullable=False),
+        sa.Column('postal_code', sa.String(length=20), nullable=False),
+        sa.Column('country', sa.String(length=100), nullable=False),
+        sa.Column('is_default', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'carts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.Enum('active', 'completed', 'abandoned', name='cart_status'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'cart_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cart_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['cart_id'], ['carts.id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'orders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('cart_id', sa.Integer(), nullable=True),
+        sa.Column('address_id', sa.Integer(), nullable=False),
+        sa.Column('payment_method_id', sa.Integer(), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'completed', 'cancelled', 'returned', name='order_status'),
+                  nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['cart_id'], ['carts.id']),
+        sa.ForeignKeyConstraint(['address_id'], ['addresses.id']),
+        sa.ForeignKeyConstraint(['payment_method_id'], ['payment_methods.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('product_name', sa.String(length=100), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    op.create_table(
+        'invoices',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('invoice_number', sa.String(length=50), nullable=False),
+        sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('tax_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.Enum('paid', 'pending', 'cancelled', name='invoice_status'), nullable=False),
+        sa.Column('issued_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('order_id'),
+        sa.UniqueConstraint('invoice_number')
+    )
+
+
+def downgrade():
+    op.drop_table('invoices')
+    op.drop_table('order_items')
+    op.drop_table('orders')
+    op.drop_table('cart_items')
+    op.drop_table('carts')
+    op.drop_table('addresses')
+    op.drop_table('payment_methods')
+    op.drop_table('products')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_table('users')
+
+    bind = op.get_bind()
+    for name in ('invoice_status', 'order_status', 'cart_status', 'user_roles'):
+        sa.Enum(name=name).drop(bind, checkfirst=True)
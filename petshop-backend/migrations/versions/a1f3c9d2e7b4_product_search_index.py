@@ -0,0 +1,38 @@
+"""product full-text search index
+
+Revision ID: a1f3c9d2e7b4
+Revises: 0c5e7a1b2d93
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.product import PRODUCT_SEARCH_DDL, PRODUCT_SEARCH_DROP_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f3c9d2e7b4'
+down_revision = '0c5e7a1b2d93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('products'):
+        raise RuntimeError("La tabla products no existe: aplicar antes la migración 0c5e7a1b2d93")
+    for statement in PRODUCT_SEARCH_DDL.get(bind.dialect.name, []):
+        op.execute(statement)
+    if bind.dialect.name == 'sqlite':
+        # indexar las filas existentes
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_products_search_vector")
+        op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+    for statement in PRODUCT_SEARCH_DROP_DDL.get(bind.dialect.name, []):
+        op.execute(statement)
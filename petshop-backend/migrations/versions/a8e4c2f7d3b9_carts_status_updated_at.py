@@ -0,0 +1,30 @@
+"""index for the abandoned cart sweep
+
+Revision ID: a8e4c2f7d3b9
+Revises: f5d1b8e3a6c2
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e4c2f7d3b9'
+down_revision = 'f5d1b8e3a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('carts'):
+        raise RuntimeError("La tabla carts no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    op.create_index(
+        'ix_carts_status_updated_at', 'carts', ['status', 'updated_at', 'id'], if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_carts_status_updated_at', table_name='carts', if_exists=True)
@@ -0,0 +1,60 @@
+"""sales_daily, product_sales_daily and product_sales_monthly rollup tables
+
+Revision ID: b3f9e6c1d4a7
+Revises: a8e4c2f7d3b9
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f9e6c1d4a7'
+down_revision = 'a8e4c2f7d3b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('orders'):
+        raise RuntimeError("La tabla orders no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    op.create_table(
+        'sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('units_sold', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('cancelled_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('returned_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'product_sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('units_sold', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('day', 'product_id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'product_sales_monthly',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('units_sold', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('month', 'product_id'),
+        if_not_exists=True
+    )
+    # Los datos históricos se cargan con: flask reports rebuild
+
+
+def downgrade():
+    op.drop_table('product_sales_monthly', if_exists=True)
+    op.drop_table('product_sales_daily', if_exists=True)
+    op.drop_table('sales_daily', if_exists=True)
@@ -0,0 +1,68 @@
+"""indexes for foreign keys, status filters and listings
+
+Revision ID: b7e2d4f1c9a3
+Revises: a1f3c9d2e7b4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4f1c9a3'
+down_revision = 'a1f3c9d2e7b4'
+branch_labels = None
+depends_on = None
+
+
+# (nombre, tabla, columnas)
+INDEXES = [
+    ('ix_carts_user_id_status', 'carts', ['user_id', 'status']),
+    ('ix_cart_items_cart_id_product_id', 'cart_items', ['cart_id', 'product_id']),
+    ('ix_cart_items_product_id', 'cart_items', ['product_id']),
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at', 'id']),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at', 'id']),
+    ('ix_orders_created_at', 'orders', ['created_at', 'id']),
+    ('ix_orders_cart_id', 'orders', ['cart_id']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_items_product_id', 'order_items', ['product_id']),
+    ('ix_invoices_status_issued_at', 'invoices', ['status', 'issued_at', 'id']),
+    ('ix_invoices_issued_at', 'invoices', ['issued_at', 'id']),
+    ('ix_users_created_at', 'users', ['created_at', 'id']),
+    ('ix_addresses_user_id', 'addresses', ['user_id']),
+    ('ix_products_category_id', 'products', ['category', 'id']),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('carts'):
+        raise RuntimeError("La tabla carts no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+    # Antes del índice único: si un usuario tiene varios carritos activos,
+    # se conserva el más reciente y los demás quedan abandonados
+    op.execute("""
+        UPDATE carts SET status = 'abandoned'
+        WHERE status = 'active'
+          AND id NOT IN (
+              SELECT max_id FROM (
+                  SELECT MAX(id) AS max_id FROM carts WHERE status = 'active' GROUP BY user_id
+              ) AS latest
+          )
+    """)
+    op.create_index(
+        'uq_carts_user_active', 'carts', ['user_id'], unique=True,
+        postgresql_where=sa.text("status = 'active'"),
+        sqlite_where=sa.text("status = 'active'"),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_carts_user_active', table_name='carts', if_exists=True)
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
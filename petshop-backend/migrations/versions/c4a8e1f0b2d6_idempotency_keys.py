@@ -0,0 +1,45 @@
+"""idempotency keys table
+
+Revision ID: c4a8e1f0b2d6
+Revises: b7e2d4f1c9a3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e1f0b2d6'
+down_revision = 'b7e2d4f1c9a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('users'):
+        raise RuntimeError("La tabla users no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('request_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.Enum('processing', 'completed', name='idempotency_status'), nullable=False),
+        sa.Column('response_code', sa.Integer(), nullable=True),
+        sa.Column('response_body', sa.Text(), nullable=True),
+        sa.Column('response_content_type', sa.String(length=100), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('idempotency_keys', if_exists=True)
+    sa.Enum(name='idempotency_status').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,57 @@
+"""stock_movements ledger
+
+Revision ID: c6d2a8f4e1b9
+Revises: b3f9e6c1d4a7
+Create Date: 2026-10-19 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6d2a8f4e1b9'
+down_revision = 'b3f9e6c1d4a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('orders'):
+        raise RuntimeError("La tabla orders no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    # products.stock pasa a ser el snapshot compactado. No se cargan movimientos
+    # históricos: el libro arranca con esta migración (ver StockLedgerService.stock_at)
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.Enum('initial', 'sale', 'cancel', 'return', 'adjustment',
+                                    name='stock_movement_reason'), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('compacted', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_stock_movements_product_created_at', 'stock_movements',
+        ['product_id', 'created_at'], if_not_exists=True
+    )
+    op.create_index(
+        'ix_stock_movements_pending', 'stock_movements', ['product_id'],
+        postgresql_where=sa.text('NOT compacted'),
+        sqlite_where=sa.text('compacted = 0'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    # Antes de bajar conviene correr `flask stock compact`: los pendientes se pierden
+    op.drop_index('ix_stock_movements_pending', table_name='stock_movements', if_exists=True)
+    op.drop_index('ix_stock_movements_product_created_at', table_name='stock_movements', if_exists=True)
+    op.drop_table('stock_movements', if_exists=True)
+    sa.Enum(name='stock_movement_reason').drop(op.get_bind(), checkfirst=True)
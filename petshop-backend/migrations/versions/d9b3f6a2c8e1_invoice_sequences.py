@@ -0,0 +1,33 @@
+"""invoice number sequences per prefix
+
+Revision ID: d9b3f6a2c8e1
+Revises: c4a8e1f0b2d6
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9b3f6a2c8e1'
+down_revision = 'c4a8e1f0b2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'invoice_sequences',
+        sa.Column('prefix', sa.String(length=20), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('prefix'),
+        if_not_exists=True
+    )
+    # Las facturas existentes conservan su número (INV-<timestamp>-<orden>);
+    # la numeración correlativa empieza en 1 para cada año desde aquí
+
+
+def downgrade():
+    op.drop_table('invoice_sequences', if_exists=True)
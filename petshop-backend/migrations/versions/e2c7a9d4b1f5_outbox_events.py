@@ -0,0 +1,44 @@
+"""outbox events table for post-checkout tasks
+
+Revision ID: e2c7a9d4b1f5
+Revises: d9b3f6a2c8e1
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c7a9d4b1f5'
+down_revision = 'd9b3f6a2c8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'processing', 'done', 'failed', name='outbox_status'), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_outbox_events_status_available_at', 'outbox_events',
+        ['status', 'available_at', 'id'], if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_status_available_at', table_name='outbox_events', if_exists=True)
+    op.drop_table('outbox_events', if_exists=True)
+    sa.Enum(name='outbox_status').drop(op.get_bind(), checkfirst=True)
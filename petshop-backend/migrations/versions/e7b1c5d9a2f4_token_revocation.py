@@ -0,0 +1,51 @@
+"""token revocation: users.tokens_valid_after and revoked_tokens
+
+Revision ID: e7b1c5d9a2f4
+Revises: c6d2a8f4e1b9
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1c5d9a2f4'
+down_revision = 'c6d2a8f4e1b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('users'):
+        raise RuntimeError("La tabla users no existe: aplicar antes la migración 0c5e7a1b2d93")
+    
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('users')}
+    if 'tokens_valid_after' not in columns:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('tokens_valid_after', sa.DateTime(), nullable=True))
+    
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('jti', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('jti'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_revoked_tokens_user_id_expires_at', 'revoked_tokens',
+        ['user_id', 'expires_at'], if_not_exists=True
+    )
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens', if_exists=True)
+    op.drop_index('ix_revoked_tokens_user_id_expires_at', table_name='revoked_tokens', if_exists=True)
+    op.drop_table('revoked_tokens', if_exists=True)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('tokens_valid_after')
@@ -0,0 +1,46 @@
+"""denormalized item_count and subtotal on carts
+
+Revision ID: f5d1b8e3a6c2
+Revises: e2c7a9d4b1f5
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5d1b8e3a6c2'
+down_revision = 'e2c7a9d4b1f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('carts'):
+        raise RuntimeError("La tabla carts no existe: aplicar antes la migración 0c5e7a1b2d93")
+
+    columns = {column['name'] for column in sa.inspect(bind).get_columns('carts')}
+    with op.batch_alter_table('carts') as batch_op:
+        if 'item_count' not in columns:
+            batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+        if 'subtotal' not in columns:
+            batch_op.add_column(sa.Column('subtotal', sa.Numeric(12, 2), nullable=False, server_default='0'))
+
+    # Totales de los carritos existentes desde sus items
+    op.execute("""
+        UPDATE carts SET
+            item_count = COALESCE((SELECT SUM(quantity) FROM cart_items WHERE cart_items.cart_id = carts.id), 0),
+            subtotal = COALESCE((SELECT SUM(quantity * unit_price) FROM cart_items WHERE cart_items.cart_id = carts.id), 0)
+    """)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('carts'):
+        raise RuntimeError("La tabla carts no existe")
+
+    with op.batch_alter_table('carts') as batch_op:
+        batch_op.drop_column('subtotal')
+        batch_op.drop_column('item_count')
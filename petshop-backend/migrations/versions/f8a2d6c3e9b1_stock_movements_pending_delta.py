@@ -0,0 +1,38 @@
+"""stock_movements: pending index covers delta
+
+Revision ID: f8a2d6c3e9b1
+Revises: e7b1c5d9a2f4
+Create Date: 2026-10-19 03:00:00.000000
+
+Las ventas quedan pendientes hasta `flask stock compact`: Product.available_stock
+suma más filas por producto y el índice parcial pasa a incluir delta.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a2d6c3e9b1'
+down_revision = 'e7b1c5d9a2f4'
+branch_labels = None
+depends_on = None
+
+
+def _recreate_pending_index(columns):
+    op.drop_index('ix_stock_movements_pending', table_name='stock_movements', if_exists=True)
+    op.create_index(
+        'ix_stock_movements_pending', 'stock_movements', columns,
+        postgresql_where=sa.text('NOT compacted'),
+        sqlite_where=sa.text('compacted = 0')
+    )
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('stock_movements'):
+        raise RuntimeError("La tabla stock_movements no existe: aplicar antes la migración c6d2a8f4e1b9")
+    
+    _recreate_pending_index(['product_id', 'delta'])
+
+
+def downgrade():
+    _recreate_pending_index(['product_id'])
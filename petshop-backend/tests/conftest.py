@@ -1,6 +1,6 @@
 import pytest
-from app import create_app, db
-from app.models import User, Product, PaymentMethod
+from app import create_app, db, cache
+from app.models import User, Product, PaymentMethod, Address
 
 @pytest.fixture
 def app():
@@ -22,6 +22,15 @@ def client(app):
     """
     return app.test_client()
 
+@pytest.fixture
+def simple_cache(app):
+    """
+    Activa un cache en memoria (TestingConfig usa NullCache)
+    """
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 300})
+    yield cache
+    cache.clear()
+
 @pytest.fixture
 def runner(app):
     """
@@ -121,4 +130,53 @@ def client_token(client, client_user):
         'password': 'client123'
     })
     
-    return response.json['access_token']
\ No newline at end of file
+    return response.json['access_token']
+
+@pytest.fixture
+def address(app, client_user):
+    """
+    Crea una dirección para el usuario cliente
+    """
+    address = Address(
+        user_id=client_user.id,
+        full_name='Client Test',
+        phone='88888888',
+        address_line1='Calle 123',
+        city='San José',
+        state='San José',
+        postal_code='10101',
+        is_default=True
+    )
+    
+    db.session.add(address)
+    db.session.commit()
+    
+    return address
+
+@pytest.fixture
+def order(app, client_user, sample_product, address, payment_method):
+    """
+    Crea una orden completada (con factura) para el usuario cliente
+    """
+    from app.services import CartService, OrderService
+    
+    cart = CartService.add_item_to_cart(client_user.id, sample_product.id, 2)
+    return OrderService.create_order_from_cart(
+        user_id=client_user.id,
+        cart_id=cart.id,
+        address_id=address.id,
+        payment_method_id=payment_method.id
+    )
+
+@pytest.fixture
+def outbox_worker(app):
+    """
+    Worker del outbox dentro del proceso del test
+    Llamarlo procesa todos los eventos disponibles y retorna cuántos procesó
+    """
+    from app.services import OutboxService
+    
+    def run():
+        return OutboxService.drain()
+    
+    return run
@@ -0,0 +1,60 @@
+from app import db
+from app.models import Product
+from app.services import CartService
+from app.utils import assert_max_queries
+
+def test_replace_cart_items_query_budget(client, client_token, client_user, sample_product):
+    """
+    Test: Restaurar un carrito de 30 productos cuesta 8 consultas (no depende del número de items)
+    """
+    products = [Product(name=f'Producto {i}', price=500 + i, stock=50, category='juguetes') for i in range(30)]
+    db.session.add_all(products)
+    db.session.commit()
+    CartService.add_item_to_cart(client_user.id, sample_product.id, 1)
+    items = [{'product_id': product.id, 'quantity': 2} for product in products]
+    
+    # +1: el estado de revocación del token (TestingConfig no tiene cache)
+    with assert_max_queries(9):
+        response = client.put('/api/cart/items',
+            headers={'Authorization': f'Bearer {client_token}'},
+            json={'items': items}
+        )
+    
+    assert response.status_code == 200
+    assert len(response.json['cart']['items']) == 30
+    assert response.json['cart']['total'] == sum(2 * (500 + i) for i in range(30))
+
+def test_replace_cart_items_validation(client, client_token, sample_product):
+    """
+    Test: Items inválidos, repetidos o productos inexistentes se rechazan
+    """
+    headers = {'Authorization': f'Bearer {client_token}'}
+    
+    repeated = client.put('/api/cart/items', headers=headers, json=[
+        {'product_id': sample_product.id, 'quantity': 1},
+        {'product_id': sample_product.id, 'quantity': 2}
+    ])
+    invalid = client.put('/api/cart/items', headers=headers,
+        json={'items': [{'product_id': sample_product.id, 'quantity': 0}]})
+    missing = client.put('/api/cart/items', headers=headers,
+        json={'items': [{'product_id': 99999, 'quantity': 1}]})
+    
+    assert repeated.status_code == 400
+    assert invalid.status_code == 400
+    assert missing.status_code == 404
+
+def test_cart_summary_is_single_row_read(client, client_token, client_user, sample_product):
+    """
+    Test: El resumen del carrito lee los totales guardados en una consulta
+    """
+    CartService.add_item_to_cart(client_user.id, sample_product.id, 3)
+    
+    # +1: el estado de revocación del token (TestingConfig no tiene cache)
+    with assert_max_queries(2):
+        response = client.get('/api/cart/summary',
+            headers={'Authorization': f'Bearer {client_token}'}
+        )
+    
+    assert response.status_code == 200
+    assert response.json['item_count'] == 3
+    assert response.json['subtotal'] == 3 * float(sample_product.price)
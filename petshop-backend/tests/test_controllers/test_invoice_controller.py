@@ -0,0 +1,115 @@
+import pytest
+from app import db
+from app.models import User
+
+@pytest.fixture
+def other_client_token(client):
+    """
+    Token de un cliente que no es dueño de la orden
+    """
+    user = User(email='other@test.com', first_name='Other', last_name='Test', role='client')
+    user.set_password('other123')
+    db.session.add(user)
+    db.session.commit()
+    
+    response = client.post('/api/auth/login', json={
+        'email': 'other@test.com',
+        'password': 'other123'
+    })
+    return response.json['access_token']
+
+def test_cached_invoice_checks_owner_on_every_hit(client, admin_token, client_token,
+                                                  other_client_token, order, simple_cache):
+    """
+    Test: Una factura cacheada por el admin no se sirve a otro cliente
+    """
+    invoice_id = order.invoice.id
+    
+    admin_response = client.get(f'/api/invoices/{invoice_id}',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    other_response = client.get(f'/api/invoices/{invoice_id}',
+        headers={'Authorization': f'Bearer {other_client_token}'})
+    owner_response = client.get(f'/api/invoices/{invoice_id}',
+        headers={'Authorization': f'Bearer {client_token}'})
+    
+    assert admin_response.status_code == 200
+    assert other_response.status_code == 403
+    assert owner_response.status_code == 200
+    assert owner_response.json == admin_response.json
+
+def test_forbidden_response_does_not_shadow_admin(client, admin_token, other_client_token,
+                                                  order, simple_cache):
+    """
+    Test: Un 403 de un cliente no queda cacheado para el admin
+    """
+    invoice_number = order.invoice.invoice_number
+    
+    other_response = client.get(f'/api/invoices/number/{invoice_number}',
+        headers={'Authorization': f'Bearer {other_client_token}'})
+    admin_response = client.get(f'/api/invoices/number/{invoice_number}',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    
+    assert other_response.status_code == 403
+    assert admin_response.status_code == 200
+    assert len(admin_response.json['order_items']) == 1
+
+def test_invoice_cache_invalidated_on_cancel(client, admin_token, client_token, order, simple_cache):
+    """
+    Test: Cancelar la orden refresca la factura cacheada
+    """
+    headers = {'Authorization': f'Bearer {client_token}'}
+    assert client.get(f'/api/invoices/order/{order.id}', headers=headers).json['status'] == 'paid'
+    
+    client.post(f'/api/orders/{order.id}/cancel',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    
+    assert client.get(f'/api/invoices/order/{order.id}', headers=headers).json['status'] == 'cancelled'
+
+def test_invoice_not_found(client, admin_token, simple_cache):
+    """
+    Test: Factura inexistente retorna 404
+    """
+    response = client.get('/api/invoices/99999',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    
+    assert response.status_code == 404
+
+def test_list_invoices_by_status_and_stream(client, admin_token, order, simple_cache):
+    """
+    Test: El listado de facturas filtra por estado y el modo NDJSON no pasa por el cache
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    response = client.get('/api/invoices/?status=paid', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['invoices']) == 1
+    assert response.json['next_cursor'] is None
+    
+    response = client.get('/api/invoices/?status=cancelled', headers=headers)
+    assert response.json['invoices'] == []
+    
+    response = client.get('/api/invoices/?format=ndjson', headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(response.get_data(as_text=True).splitlines()) == 1
+    
+    assert client.get('/api/invoices/?status=perdida', headers=headers).status_code == 400
+
+def test_invoice_number_gaps_report(client, admin_token, client_token, order):
+    """
+    Test: Las órdenes reciben números correlativos y el reporte de huecos es solo para admin
+    """
+    year = order.invoice.issued_at.year
+    
+    admin_response = client.get(f'/api/invoices/number-gaps?year={year}',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    client_response = client.get(f'/api/invoices/number-gaps?year={year}',
+        headers={'Authorization': f'Bearer {client_token}'})
+    invalid_response = client.get('/api/invoices/number-gaps?year=abc',
+        headers={'Authorization': f'Bearer {admin_token}'})
+    
+    assert order.invoice.invoice_number == f'INV-{year}-00000001'
+    assert admin_response.status_code == 200
+    assert admin_response.json['issued'] == 1
+    assert admin_response.json['gaps'] == []
+    assert client_response.status_code == 403
+    assert invalid_response.status_code == 400
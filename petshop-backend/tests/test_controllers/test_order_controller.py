@@ -0,0 +1,230 @@
+import pytest
+from app import db
+from app.services import CartService
+from app.utils import assert_max_queries
+
+def test_get_order_detail(client, client_token, order):
+    """
+    Test: El detalle de la orden incluye items, factura, dirección y método de pago
+    """
+    response = client.get(f'/api/orders/{order.id}',
+        headers={'Authorization': f'Bearer {client_token}'}
+    )
+    
+    assert response.status_code == 200
+    assert len(response.json['items']) == 1
+    assert response.json['invoice'] is not None
+    assert response.json['address'] is not None
+    assert response.json['payment_method'] is not None
+
+def test_get_order_detail_query_budget(app, client, client_token, order):
+    """
+    Test: El detalle de la orden se resuelve en 2 consultas sin importar los items
+    """
+    order_id = order.id
+    db.session.expire_all()
+    
+    # +1: el estado de revocación del token (TestingConfig no tiene cache)
+    with assert_max_queries(3):
+        response = client.get(f'/api/orders/{order_id}',
+            headers={'Authorization': f'Bearer {client_token}'}
+        )
+    
+    assert response.status_code == 200
+
+def test_get_cart_query_budget(client, client_token, client_user, sample_product):
+    """
+    Test: Obtener el carrito con items cuesta 2 consultas
+    """
+    CartService.add_item_to_cart(client_user.id, sample_product.id, 1)
+    
+    # +1: el estado de revocación del token (TestingConfig no tiene cache)
+    with assert_max_queries(3):
+        response = client.get('/api/cart/',
+            headers={'Authorization': f'Bearer {client_token}'}
+        )
+    
+    assert response.status_code == 200
+    assert len(response.json['items']) == 1
+
+def _seed_orders(user_id, address_id, payment_method_id, count):
+    """
+    Inserta órdenes con created_at consecutivos (un día de diferencia)
+    """
+    from datetime import datetime, timedelta
+    from app.models import Order
+    start = datetime(2024, 1, 1, 12, 0)
+    db.session.add_all([
+        Order(
+            user_id=user_id, address_id=address_id, payment_method_id=payment_method_id,
+            total_amount=1000 + i, status='completed', created_at=start + timedelta(days=i)
+        )
+        for i in range(count)
+    ])
+    db.session.commit()
+
+def test_list_orders_keyset_pagination(client, admin_token, client_user, address, payment_method):
+    """
+    Test: El listado admin pagina por cursor, más recientes primero, sin repetir filas
+    """
+    _seed_orders(client_user.id, address.id, payment_method.id, 5)
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/orders/?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json['orders']) <= 2
+        seen.extend(o['total_amount'] for o in response.json['orders'])
+        cursor = response.json['next_cursor']
+        if not cursor:
+            break
+    
+    assert seen == [1004, 1003, 1002, 1001, 1000]
+
+def test_list_orders_date_range(client, admin_token, client_user, address, payment_method):
+    """
+    Test: date_to sin hora incluye el día completo
+    """
+    _seed_orders(client_user.id, address.id, payment_method.id, 5)
+    
+    response = client.get('/api/orders/?date_from=2024-01-02&date_to=2024-01-04',
+        headers={'Authorization': f'Bearer {admin_token}'}
+    )
+    
+    assert response.status_code == 200
+    assert [o['total_amount'] for o in response.json['orders']] == [1003, 1002, 1001]
+
+def test_list_orders_ndjson_stream(client, admin_token, client_token, client_user, admin_user,
+                                   address, payment_method):
+    """
+    Test: format=ndjson transmite todas las filas; un cliente solo recibe las suyas
+    """
+    import json
+    _seed_orders(client_user.id, address.id, payment_method.id, 3)
+    _seed_orders(admin_user.id, address.id, payment_method.id, 2)
+    
+    response = client.get('/api/orders/?format=ndjson',
+        headers={'Authorization': f'Bearer {admin_token}'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(response.get_data(as_text=True).splitlines()) == 5
+    
+    response = client.get('/api/orders/?format=ndjson&status=completed',
+        headers={'Authorization': f'Bearer {client_token}'}
+    )
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 3
+    assert {row['user_id'] for row in rows} == {client_user.id}
+
+def test_list_orders_invalid_filters(client, admin_token):
+    """
+    Test: Fechas, estados y cursores inválidos retornan 400
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    assert client.get('/api/orders/?date_from=ayer', headers=headers).status_code == 400
+    assert client.get('/api/orders/?date_from=2024-02-01&date_to=2024-01-01', headers=headers).status_code == 400
+    assert client.get('/api/orders/?status=perdida', headers=headers).status_code == 400
+    assert client.get('/api/orders/?format=ndjson&status=perdida', headers=headers).status_code == 400
+    assert client.get('/api/orders/?cursor=xyz', headers=headers).status_code == 400
+
+def test_list_users_paginated_and_streamed(client, admin_token, admin_user, client_user):
+    """
+    Test: El listado de usuarios pagina por cursor y soporta NDJSON
+    """
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    response = client.get('/api/users/?limit=1', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['users']) == 1
+    assert response.json['next_cursor'] is not None
+    
+    response = client.get('/api/users/?format=ndjson&role=client', headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_data(as_text=True).splitlines()) == 1
+
+def test_create_order_idempotency_key_replays(client, client_token, client_user, sample_product,
+                                              address, payment_method):
+    """
+    Test: Un reintento con la misma Idempotency-Key recibe la misma orden sin crear otra
+    """
+    from app.models import Order
+    CartService.add_item_to_cart(client_user.id, sample_product.id, 1)
+    headers = {'Authorization': f'Bearer {client_token}', 'Idempotency-Key': 'checkout-123'}
+    body = {'address_id': address.id, 'payment_method_id': payment_method.id}
+    
+    first = client.post('/api/orders/', headers=headers, json=body)
+    retry = client.post('/api/orders/', headers=headers, json=body)
+    
+    assert first.status_code == 201
+    assert retry.status_code == 201
+    assert retry.headers.get('Idempotent-Replayed') == 'true'
+    assert retry.json['order']['id'] == first.json['order']['id']
+    assert Order.query.count() == 1
+    
+    # Misma key con otro body: 422
+    other = client.post('/api/orders/', headers=headers,
+        json={'address_id': address.id, 'payment_method_id': payment_method.id + 1}
+    )
+    assert other.status_code == 422
+
+def test_checkout_defers_invoice_tasks_to_outbox(client, admin_token, client_token, client_user,
+                                                 sample_product, address, payment_method,
+                                                 simple_cache, outbox_worker):
+    """
+    Test: El checkout invalida el listado de facturas al confirmar y deja al worker del
+    outbox el detalle de la factura en cache
+    """
+    from app.models import OutboxEvent
+    from app.utils import CacheStats
+    CacheStats.reset()
+    admin_headers = {'Authorization': f'Bearer {admin_token}'}
+    assert client.get('/api/invoices/', headers=admin_headers).json['invoices'] == []
+    
+    CartService.add_item_to_cart(client_user.id, sample_product.id, 1)
+    response = client.post('/api/orders/', headers={'Authorization': f'Bearer {client_token}'},
+        json={'address_id': address.id, 'payment_method_id': payment_method.id}
+    )
+    invoice_number = response.json['order']['invoice']['invoice_number']
+    
+    assert response.status_code == 201
+    assert OutboxEvent.query.filter_by(status='pending').count() == 2
+    # El listado cacheado ya incluye la factura aunque el worker no haya corrido
+    assert len(client.get('/api/invoices/', headers=admin_headers).json['invoices']) == 1
+    
+    assert outbox_worker() == 2
+    
+    assert OutboxEvent.query.filter_by(status='done').count() == 2
+    detail = client.get(f'/api/invoices/number/{invoice_number}',
+        headers={'Authorization': f'Bearer {client_token}'})
+    assert detail.status_code == 200
+    assert CacheStats.snapshot()['invoices.get_invoice_by_number']['hit'] == 1
+
+def test_bulk_cancel_orders(client, admin_token, client_token, order):
+    """
+    Test: POST /api/orders/bulk-cancel (solo admin) retorna el resultado por orden
+    """
+    response = client.post('/api/orders/bulk-cancel',
+        headers={'Authorization': f'Bearer {client_token}'},
+        json={'order_ids': [order.id]}
+    )
+    assert response.status_code == 403
+    
+    response = client.post('/api/orders/bulk-cancel',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'order_ids': [order.id, 12345]}
+    )
+    
+    assert response.status_code == 200
+    assert response.json['cancelled'] == 1
+    assert response.json['failed'] == 1
+    assert response.json['results'][0] == {'order_id': order.id, 'status': 'cancelled'}
+    
+    response = client.post('/api/orders/bulk-cancel',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'order_ids': 'todas'}
+    )
+    assert response.status_code == 400
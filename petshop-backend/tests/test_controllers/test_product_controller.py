@@ -29,6 +29,46 @@ def test_get_product_not_found(client):
     assert response.status_code == 404
     assert 'error' in response.json
 
+def test_get_product_conditional_get(client, simple_cache, admin_token, sample_product, payment_method):
+    """
+    Test: Catálogo y métodos de pago responden 304 si el ETag no cambió
+    """
+    url = f'/api/products/{sample_product.id}'
+    response = client.get(url)
+    etag = response.headers['ETag']
+    
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, max-age=600'
+    
+    # Hit del cache: mismo ETag, y 304 sin cuerpo si el cliente ya lo tiene
+    assert client.get(url).headers['ETag'] == etag
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    
+    client.put(url, headers={'Authorization': f'Bearer {admin_token}'}, json={'price': 30000})
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    
+    listing = client.get('/api/products/')
+    assert listing.headers['Cache-Control'] == 'public, max-age=300'
+    assert client.get('/api/products/', headers={'If-None-Match': listing.headers['ETag']}).status_code == 304
+    
+    methods = client.get('/api/payment-methods/')
+    assert methods.headers['Cache-Control'] == 'public, max-age=3600'
+    assert client.get('/api/payment-methods/', headers={'If-None-Match': methods.headers['ETag']}).status_code == 304
+
+def test_get_product_not_found_has_no_etag(client):
+    """
+    Test: Las respuestas de error no llevan ETag ni se cachean en el cliente
+    """
+    response = client.get('/api/products/99999')
+    
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+    assert 'Cache-Control' not in response.headers
+
 def test_create_product_as_admin(client, admin_token):
     """
     Test: Admin puede crear productos
@@ -155,4 +195,276 @@ def test_update_stock_as_admin(client, admin_token, sample_product):
     )
     
     assert response.status_code == 200
-    assert response.json['product']['stock'] == initial_stock + 20
\ No newline at end of file
+    assert response.json['product']['stock'] == initial_stock + 20
+
+def test_get_products_paginated(client, app):
+    """
+    Test: Recorrer el catálogo con cursor devuelve cada producto una sola vez
+    """
+    from app import db
+    from app.models import Product
+    db.session.add_all([
+        Product(name=f'Producto {i}', price=1000 + i, stock=10, category='juguete')
+        for i in range(5)
+    ])
+    db.session.commit()
+    
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/products/?limit=2&sort=-price'
+        if cursor:
+            url += f'&cursor={cursor}'
+        response = client.get(url)
+        assert response.status_code == 200
+        assert len(response.json['products']) <= 2
+        seen.extend(p['price'] for p in response.json['products'])
+        cursor = response.json['next_cursor']
+        if not cursor:
+            break
+    
+    assert seen == [1004, 1003, 1002, 1001, 1000]
+
+def test_get_products_fields_projection(client, sample_product):
+    """
+    Test: ?fields= retorna solo las columnas pedidas (más el id)
+    """
+    response = client.get('/api/products/?fields=name,price')
+    
+    assert response.status_code == 200
+    assert response.json['products'][0] == {
+        'id': sample_product.id,
+        'name': 'Alimento para perros',
+        'price': 25000.0
+    }
+
+def test_get_products_invalid_params(client):
+    """
+    Test: Orden, campos o cursor inválidos retornan 400
+    """
+    assert client.get('/api/products/?sort=stock').status_code == 400
+    assert client.get('/api/products/?fields=password').status_code == 400
+    assert client.get('/api/products/?cursor=no-es-un-cursor').status_code == 400
+    assert client.get('/api/products/?limit=abc').status_code == 400
+
+@pytest.mark.parametrize('sort, value', [
+    ('price', '["abc",1]'),
+    ('price', '[{"a":1},1]'),
+    ('price', '[true,1]'),
+    ('price', '[NaN,1]'),
+    ('name', '[[1],1]'),
+    ('name', '[null,1]'),
+    ('name', '[5,1]'),
+    ('-created_at', '["ayer",1]'),
+    ('id', '[1,"1"]'),
+    ('id', '[1,1.5]'),
+    ('name', '["Collar"]'),
+])
+def test_get_products_malformed_cursor(client, sample_product, sort, value):
+    """
+    Test: Un cursor que decodifica pero con valor u id del tipo equivocado retorna 400
+    """
+    import base64
+    cursor = base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+    
+    response = client.get(f'/api/products/?sort={sort}&cursor={cursor}')
+    
+    assert response.status_code == 400
+
+def test_bulk_import_csv(client, admin_token, sample_product):
+    """
+    Test: Importación CSV inserta, actualiza y reporta errores por línea
+    """
+    body = (
+        'id,name,price,stock,category\n'
+        ',Collar,3500,10,accesorio\n'
+        ',Sin precio,,5,accesorio\n'
+        f'{sample_product.id},,,7,\n'
+        ',Arena,4200,-1,higiene\n'
+    )
+    
+    response = client.post('/api/products/bulk?format=csv',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        data=body.encode(),
+        content_type='text/csv'
+    )
+    
+    summary = response.json['summary']
+    assert response.status_code == 200
+    assert summary['inserted'] == 1
+    assert summary['updated'] == 1
+    assert summary['failed'] == 2
+    assert [error['line'] for error in summary['errors']] == [3, 5]
+    assert client.get(f'/api/products/{sample_product.id}').json['stock'] == 7
+
+def test_bulk_import_ndjson_batches(client, admin_token, app):
+    """
+    Test: Importación NDJSON en varios lotes
+    """
+    import json
+    from app.services import ProductService
+    from app.models import Product
+    ProductService.BULK_BATCH_SIZE, original = 3, ProductService.BULK_BATCH_SIZE
+    try:
+        body = '\n'.join(
+            json.dumps({'name': f'Producto {i}', 'price': 100 + i, 'stock': i})
+            for i in range(10)
+        ) + '\nno es json\n'
+        
+        response = client.post('/api/products/bulk',
+            headers={'Authorization': f'Bearer {admin_token}'},
+            data=body.encode(),
+            content_type='application/x-ndjson'
+        )
+    finally:
+        ProductService.BULK_BATCH_SIZE = original
+    
+    assert response.json['summary']['inserted'] == 10
+    assert [error['line'] for error in response.json['summary']['errors']] == [11]
+    assert Product.query.count() == 10
+
+def test_bulk_import_as_client(client, client_token):
+    """
+    Test: Cliente no puede importar productos
+    """
+    response = client.post('/api/products/bulk?format=csv',
+        headers={'Authorization': f'Bearer {client_token}'},
+        data=b'name,price,stock\nX,1,1\n'
+    )
+    
+    assert response.status_code == 403
+
+def test_export_products(client, admin_token, sample_product):
+    """
+    Test: Exportación en CSV y NDJSON
+    """
+    import json
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    csv_response = client.get('/api/products/export?format=csv', headers=headers)
+    lines = csv_response.data.decode().strip().splitlines()
+    assert csv_response.mimetype == 'text/csv'
+    assert lines[0].startswith('id,name,description,price')
+    assert len(lines) == 2
+    
+    ndjson_response = client.get('/api/products/export?format=ndjson', headers=headers)
+    rows = [json.loads(line) for line in ndjson_response.data.decode().splitlines()]
+    assert rows[0]['name'] == 'Alimento para perros'
+
+def _seed_search_catalog():
+    from app import db
+    from app.models import Product
+    db.session.add_all([
+        Product(name='Alimento premium para perros', price=30000, stock=10,
+                category='alimento', description='Croquetas de pollo'),
+        Product(name='Alimento para gatos', price=18000, stock=0,
+                category='alimento', description='Sabor salmón'),
+        Product(name='Pelota para perros', price=4000, stock=25,
+                category='juguete', description='Pelota de goma resistente'),
+        Product(name='Cama acolchada', price=60000, stock=3,
+                category='accesorio', description='Ideal para perros grandes'),
+    ])
+    db.session.commit()
+
+def test_search_products_ranked(client, app):
+    """
+    Test: La búsqueda de texto ordena por relevancia (nombre pesa más que descripción)
+    """
+    _seed_search_catalog()
+    
+    response = client.get('/api/products/search?q=perros')
+    
+    assert response.status_code == 200
+    names = [p['name'] for p in response.json['products']]
+    assert response.json['total'] == 3
+    assert names[-1] == 'Cama acolchada'
+    assert 'Alimento para gatos' not in names
+    assert all(p['score'] is not None for p in response.json['products'])
+
+def test_search_products_prefix_and_accents(client, app):
+    """
+    Test: Se buscan prefijos y se ignoran tildes
+    """
+    _seed_search_catalog()
+    
+    response = client.get('/api/products/search?q=salmon')
+    assert [p['name'] for p in response.json['products']] == ['Alimento para gatos']
+    
+    response = client.get('/api/products/search?q=croq')
+    assert [p['name'] for p in response.json['products']] == ['Alimento premium para perros']
+
+def test_search_products_filters_and_facets(client, app):
+    """
+    Test: Las facetas de categoría ignoran el filtro de categoría y las de precio el de precio
+    """
+    _seed_search_catalog()
+    
+    response = client.get('/api/products/search?q=perros&category=alimento&in_stock=true')
+    
+    assert response.status_code == 200
+    assert [p['name'] for p in response.json['products']] == ['Alimento premium para perros']
+    categories = {f['value']: f['count'] for f in response.json['facets']['category']}
+    assert categories == {'alimento': 1, 'juguete': 1, 'accesorio': 1}
+    prices = {f['range']: f['count'] for f in response.json['facets']['price']}
+    assert prices['25000-50000'] == 1
+    assert prices['0-5000'] == 0
+    
+    response = client.get('/api/products/search?min_price=10000&max_price=40000')
+    assert response.json['total'] == 2
+    prices = {f['range']: f['count'] for f in response.json['facets']['price']}
+    assert prices['0-5000'] == 1
+    assert prices['50000+'] == 1
+
+def test_search_products_pagination_and_sync(client, admin_token, app):
+    """
+    Test: La búsqueda pagina y refleja cambios de nombre de un producto
+    """
+    _seed_search_catalog()
+    
+    first = client.get('/api/products/search?q=perros&limit=2&page=1').json
+    second = client.get('/api/products/search?q=perros&limit=2&page=2').json
+    assert len(first['products']) == 2
+    assert len(second['products']) == 1
+    
+    product_id = second['products'][0]['id']
+    client.put(f'/api/products/{product_id}',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'name': 'Colchoneta', 'description': 'Para mascotas'}
+    )
+    response = client.get('/api/products/search?q=perros')
+    assert response.json['total'] == 2
+
+def test_search_products_invalid_params(client):
+    """
+    Test: Parámetros inválidos retornan 400
+    """
+    assert client.get('/api/products/search?min_price=abc').status_code == 400
+    assert client.get('/api/products/search?page=0').status_code == 400
+    assert client.get('/api/products/search?min_price=10&max_price=5').status_code == 400
+    assert client.get('/api/products/search?q=***').status_code == 400
+
+def test_stock_movements_and_stock_at(client, admin_token, client_token, sample_product):
+    """
+    Test: Admin consulta el libro de movimientos y el stock a una fecha
+    """
+    from datetime import datetime
+    
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    before = datetime.utcnow().isoformat()
+    client.patch(f'/api/products/{sample_product.id}/stock', headers=headers, json={'quantity': 20})
+    
+    response = client.get(f'/api/products/{sample_product.id}/stock/movements', headers=headers)
+    assert response.status_code == 200
+    assert [(m['reason'], m['delta']) for m in response.json['movements']] == [('adjustment', 20)]
+    
+    response = client.get(f'/api/products/{sample_product.id}/stock?at={before}', headers=headers)
+    assert response.json['stock'] == 100
+    response = client.get(f'/api/products/{sample_product.id}/stock', headers=headers)
+    assert response.json['stock'] == 120
+    
+    response = client.get(f'/api/products/{sample_product.id}/stock?at=ayer', headers=headers)
+    assert response.status_code == 400
+    response = client.get(f'/api/products/{sample_product.id}/stock/movements',
+        headers={'Authorization': f'Bearer {client_token}'}
+    )
+    assert response.status_code == 403
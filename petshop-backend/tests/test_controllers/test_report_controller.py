@@ -0,0 +1,22 @@
+def test_sales_reports_admin_only(client, admin_token, client_token, order):
+    """
+    Test: Los reportes de ventas son solo para admin y leen los rollups
+    """
+    admin = {'Authorization': f'Bearer {admin_token}'}
+    
+    assert client.get('/api/reports/sales', headers={'Authorization': f'Bearer {client_token}'}).status_code == 403
+    
+    response = client.get('/api/reports/sales?granularity=month', headers=admin)
+    assert response.status_code == 200
+    assert response.json['totals']['orders_count'] == 1
+    assert response.json['totals']['revenue'] == float(order.total_amount)
+    
+    response = client.get('/api/reports/top-products?limit=5&by=units', headers=admin)
+    assert response.status_code == 200
+    assert response.json['products'][0]['units_sold'] == 2
+    
+    response = client.get('/api/reports/category-revenue', headers=admin)
+    assert response.json['categories'] == [{'category': 'alimento', 'units_sold': 2, 'revenue': 50000.0}]
+    
+    assert client.get('/api/reports/sales?granularity=year', headers=admin).status_code == 400
+    assert client.get('/api/reports/sales?date_from=ayer', headers=admin).status_code == 400
@@ -1,4 +1,8 @@
 import pytest
+from flask_jwt_extended import decode_token
+from app import create_app, db
+from app.services import UserService
+from app.utils import assert_max_queries
 
 def test_register_success(client):
     """
@@ -90,4 +94,200 @@ def test_login_missing_fields(client):
     })
     
     assert response.status_code == 400
-    assert 'error' in response.json
\ No newline at end of file
+    assert 'error' in response.json
+
+def test_login_rate_limited_per_account(app, client, client_user, simple_cache):
+    """
+    Test: Tras LOGIN_ACCOUNT_BURST fallos desde una IP esa IP recibe 429 para la cuenta,
+    pero el dueño entra desde otra IP hasta llegar al límite global de la cuenta
+    """
+    app.config.update(LOGIN_ACCOUNT_BURST=2, LOGIN_ACCOUNT_RATE=0.01,
+                      LOGIN_ACCOUNT_GLOBAL_BURST=4, LOGIN_ACCOUNT_GLOBAL_RATE=0.01)
+    attacker = {'REMOTE_ADDR': '203.0.113.1'}
+    owner = {'REMOTE_ADDR': '10.0.0.2'}
+    
+    for _ in range(2):
+        response = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'mala'},
+                               environ_base=attacker)
+        assert response.status_code == 401
+    
+    response = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'client123'},
+                           environ_base=attacker)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    
+    response = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'client123'},
+                           environ_base=owner)
+    assert response.status_code == 200
+    
+    for index in range(2):
+        response = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'mala'},
+                               environ_base={'REMOTE_ADDR': f'203.0.113.{index + 2}'})
+        assert response.status_code == 401
+    response = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'client123'},
+                           environ_base=owner)
+    assert response.status_code == 429
+
+def test_login_rate_limited_per_ip(app, client, client_user, simple_cache):
+    """
+    Test: Cada IP tiene su propio límite de intentos
+    """
+    app.config.update(LOGIN_IP_BURST=3, LOGIN_IP_RATE=0.01)
+    credentials = {'email': 'client@test.com', 'password': 'client123'}
+    
+    statuses = [client.post('/api/auth/login', json=credentials).status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    
+    response = client.post('/api/auth/login', json=credentials, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert response.status_code == 200
+
+def test_login_rate_limited_with_zero_refill_rate(app, client, client_user, simple_cache):
+    """
+    Test: Un bucket sin recarga (rate 0) responde 429 sin Retry-After en lugar de un error
+    """
+    app.config.update(LOGIN_IP_BURST=1, LOGIN_IP_RATE=0, LOGIN_ACCOUNT_BURST=1, LOGIN_ACCOUNT_RATE=0)
+    credentials = {'email': 'client@test.com', 'password': 'client123'}
+    
+    assert client.post('/api/auth/login', json=credentials).status_code == 200
+    response = client.post('/api/auth/login', json=credentials)
+    assert response.status_code == 429
+    assert 'Retry-After' not in response.headers
+    
+    app.config.update(LOGIN_IP_BURST=10)
+    wrong = {'email': 'client@test.com', 'password': 'incorrecta'}
+    other_ip = {'REMOTE_ADDR': '10.0.0.2'}
+    assert client.post('/api/auth/login', json=wrong, environ_base=other_ip).status_code == 401
+    response = client.post('/api/auth/login', json=credentials, environ_base=other_ip)
+    assert response.status_code == 429
+    assert 'Retry-After' not in response.headers
+
+def test_login_rate_limit_uses_forwarded_ip_behind_proxy():
+    """
+    Test: Con TRUSTED_PROXY_COUNT el límite por IP usa X-Forwarded-For y no la IP del proxy
+    """
+    from app.config import config, TestingConfig
+    
+    class ProxiedConfig(TestingConfig):
+        TRUSTED_PROXY_COUNT = 1
+        CACHE_TYPE = 'SimpleCache'
+        LOGIN_IP_BURST = 1
+        LOGIN_IP_RATE = 0.01
+    
+    config['proxied'] = ProxiedConfig
+    proxied = create_app('proxied')
+    with proxied.app_context():
+        db.create_all()
+        UserService.create_user('client@test.com', 'client123', 'Cliente', 'Test')
+        
+        client = proxied.test_client()
+        credentials = {'email': 'client@test.com', 'password': 'client123'}
+        
+        def login(client_ip):
+            return client.post('/api/auth/login', json=credentials, headers={'X-Forwarded-For': client_ip},
+                               environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code
+        
+        assert [login('198.51.100.1'), login('198.51.100.2'), login('198.51.100.1')] == [200, 200, 429]
+        db.session.remove()
+        db.drop_all()
+
+def test_logout_revokes_token(client, client_token, simple_cache):
+    """
+    Test: Tras el logout el mismo token recibe 401, también si el cache pierde la entrada
+    """
+    headers = {'Authorization': f'Bearer {client_token}'}
+    assert client.get('/api/users/me', headers=headers).status_code == 200
+    
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    
+    response = client.get('/api/users/me', headers=headers)
+    assert response.status_code == 401
+    assert 'error' in response.json
+    
+    simple_cache.clear()
+    assert client.get('/api/users/me', headers=headers).status_code == 401
+
+def test_purge_revoked_tokens_keeps_unexpired(client, client_user, client_token, runner):
+    """
+    Test: `flask tokens purge` borra solo los tokens revocados que ya expiraron
+    """
+    from datetime import datetime, timedelta
+    from app.models import RevokedToken
+    
+    headers = {'Authorization': f'Bearer {client_token}'}
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    db.session.add(RevokedToken(jti='vencido', user_id=client_user.id,
+                                expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.session.commit()
+    
+    result = runner.invoke(args=['tokens', 'purge'])
+    
+    assert 'borrados: 1' in result.output
+    assert [token.jti for token in RevokedToken.query.all()] == [decode_token(client_token)['jti']]
+    assert client.get('/api/users/me', headers=headers).status_code == 401
+
+def test_change_password_revokes_older_tokens(client, client_token, simple_cache):
+    """
+    Test: Cambiar la contraseña invalida los tokens emitidos antes, aunque sea en el mismo segundo;
+    un login posterior funciona
+    """
+    headers = {'Authorization': f'Bearer {client_token}'}
+    response = client.post('/api/users/change-password', headers=headers,
+                           json={'old_password': 'client123', 'new_password': 'nueva456'})
+    assert response.status_code == 200
+    assert client.get('/api/users/me', headers=headers).status_code == 401
+    
+    login = client.post('/api/auth/login', json={'email': 'client@test.com', 'password': 'nueva456'})
+    new_headers = {'Authorization': f'Bearer {login.json["access_token"]}'}
+    assert client.get('/api/users/me', headers=new_headers).status_code == 200
+    
+    simple_cache.clear()
+    assert client.get('/api/users/me', headers=headers).status_code == 401
+    assert client.get('/api/users/me', headers=new_headers).status_code == 200
+
+def test_revocation_is_served_from_cache(client, client_token, simple_cache):
+    """
+    Test: Tras el logout el rechazo sale del cache (sin consultas) y una lectura
+    concurrente de la base no pisa el estado revocado
+    """
+    from app.utils import token_revocation
+    
+    headers = {'Authorization': f'Bearer {client_token}'}
+    assert client.get('/api/users/me', headers=headers).status_code == 200
+    user_id = int(decode_token(client_token)['sub'])
+    stale = token_revocation._load_state(user_id)
+    
+    assert client.post('/api/auth/logout', headers=headers).status_code == 200
+    simple_cache.add(token_revocation._state_key(user_id), stale)
+    
+    with assert_max_queries(0):
+        response = client.get('/api/users/me', headers=headers)
+    assert response.status_code == 401
+
+def test_tokens_without_iat_ms_in_the_cutoff_second_are_revoked(app, client_user):
+    """
+    Test: Un token sin iat_ms emitido en el mismo segundo que el corte se considera revocado
+    """
+    from app.utils import is_token_revoked, revoke_user_tokens
+    from app.utils.token_revocation import _load_state
+    
+    revoke_user_tokens(client_user.id)
+    cutoff = _load_state(client_user.id)['valid_after'] // 1000
+    
+    claims = {'sub': str(client_user.id), 'jti': 'legacy'}
+    assert is_token_revoked({**claims, 'iat': cutoff - 1})
+    assert is_token_revoked({**claims, 'iat': cutoff})
+    assert not is_token_revoked({**claims, 'iat': cutoff + 1})
+
+def test_user_access_is_decided_from_token(client, simple_cache, client_user, admin_user, client_token):
+    """
+    Test: Un cliente que pide otro usuario recibe 403 sin consultar la base de datos
+    (con el estado de revocación ya en cache)
+    """
+    admin_id = admin_user.id
+    client.get(f'/api/users/{admin_id}', headers={'Authorization': f'Bearer {client_token}'})
+    with assert_max_queries(0):
+        response = client.get(f'/api/users/{admin_id}', headers={'Authorization': f'Bearer {client_token}'})
+    assert response.status_code == 403
+    
+    response = client.get(f'/api/users/{client_user.id}', headers={'Authorization': f'Bearer {client_token}'})
+    assert response.status_code == 200
@@ -0,0 +1,198 @@
+import pytest
+from app import db
+from app.models import Cart
+from app.services import CartService
+from sqlalchemy import false
+from sqlalchemy.exc import IntegrityError
+
+def test_only_one_active_cart_per_user(app, client_user):
+    """
+    Test: El índice único parcial impide un segundo carrito activo,
+    pero permite varios carritos completados
+    """
+    db.session.add_all([
+        Cart(user_id=client_user.id, status='completed'),
+        Cart(user_id=client_user.id, status='completed'),
+        Cart(user_id=client_user.id, status='active')
+    ])
+    db.session.commit()
+    
+    db.session.add(Cart(user_id=client_user.id, status='active'))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+def test_get_or_create_active_cart_race(app, client_user, monkeypatch):
+    """
+    Test: Si otro request crea el carrito activo entre la búsqueda y el insert,
+    se retorna el carrito existente en lugar de fallar
+    """
+    existing = Cart(user_id=client_user.id, status='active')
+    db.session.add(existing)
+    db.session.commit()
+    
+    import app.services.cart_service as cart_service
+    original = cart_service.apply_load_profile
+    calls = []
+    
+    def stale_first_lookup(query, profiles, profile):
+        calls.append(profile)
+        query = original(query, profiles, profile)
+        # La primera búsqueda no ve el carrito (como si aún no existiera)
+        return query.filter(false()) if len(calls) == 1 else query
+    
+    monkeypatch.setattr(cart_service, 'apply_load_profile', stale_first_lookup)
+    
+    cart = CartService.get_or_create_active_cart(client_user.id)
+    
+    assert cart.id == existing.id
+    assert Cart.query.filter_by(user_id=client_user.id, status='active').count() == 1
+
+def _products(count, stock=10):
+    from app.models import Product
+    products = [Product(name=f'Producto {i}', price=1000 + i, stock=stock, category='alimento') for i in range(count)]
+    db.session.add_all(products)
+    db.session.commit()
+    return products
+
+def test_replace_cart_items_applies_diff(app, client_user):
+    """
+    Test: El reemplazo agrega, actualiza y quita items; los existentes conservan su precio
+    """
+    kept, updated, removed, added = _products(4)
+    CartService.add_item_to_cart(client_user.id, kept.id, 1)
+    CartService.add_item_to_cart(client_user.id, updated.id, 1)
+    CartService.add_item_to_cart(client_user.id, removed.id, 1)
+    updated.price = 9999
+    db.session.commit()
+    
+    cart = CartService.replace_cart_items(client_user.id, [
+        {'product_id': kept.id, 'quantity': 1},
+        {'product_id': updated.id, 'quantity': 3},
+        {'product_id': added.id, 'quantity': 2}
+    ])
+    
+    items = {item.product_id: item for item in cart.cart_items}
+    assert set(items) == {kept.id, updated.id, added.id}
+    assert items[updated.id].quantity == 3
+    assert float(items[updated.id].unit_price) == 1001
+    assert items[added.id].quantity == 2
+    assert float(cart.calculate_total()) == 1000 + 3 * 1001 + 2 * 1003
+
+def test_replace_cart_items_is_all_or_nothing(app, client_user):
+    """
+    Test: Si un producto no tiene stock, no se aplica ningún cambio
+    """
+    from werkzeug.exceptions import BadRequest
+    first, second = _products(2, stock=2)
+    CartService.add_item_to_cart(client_user.id, first.id, 1)
+    
+    with pytest.raises(BadRequest) as error:
+        CartService.replace_cart_items(client_user.id, [
+            {'product_id': first.id, 'quantity': 2},
+            {'product_id': second.id, 'quantity': 5}
+        ])
+    
+    assert 'Producto 1' in str(error.value)
+    cart = CartService.get_or_create_active_cart(client_user.id, profile='items')
+    assert [(item.product_id, item.quantity) for item in cart.cart_items] == [(first.id, 1)]
+
+def test_cart_totals_follow_mutations(app, client_user):
+    """
+    Test: item_count y subtotal se mantienen en cada cambio del carrito
+    """
+    first, second = _products(2)
+    
+    cart = CartService.add_item_to_cart(client_user.id, first.id, 2)
+    CartService.add_item_to_cart(client_user.id, second.id, 1)
+    CartService.add_item_to_cart(client_user.id, first.id, 1)
+    assert (cart.item_count, float(cart.subtotal)) == (4, 3 * 1000 + 1001)
+    
+    cart = CartService.update_cart_item(cart.id, second.id, 3)
+    assert (cart.item_count, float(cart.subtotal)) == (6, 3 * 1000 + 3 * 1001)
+    
+    cart = CartService.remove_item_from_cart(cart.id, first.id)
+    assert (cart.item_count, float(cart.subtotal)) == (3, 3 * 1001)
+    assert float(CartService.get_cart_total(cart.id)) == 3 * 1001
+    
+    cart = CartService.clear_cart(cart.id)
+    assert (cart.item_count, float(cart.subtotal)) == (0, 0)
+
+def test_check_totals_detects_and_fixes_drift(app, client_user):
+    """
+    Test: El verificador encuentra carritos con items insertados por fuera del
+    servicio y recalcula sus totales en SQL
+    """
+    from app.models import CartItem
+    product, = _products(1)
+    cart = CartService.add_item_to_cart(client_user.id, product.id, 1)
+    db.session.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=2, unit_price=500))
+    db.session.commit()
+    
+    mismatches = CartService.check_totals(fix=True)
+    
+    assert mismatches == [{
+        'cart_id': cart.id,
+        'stored': {'item_count': 1, 'subtotal': 1000.0},
+        'actual': {'item_count': 3, 'subtotal': 2000.0}
+    }]
+    assert CartService.check_totals() == []
+    assert CartService.get_cart_summary(client_user.id)['item_count'] == 3
+
+def _cart(user_id, status, days_idle, items=0, product=None):
+    from datetime import datetime, timedelta
+    from app.models import CartItem
+    updated_at = datetime.utcnow() - timedelta(days=days_idle)
+    cart = Cart(user_id=user_id, status=status, updated_at=updated_at,
+                item_count=items, subtotal=items * 1000)
+    db.session.add(cart)
+    db.session.flush()
+    for _ in range(items):
+        db.session.add(CartItem(cart_id=cart.id, product_id=product.id, quantity=1, unit_price=1000))
+    db.session.commit()
+    return cart.id
+
+def test_abandon_idle_carts_in_batches(app, client_user, admin_user):
+    """
+    Test: Solo los carritos activos sin cambios en el período quedan abandonados
+    """
+    idle = _cart(client_user.id, 'active', days_idle=5)
+    recent = _cart(admin_user.id, 'active', days_idle=0)
+    
+    stats = CartService.abandon_idle_carts(idle_hours=72, batch_size=1)
+    
+    assert stats['rows'] == 1
+    assert stats['batches'] == 1
+    assert db.session.get(Cart, idle).status == 'abandoned'
+    assert db.session.get(Cart, recent).status == 'active'
+
+def test_purge_abandoned_items(app, client_user, admin_user):
+    """
+    Test: Se borran los items de carritos abandonados viejos; los completados se conservan
+    """
+    from app.models import CartItem
+    product, = _products(1)
+    old = _cart(client_user.id, 'abandoned', days_idle=40, items=3, product=product)
+    fresh = _cart(client_user.id, 'abandoned', days_idle=2, items=1, product=product)
+    completed = _cart(admin_user.id, 'completed', days_idle=40, items=2, product=product)
+    
+    stats = CartService.purge_abandoned_items(older_than_days=30, batch_size=2)
+    
+    assert stats['rows'] == 3
+    assert stats['batches'] == 2
+    assert CartItem.query.filter_by(cart_id=old).count() == 0
+    assert db.session.get(Cart, old).item_count == 0
+    assert CartItem.query.filter_by(cart_id=fresh).count() == 1
+    assert CartItem.query.filter_by(cart_id=completed).count() == 2
+
+def test_sweep_command(app, runner, client_user):
+    """
+    Test: flask carts sweep reporta las filas tocadas por segundo de cada fase
+    """
+    _cart(client_user.id, 'active', days_idle=10)
+    
+    result = runner.invoke(args=['carts', 'sweep'])
+    
+    assert result.exit_code == 0
+    assert 'Carritos abandonados: 1 filas' in result.output
+    assert 'Items purgados: 0 filas' in result.output
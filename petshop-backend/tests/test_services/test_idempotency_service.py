@@ -0,0 +1,98 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import IdempotencyKey
+from app.services import IdempotencyService
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import Conflict
+
+def _processing_key(user_id, locked_at=None):
+    record = IdempotencyKey(
+        user_id=user_id, key='k1', request_hash='h1',
+        locked_at=locked_at or datetime.utcnow()
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record.id
+
+def test_in_flight_duplicate_waits_for_result(app, client_user, monkeypatch):
+    """
+    Test: Un duplicado en vuelo espera y reproduce la respuesta del original
+    """
+    record_id = _processing_key(client_user.id)
+    
+    import app.services.idempotency_service as idempotency_service
+    
+    def original_finishes(seconds):
+        # Mientras el duplicado espera, el request original termina
+        IdempotencyService.complete(record_id, 201, '{"order": {"id": 7}}', 'application/json')
+    
+    monkeypatch.setattr(idempotency_service.time, 'sleep', original_finishes)
+    
+    record, is_new = IdempotencyService.begin(client_user.id, 'k1', 'h1')
+    
+    assert is_new is False
+    assert record.response_code == 201
+    assert record.response_body == '{"order": {"id": 7}}'
+
+def test_in_flight_duplicate_times_out(app, client_user):
+    """
+    Test: Si el original no termina dentro de la espera, el duplicado recibe Conflict
+    """
+    _processing_key(client_user.id)
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = 0
+    
+    with pytest.raises(Conflict):
+        IdempotencyService.begin(client_user.id, 'k1', 'h1')
+
+def test_non_unique_integrity_error_is_raised(app, client_user):
+    """
+    Test: Un error de integridad que no es la key duplicada se propaga sin reintentar
+    """
+    with pytest.raises(IntegrityError):
+        IdempotencyService.begin(client_user.id, 'k1', None)  # request_hash es NOT NULL
+
+def test_released_key_retries_with_backoff(app, client_user, monkeypatch):
+    """
+    Test: Si la key desaparece entre el INSERT y la lectura se reintenta con espera y límite
+    """
+    _processing_key(client_user.id)
+    app.config['IDEMPOTENCY_WAIT_SECONDS'] = 0
+    monkeypatch.setattr(IdempotencyService, '_load', staticmethod(lambda user_id, key: None))
+    
+    with pytest.raises(Conflict):
+        IdempotencyService.begin(client_user.id, 'k1', 'h1')
+
+def test_abandoned_key_is_taken_over(app, client_user):
+    """
+    Test: Una key 'processing' con el lock vencido (worker caído) se vuelve a ejecutar
+    """
+    record_id = _processing_key(client_user.id, locked_at=datetime.utcnow() - timedelta(hours=1))
+    
+    record, is_new = IdempotencyService.begin(client_user.id, 'k1', 'h1')
+    
+    assert is_new is True
+    assert record.id == record_id
+
+def test_purge_expired(app, client_user):
+    """
+    Test: purge_expired borra solo las keys completadas fuera del TTL
+    """
+    record_id = _processing_key(client_user.id)
+    IdempotencyService.complete(record_id, 201, '{}', 'application/json')
+    IdempotencyKey.query.filter_by(id=record_id).update(
+        {'completed_at': datetime.utcnow() - timedelta(days=2)}
+    )
+    db.session.commit()
+    
+    assert IdempotencyService.purge_expired() == 1
+    assert IdempotencyKey.query.count() == 0
+
+def test_purge_command(runner, client_user):
+    """
+    Test: flask idempotency purge reporta las keys borradas
+    """
+    result = runner.invoke(args=['idempotency', 'purge'])
+    
+    assert result.exit_code == 0
+    assert 'Keys vencidas borradas: 0' in result.output
@@ -0,0 +1,54 @@
+from datetime import datetime
+from app import db
+from app.models import Invoice, InvoiceSequence
+from app.services import InvoiceNumberService
+
+def _issue(order_id, invoice_number):
+    db.session.add(Invoice(order_id=order_id, invoice_number=invoice_number, total_amount=1000, status='paid'))
+    db.session.commit()
+
+def test_numbers_are_sequential_per_year(app):
+    """
+    Test: Los números son correlativos dentro del año y reinician en el siguiente
+    """
+    numbers = [InvoiceNumberService.allocate(datetime(2026, 12, 31)) for _ in range(3)]
+    next_year = InvoiceNumberService.allocate(datetime(2027, 1, 1))
+    
+    assert numbers == ['INV-2026-00000001', 'INV-2026-00000002', 'INV-2026-00000003']
+    assert next_year == 'INV-2027-00000001'
+
+def test_rollback_returns_number_in_transaction_mode(app):
+    """
+    Test: Con bloques de 1 el número se toma en la transacción; un rollback lo devuelve
+    """
+    InvoiceNumberService.allocate(datetime(2026, 5, 1))
+    db.session.rollback()
+    
+    assert InvoiceNumberService.allocate(datetime(2026, 5, 1)) == 'INV-2026-00000001'
+
+def test_block_allocation_reserves_once_per_block(app):
+    """
+    Test: Con bloques, el proceso reserva block_size números por cada UPDATE del contador
+    """
+    numbers = [InvoiceNumberService.allocate(datetime(2026, 5, 1), block_size=5) for _ in range(7)]
+    sequence = db.session.get(InvoiceSequence, 'INV-2026')
+    
+    assert numbers == [f'INV-2026-{n:08d}' for n in range(1, 8)]
+    assert sequence.next_value == 11  # Dos bloques: 1-5 y 6-10
+
+def test_gap_report(app):
+    """
+    Test: El reporte lista los huecos y los números reservados sin usar
+    """
+    db.session.add(InvoiceSequence(prefix='INV-2025', next_value=11))
+    db.session.commit()
+    for order_id, number in [(101, 1), (102, 2), (103, 5), (104, 9)]:
+        _issue(order_id, f'INV-2025-{number:08d}')
+    
+    report = InvoiceNumberService.gap_report(2025)
+    
+    assert report['issued'] == 4
+    assert report['last_issued'] == 'INV-2025-00000009'
+    assert report['gaps'] == [{'from': 3, 'to': 4}, {'from': 6, 'to': 8}]
+    assert report['missing'] == 5
+    assert report['unused_tail'] == 1
@@ -0,0 +1,128 @@
+import pytest
+from app import db
+from app.models import Product, OrderItem
+from app.services import OrderService, CartService
+from app.utils import assert_max_queries
+from werkzeug.exceptions import BadRequest
+
+def test_create_order_from_cart_success(app, client_user, sample_product, address, payment_method):
+    """
+    Test: Crear una orden descuenta stock e inserta los items
+    """
+    cart = CartService.add_item_to_cart(client_user.id, sample_product.id, 3)
+    
+    order = OrderService.create_order_from_cart(
+        user_id=client_user.id,
+        cart_id=cart.id,
+        address_id=address.id,
+        payment_method_id=payment_method.id
+    )
+    
+    assert order.status == 'completed'
+    assert float(order.total_amount) == 75000
+    assert len(order.order_items) == 1
+    assert order.order_items[0].quantity == 3
+    assert order.invoice is not None
+    assert db.session.get(Product, sample_product.id).available_stock == 97
+    assert CartService.get_cart_by_id(cart.id).status == 'completed'
+
+def test_create_order_insufficient_stock(app, client_user, sample_product, address, payment_method):
+    """
+    Test: Si el stock se agotó después de agregar al carrito, la orden falla sin cambios
+    """
+    cart = CartService.add_item_to_cart(client_user.id, sample_product.id, 10)
+    product = db.session.get(Product, sample_product.id)
+    product.stock = 5
+    db.session.commit()
+    
+    with pytest.raises(BadRequest):
+        OrderService.create_order_from_cart(
+            user_id=client_user.id,
+            cart_id=cart.id,
+            address_id=address.id,
+            payment_method_id=payment_method.id
+        )
+    
+    assert db.session.get(Product, sample_product.id).stock == 5
+    assert CartService.get_cart_by_id(cart.id).status == 'active'
+    assert OrderItem.query.count() == 0
+
+def test_create_order_empty_cart(app, client_user, address, payment_method):
+    """
+    Test: Un carrito vacío no se puede convertir en orden
+    """
+    cart = CartService.get_or_create_active_cart(client_user.id)
+    
+    with pytest.raises(BadRequest):
+        OrderService.create_order_from_cart(
+            user_id=client_user.id,
+            cart_id=cart.id,
+            address_id=address.id,
+            payment_method_id=payment_method.id
+        )
+
+def _order_with_products(user, products, address, payment_method):
+    for product, quantity in products:
+        CartService.add_item_to_cart(user.id, product.id, quantity)
+    cart = CartService.get_or_create_active_cart(user.id)
+    return OrderService.create_order_from_cart(
+        user_id=user.id,
+        cart_id=cart.id,
+        address_id=address.id,
+        payment_method_id=payment_method.id
+    )
+
+def test_cancel_and_return_restore_stock_in_one_update(app, client_user, sample_product, address, payment_method):
+    """
+    Test: Cancelar/devolver restaura el stock de todos los items con un número fijo de consultas
+    """
+    toys = [Product(name=f'Juguete {i}', price=1000, stock=10, category='juguete') for i in range(5)]
+    db.session.add_all(toys)
+    db.session.commit()
+    
+    first = _order_with_products(client_user, [(sample_product, 2)] + [(toy, 1) for toy in toys], address, payment_method)
+    second = _order_with_products(client_user, [(sample_product, 3)], address, payment_method)
+    assert db.session.get(Product, sample_product.id).available_stock == 95
+    
+    first_id, second_id = first.id, second.id
+    db.session.expire_all()
+    with assert_max_queries(8):
+        cancelled = OrderService.cancel_order(first_id)
+    assert cancelled.status == 'cancelled'
+    assert cancelled.invoice.status == 'cancelled'
+    assert [db.session.get(Product, toy.id).available_stock for toy in toys] == [10] * 5
+    
+    returned = OrderService.return_order(second_id)
+    assert returned.status == 'returned'
+    assert db.session.get(Product, sample_product.id).available_stock == 100
+    
+    with pytest.raises(BadRequest):
+        OrderService.cancel_order(first_id)
+    with pytest.raises(BadRequest):
+        OrderService.return_order(first_id)
+
+def test_cancel_orders_reports_each_order(app, client_user, sample_product, address, payment_method):
+    """
+    Test: La cancelación masiva restaura el stock de las válidas y reporta las demás
+    """
+    orders = [
+        _order_with_products(client_user, [(sample_product, 2)], address, payment_method)
+        for _ in range(3)
+    ]
+    OrderService.cancel_order(orders[2].id)
+    
+    results = OrderService.cancel_orders([orders[0].id, 999, orders[1].id, orders[2].id, orders[0].id])
+    
+    assert [(r['order_id'], r['status']) for r in results] == [
+        (orders[0].id, 'cancelled'),
+        (999, 'error'),
+        (orders[1].id, 'cancelled'),
+        (orders[2].id, 'error')
+    ]
+    assert results[3]['error'] == 'La orden ya está cancelada'
+    assert db.session.get(Product, sample_product.id).available_stock == 100
+    
+    with pytest.raises(BadRequest):
+        OrderService.cancel_orders([])
+    with pytest.raises(BadRequest):
+        OrderService.cancel_orders(['abc'])
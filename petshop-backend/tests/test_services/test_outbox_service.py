@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime, timedelta
+from app import db
+from app.models import OutboxEvent
+from app.services import OutboxService
+
+def _event(event_type='invoice.created', **fields):
+    event = OutboxService.enqueue(event_type, {'order_id': 1})
+    for name, value in fields.items():
+        setattr(event, name, value)
+    db.session.commit()
+    return event.id
+
+def test_failed_handler_retries_with_backoff(app, monkeypatch):
+    """
+    Test: Un handler que falla deja el evento pendiente con backoff y,
+    tras OUTBOX_MAX_ATTEMPTS, en 'failed'
+    """
+    import app.services.outbox_handlers as outbox_handlers
+    
+    def broken(payload):
+        raise RuntimeError('proveedor caído')
+    
+    monkeypatch.setitem(outbox_handlers.OUTBOX_HANDLERS, 'invoice.created', broken)
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 2
+    event_id = _event()
+    
+    assert OutboxService.process_batch() == 1
+    event = db.session.get(OutboxEvent, event_id)
+    assert event.status == 'pending'
+    assert event.available_at > datetime.utcnow()
+    assert 'proveedor caído' in event.last_error
+    # Con backoff no está disponible todavía
+    assert OutboxService.process_batch() == 0
+    
+    event.available_at = datetime.utcnow()
+    db.session.commit()
+    OutboxService.process_batch()
+    assert db.session.get(OutboxEvent, event_id).status == 'failed'
+
+def test_stale_processing_event_is_reclaimed(app):
+    """
+    Test: Un evento tomado por un worker caído se vuelve a procesar; uno en curso no
+    """
+    stale_id = _event('order.unknown', status='processing', attempts=1,
+                      locked_at=datetime.utcnow() - timedelta(hours=1))
+    _event('order.unknown', status='processing', attempts=1, locked_at=datetime.utcnow())
+    
+    claimed = OutboxService.claim_batch()
+    
+    assert [event.id for event in claimed] == [stale_id]
+    assert claimed[0].attempts == 2
+
+def test_stats_depth_and_lag(app):
+    """
+    Test: stats reporta la profundidad por estado y la antigüedad del pendiente más viejo
+    """
+    _event(created_at=datetime.utcnow() - timedelta(minutes=5))
+    _event(status='done')
+    
+    stats = OutboxService.stats()
+    
+    assert stats['depth'] == 1
+    assert stats['by_status']['done'] == 1
+    assert 299 <= stats['lag_seconds'] < 360
+
+def test_order_confirmation_notification(app, order, outbox_worker, caplog):
+    """
+    Test: El evento de confirmación notifica al cliente de la orden
+    """
+    with caplog.at_level(logging.INFO, logger='petshop.notifications'):
+        outbox_worker()
+    
+    assert f'Orden {order.id} confirmada para client@test.com' in caplog.text
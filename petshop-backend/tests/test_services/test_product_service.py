@@ -106,7 +106,7 @@ def test_update_stock_add(app, sample_product):
     initial_stock = sample_product.stock
     product = ProductService.update_stock(sample_product.id, 20)
     
-    assert product.stock == initial_stock + 20
+    assert product.available_stock == initial_stock + 20
 
 def test_update_stock_reduce(app, sample_product):
     """
@@ -115,7 +115,7 @@ def test_update_stock_reduce(app, sample_product):
     initial_stock = sample_product.stock
     product = ProductService.update_stock(sample_product.id, -10)
     
-    assert product.stock == initial_stock - 10
+    assert product.available_stock == initial_stock - 10
 
 def test_update_stock_insufficient(app, sample_product):
     """
@@ -0,0 +1,109 @@
+import pytest
+from datetime import datetime
+from app import db
+from app.models import Product, SalesDaily, ProductSalesDaily, ProductSalesMonthly
+from app.services import CartService, OrderService, SalesReportService
+from werkzeug.exceptions import BadRequest
+
+def _checkout(user, product, quantity, address, payment_method):
+    cart = CartService.add_item_to_cart(user.id, product.id, quantity)
+    return OrderService.create_order_from_cart(
+        user_id=user.id,
+        cart_id=cart.id,
+        address_id=address.id,
+        payment_method_id=payment_method.id
+    )
+
+def _snapshot():
+    daily = [row.to_dict() for row in SalesDaily.query.order_by(SalesDaily.day)]
+    # Los ajustes incrementales pueden dejar filas en cero; el rebuild no las crea
+    products = [
+        row.to_dict()
+        for row in ProductSalesDaily.query.order_by(ProductSalesDaily.day, ProductSalesDaily.product_id)
+        if row.units_sold or row.revenue
+    ]
+    months = [
+        row.to_dict()
+        for row in ProductSalesMonthly.query.order_by(ProductSalesMonthly.month, ProductSalesMonthly.product_id)
+        if row.units_sold or row.revenue
+    ]
+    return daily, products, months
+
+def test_rollups_follow_checkout_cancel_and_return(app, client_user, sample_product, address, payment_method):
+    """
+    Test: Checkout, cancelación y devolución ajustan los rollups igual que un rebuild
+    """
+    toy = Product(name='Pelota', price=5000, stock=50, category='juguete')
+    db.session.add(toy)
+    db.session.commit()
+    
+    kept = _checkout(client_user, sample_product, 2, address, payment_method)
+    cancelled = _checkout(client_user, toy, 3, address, payment_method)
+    returned = _checkout(client_user, toy, 1, address, payment_method)
+    OrderService.cancel_order(cancelled.id)
+    OrderService.return_order(returned.id)
+    
+    report = SalesReportService.sales_report()
+    assert report['totals'] == {
+        'orders_count': 1,
+        'units_sold': 2,
+        'cancelled_orders': 1,
+        'returned_orders': 1,
+        'revenue': 50000.0,
+        'average_order_value': 50000.0
+    }
+    assert [p['product_id'] for p in SalesReportService.top_products()] == [kept.order_items[0].product_id]
+    assert SalesReportService.category_revenue() == [
+        {'category': 'alimento', 'units_sold': 2, 'revenue': 50000.0}
+    ]
+    
+    incremental = _snapshot()
+    SalesReportService.rebuild()
+    assert _snapshot() == incremental
+
+def test_sales_report_granularity_and_range(app, client_user, sample_product, address, payment_method):
+    """
+    Test: El reporte agrupa por semana/mes y filtra por rango de días
+    """
+    toy = Product(name='Pelota', price=5000, stock=50, category='juguete')
+    db.session.add(toy)
+    db.session.commit()
+    
+    # Órdenes en tres días: lunes 5 y miércoles 7 (misma semana), y el lunes siguiente
+    days = [datetime(2026, 1, 5, 10), datetime(2026, 1, 7, 23, 59), datetime(2026, 1, 12, 0, 1)]
+    for created_at, (product, quantity) in zip(days, [(sample_product, 1), (toy, 4), (toy, 2)]):
+        order = _checkout(client_user, product, quantity, address, payment_method)
+        order.created_at = created_at
+        db.session.commit()
+    SalesReportService.rebuild()
+    
+    weekly = SalesReportService.sales_report('week')
+    assert [(p['period'], p['orders_count'], p['revenue']) for p in weekly['periods']] == [
+        ('2026-01-05', 2, 45000.0),
+        ('2026-01-12', 1, 10000.0)
+    ]
+    assert SalesReportService.sales_report('month')['periods'][0]['units_sold'] == 7
+    
+    start, end = datetime(2026, 1, 6), datetime(2026, 1, 8)
+    daily = SalesReportService.sales_report('day', start, end)
+    assert [p['period'] for p in daily['periods']] == ['2026-01-07']
+    
+    by_units = SalesReportService.top_products(limit=1, by='units')
+    assert by_units == [{
+        'product_id': toy.id, 'name': 'Pelota', 'category': 'juguete', 'units_sold': 6, 'revenue': 30000.0
+    }]
+    assert SalesReportService.top_products(by='revenue')[0]['product_id'] == toy.id
+    
+    # Rango dentro de un mes (solo días) y rango con un mes completo más bordes
+    partial = SalesReportService.top_products(datetime(2026, 1, 6), datetime(2026, 1, 12))
+    assert [(p['product_id'], p['units_sold']) for p in partial] == [(toy.id, 4)]
+    spanning = SalesReportService.category_revenue(datetime(2025, 12, 15), datetime(2026, 2, 10))
+    assert spanning == [
+        {'category': 'juguete', 'units_sold': 6, 'revenue': 30000.0},
+        {'category': 'alimento', 'units_sold': 1, 'revenue': 25000.0}
+    ]
+    
+    with pytest.raises(BadRequest):
+        SalesReportService.sales_report('year')
+    with pytest.raises(BadRequest):
+        SalesReportService.top_products(by='margin')
@@ -0,0 +1,113 @@
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models import Product, StockMovement
+from app.services import CartService, OrderService, ProductService, StockLedgerService
+from app.utils import assert_max_queries
+from werkzeug.exceptions import BadRequest
+
+def _checkout(user, product, quantity, address, payment_method):
+    cart = CartService.add_item_to_cart(user.id, product.id, quantity)
+    return OrderService.create_order_from_cart(
+        user_id=user.id,
+        cart_id=cart.id,
+        address_id=address.id,
+        payment_method_id=payment_method.id
+    )
+
+def _movements(product_id):
+    return [
+        (movement.reason, movement.delta, movement.compacted)
+        for movement in StockMovement.query.filter_by(product_id=product_id).order_by(StockMovement.id)
+    ]
+
+def test_movements_are_appended_and_compacted_later(app, client_user, sample_product, address, payment_method):
+    """
+    Test: Vender y cancelar no escriben el snapshot; el disponible los incluye y la compactación los suma
+    """
+    order = _checkout(client_user, sample_product, 4, address, payment_method)
+    product = db.session.get(Product, sample_product.id)
+    assert (product.stock, product.available_stock) == (100, 96)
+    
+    OrderService.cancel_order(order.id)
+    db.session.expire_all()
+    product = db.session.get(Product, sample_product.id)
+    assert (product.stock, product.available_stock) == (100, 100)
+    assert _movements(product.id) == [('sale', -4, False), ('cancel', 4, False)]
+    
+    stats = StockLedgerService.compact()
+    assert stats == {'products': 1, 'movements': 2, 'batches': 1}
+    db.session.expire_all()
+    product = db.session.get(Product, sample_product.id)
+    assert (product.stock, product.available_stock) == (100, 100)
+    assert StockLedgerService.compact()['movements'] == 0
+
+def test_sale_is_checked_against_pending_stock(app, sample_product):
+    """
+    Test: Un descuento valida contra snapshot + pendientes y solo inserta el movimiento
+    """
+    product_id = sample_product.id
+    db.session.get(Product, product_id).stock = 0
+    db.session.commit()
+    ProductService.update_stock(product_id, 5)
+    
+    with pytest.raises(BadRequest):
+        ProductService.reserve_stock({product_id: 6})
+    db.session.rollback()
+    
+    with assert_max_queries(3):
+        ProductService.reserve_stock({product_id: 3})
+    db.session.commit()
+    
+    product = db.session.get(Product, product_id)
+    assert (product.stock, product.available_stock) == (0, 2)
+    assert _movements(product_id) == [('adjustment', 5, False), ('sale', -3, False)]
+    
+    with pytest.raises(BadRequest):
+        ProductService.update_stock(product_id, -3)
+    
+    StockLedgerService.compact()
+    product = db.session.get(Product, product_id)
+    assert (product.stock, product.available_stock) == (2, 2)
+
+def test_insufficient_stock_keeps_caller_transaction(app, sample_product):
+    """
+    Test: Un descuento que no alcanza lanza el error sin revertir lo pendiente del llamador
+    """
+    other = Product(name='Collar', price=3500, stock=10, category='accesorio')
+    db.session.add(other)
+    db.session.flush()
+    
+    with pytest.raises(BadRequest) as error:
+        StockLedgerService.apply_movements([
+            {'product_id': other.id, 'delta': -2, 'reason': 'sale'},
+            {'product_id': sample_product.id, 'delta': -101, 'reason': 'sale'}
+        ])
+    
+    assert 'Disponible: 100, Solicitado: 101' in error.value.description
+    assert other in db.session
+    assert db.session.get(Product, other.id).name == 'Collar'
+    db.session.rollback()
+
+def test_stock_at_rebuilds_past_stock(app, sample_product):
+    """
+    Test: El stock a una fecha se reconstruye restando los movimientos posteriores
+    """
+    product_id = sample_product.id
+    ProductService.update_stock(product_id, -30)
+    ProductService.update_stock(product_id, 10)
+    
+    movements = StockMovement.query.filter_by(product_id=product_id).order_by(StockMovement.id).all()
+    base = datetime(2026, 1, 1)
+    for offset, movement in enumerate(movements, start=1):
+        movement.created_at = base + timedelta(days=offset)
+    db.session.commit()
+    
+    assert StockLedgerService.stock_at(product_id, base) == 100
+    assert StockLedgerService.stock_at(product_id, base + timedelta(days=1)) == 70
+    assert StockLedgerService.stock_at(product_id, base + timedelta(days=2)) == 80
+    
+    page, next_cursor = StockLedgerService.get_movements_page(product_id, limit=1)
+    assert [movement.reason for movement in page] == ['adjustment']
+    assert page[0].delta == 10
+    assert next_cursor is not None
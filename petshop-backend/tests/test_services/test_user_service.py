@@ -133,4 +133,45 @@ def test_delete_user_success(app, client_user):
     
     # Verificar que el usuario ya no existe
     with pytest.raises(NotFound):
-        UserService.get_user_by_id(client_user.id)
\ No newline at end of file
+        UserService.get_user_by_id(client_user.id)
+
+def test_authenticate_rehashes_and_caches_verified_credentials(app, client_user, simple_cache):
+    """
+    Test: Un hash con otro costo se regenera al iniciar sesión y el siguiente login no vuelve a hashear
+    """
+    from werkzeug.security import generate_password_hash
+    from app import db
+    from app.utils import LoginStats
+    
+    app.config['LOGIN_VERIFIED_SECRET'] = 'clave-del-cache-de-credenciales-de-prueba'
+    client_user.password_hash = generate_password_hash('client123', 'pbkdf2:sha256:500')
+    db.session.commit()
+    LoginStats.reset()
+    
+    user = UserService.authenticate('client@test.com', 'client123', remote_addr='10.0.0.1')
+    assert user.password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+    
+    UserService.authenticate('client@test.com', 'client123', remote_addr='10.0.0.1')
+    with pytest.raises(BadRequest):
+        UserService.authenticate('client@test.com', 'otra', remote_addr='10.0.0.1')
+    
+    stats = LoginStats.snapshot()
+    assert {event: count for event, count in stats['events'].items() if count} == {
+        'success': 1, 'rehashed': 1, 'verified_cache': 1, 'invalid': 1
+    }
+    assert stats['hash']['verify']['count'] == 2
+
+def test_verified_cache_requires_dedicated_secret(app, client_user, simple_cache):
+    """
+    Test: Sin LOGIN_VERIFIED_SECRET propio (ausente, de ejemplo o igual a SECRET_KEY) no se cachean credenciales
+    """
+    from app.utils import LoginStats
+    
+    for secret in (None, 'dev-secret-key', app.config['SECRET_KEY']):
+        app.config['LOGIN_VERIFIED_SECRET'] = secret
+        LoginStats.reset()
+        UserService.authenticate('client@test.com', 'client123', remote_addr='10.0.0.1')
+        UserService.authenticate('client@test.com', 'client123', remote_addr='10.0.0.1')
+        
+        assert LoginStats.snapshot()['events']['verified_cache'] == 0
+        assert simple_cache.get(f'auth:verified:{client_user.id}') is None
@@ -0,0 +1,117 @@
+import pytest
+from app.utils import CacheTags, CacheInvalidator
+
+def test_tag_key_changes_after_invalidate(simple_cache):
+    """
+    Test: Invalidar un tag cambia la key de las entradas registradas con él
+    """
+    key = CacheTags.make_key('base', [CacheTags.PRODUCTS])
+    
+    assert CacheTags.make_key('base', [CacheTags.PRODUCTS]) == key
+    
+    CacheTags.invalidate(CacheTags.PRODUCTS)
+    
+    assert CacheTags.make_key('base', [CacheTags.PRODUCTS]) != key
+
+def test_invalidate_other_tag_keeps_key(simple_cache):
+    """
+    Test: Invalidar una categoría no afecta los listados de otra
+    """
+    alimento = CacheTags.make_key('base', [CacheTags.CATEGORY.format('alimento')])
+    juguete = CacheTags.make_key('base', [CacheTags.CATEGORY.format('juguete')])
+    
+    CacheInvalidator.invalidate_products('juguete')
+    
+    assert CacheTags.make_key('base', [CacheTags.CATEGORY.format('alimento')]) == alimento
+    assert CacheTags.make_key('base', [CacheTags.CATEGORY.format('juguete')]) != juguete
+
+def test_product_list_fresh_after_update(client, admin_token, sample_product, simple_cache):
+    """
+    Test: Los listados cacheados (con cualquier query string) se refrescan al actualizar
+    """
+    urls = ['/api/products/', '/api/products/?category=alimento', '/api/products/?limit=5&sort=-price']
+    for url in urls:
+        assert client.get(url).json['products'][0]['name'] == 'Alimento para perros'
+    detail = client.get(f'/api/products/{sample_product.id}')
+    assert detail.json['name'] == 'Alimento para perros'
+    
+    client.put(f'/api/products/{sample_product.id}',
+        headers={'Authorization': f'Bearer {admin_token}'},
+        json={'name': 'Alimento Renombrado'}
+    )
+    
+    for url in urls:
+        assert client.get(url).json['products'][0]['name'] == 'Alimento Renombrado'
+    assert client.get(f'/api/products/{sample_product.id}').json['name'] == 'Alimento Renombrado'
+
+def test_cached_view_serves_cached_body(client, sample_product, simple_cache):
+    """
+    Test: Sin invalidación, la vista responde desde cache
+    """
+    from app import db
+    assert client.get('/api/products/').json['products'][0]['stock'] == 100
+    
+    sample_product.stock = 1
+    db.session.commit()
+    
+    assert client.get('/api/products/').json['products'][0]['stock'] == 100
+
+def test_get_or_compute_serves_stale_while_refreshing(app, simple_cache):
+    """
+    Test: Un valor vencido se sirve mientras otro worker tiene el lock de recálculo
+    """
+    import time
+    from app.utils import get_or_compute, CacheStats
+    CacheStats.reset()
+    simple_cache.set('swr', {'value': 'viejo', 'expires_at': time.time() - 1, 'delta': 0.1}, timeout=60)
+    simple_cache.add('lock/swr', 1, timeout=10)
+    
+    value = get_or_compute('swr', lambda: 'nuevo', timeout=60, stale_ttl=30, name='swr')
+    
+    assert value == 'viejo'
+    assert CacheStats.snapshot()['swr']['stale'] == 1
+
+def test_get_or_compute_coalesces_concurrent_misses(app, simple_cache):
+    """
+    Test: Muchos requests concurrentes con cache vacío calculan el valor una sola vez
+    """
+    import threading
+    import time
+    from app.utils import get_or_compute, CacheStats
+    CacheStats.reset()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'valor'
+    
+    results = []
+    def worker():
+        with app.app_context():
+            results.append(get_or_compute('hot', compute, timeout=60, name='hot'))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stats = CacheStats.snapshot()['hot']
+    assert results == ['valor'] * 8
+    assert len(calls) == 1
+    assert stats['miss'] == 1
+    assert stats['coalesced'] == 7
+
+def test_cache_stats_endpoint(client, sample_product, simple_cache):
+    """
+    Test: /health/cache expone los contadores por vista
+    """
+    from app.utils import CacheStats
+    CacheStats.reset()
+    client.get('/api/products/')
+    client.get('/api/products/')
+    
+    stats = client.get('/health/cache').json['cache']['products.get_all_products']
+    assert stats['miss'] == 1
+    assert stats['hit'] + stats['early_refresh'] == 1
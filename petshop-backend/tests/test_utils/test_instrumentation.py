@@ -0,0 +1,66 @@
+import logging
+import pytest
+from app import create_app, db
+from app.config import config, TestingConfig
+
+@pytest.fixture
+def metrics_app():
+    """
+    App de testing con la instrumentación activa y umbrales en cero
+    """
+    class MetricsTestingConfig(TestingConfig):
+        METRICS_ENABLED = True
+        SLOW_QUERY_MS = 0
+        SLOW_REQUEST_MS = 0
+    
+    config['metrics_testing'] = MetricsTestingConfig
+    app = create_app('metrics_testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def test_metrics_disabled_by_default(client):
+    """
+    Test: Sin METRICS_ENABLED no existe /metrics
+    """
+    assert client.get('/metrics').status_code == 404
+
+def test_metrics_records_latency_and_queries(metrics_app):
+    """
+    Test: /metrics expone percentiles, tiempo en DB y consultas por ruta
+    """
+    client = metrics_app.test_client()
+    client.get('/api/products/')
+    client.get('/api/products/')
+    client.get('/api/products/99999')
+    
+    response = client.get('/metrics')
+    body = response.get_data(as_text=True)
+    
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    route = 'endpoint="products.get_all_products",method="GET"'
+    assert f'petshop_request_duration_seconds{{{route},quantile="0.99"}}' in body
+    assert f'petshop_request_duration_seconds_count{{{route}}} 2' in body
+    assert f'petshop_request_queries_sum{{{route}}} 2.000000' in body
+    assert f'petshop_request_db_seconds_count{{{route}}} 2' in body
+    assert 'petshop_requests_total{endpoint="products.get_product",method="GET",status="404"} 1' in body
+    # /metrics no se mide a sí mismo
+    assert 'endpoint="metrics"' not in body
+
+def test_slow_query_log(metrics_app, caplog):
+    """
+    Test: Las consultas sobre SLOW_QUERY_MS se loguean y se cuentan por ruta
+    """
+    client = metrics_app.test_client()
+    
+    with caplog.at_level(logging.WARNING, logger='petshop.slow_query'):
+        client.get('/api/products/')
+    
+    assert any('Consulta lenta' in record.message and 'products' in record.message
+               for record in caplog.records)
+    assert any('Request lento' in record.message for record in caplog.records)
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'petshop_slow_queries_total{endpoint="products.get_all_products",method="GET"} 1' in body
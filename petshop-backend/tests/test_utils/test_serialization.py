@@ -0,0 +1,81 @@
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from app import db
+from app.models import Product
+from app.services import ProductService
+from app.utils import FastJSONProvider, RowProjection
+from app.utils import json_provider
+
+def test_row_projection_matches_to_dict(app, sample_product):
+    """
+    Test: Las filas proyectadas tienen el mismo formato que Product.to_dict
+    """
+    sample_product.price = Decimal('12.34')
+    db.session.commit()
+    
+    projection = RowProjection(Product, ProductService.PROJECTABLE_FIELDS)
+    row = db.session.query(*projection.columns).one()
+    assert projection.row_to_dict(row) == sample_product.to_dict()
+    
+    products, _ = ProductService.get_products_page(sort='-price')
+    assert products == [sample_product.to_dict()]
+    
+    # La columna de orden se selecciona para el cursor pero no aparece en la salida
+    products, _ = ProductService.get_products_page(sort='-price', fields=['name'])
+    assert products == [{'id': sample_product.id, 'name': 'Alimento para perros'}]
+
+def test_price_cursor_survives_float_projection(app):
+    """
+    Test: El cursor por precio sigue siendo exacto aunque la proyección lea float
+    """
+    db.session.add_all([
+        Product(name=f'Producto {i}', price=Decimal('0.10'), stock=1) for i in range(3)
+    ])
+    db.session.commit()
+    
+    first, cursor = ProductService.get_products_page(sort='price', limit=2)
+    second, cursor = ProductService.get_products_page(sort='price', limit=2, cursor=cursor)
+    assert [p['id'] for p in first + second] == [1, 2, 3]
+    assert cursor is None
+
+@pytest.mark.parametrize('backend', ['orjson', 'json'])
+def test_json_provider_backends_produce_same_payload(app, backend):
+    """
+    Test: Ambos backends serializan Decimal y fechas como los to_dict de los modelos
+    """
+    if backend == 'orjson' and json_provider.orjson is None:
+        pytest.skip('orjson no está instalado')
+    
+    app.config['JSON_BACKEND'] = backend
+    provider = FastJSONProvider(app)
+    payload = {
+        'price': Decimal('1500.50'),
+        'created_at': datetime(2024, 1, 31, 10, 30, 0, 125000),
+        'name': 'Señal',
+        'counts': {2: 'clave numérica'}
+    }
+    expected = {
+        'price': 1500.5,
+        'created_at': '2024-01-31T10:30:00.125000',
+        'name': 'Señal',
+        'counts': {'2': 'clave numérica'}
+    }
+    
+    assert json.loads(provider.dumps(payload)) == expected
+    assert json.loads(provider.dumps_line(payload)) == expected
+    assert '\n' not in provider.dumps_line(payload)
+    with app.test_request_context():
+        response = provider.response(payload)
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == expected
+    assert provider.loads(provider.dumps(payload)) == expected
+
+def test_json_backend_is_validated(app):
+    """
+    Test: Un JSON_BACKEND desconocido falla al crear la app
+    """
+    app.config['JSON_BACKEND'] = 'ujson'
+    with pytest.raises(ValueError):
+        FastJSONProvider(app)